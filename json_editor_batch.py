@@ -0,0 +1,298 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+# -*- coding: utf-8 -*-
+
+# 无界面批处理：对一个目录中的JSON文件并行执行一组操作
+# 用法：python json_editor_batch.py script.json data_dir [--jobs 8] [--dry-run]
+# 脚本为操作列表（或 {"operations": [...]}），例如：
+# [
+#     {"op": "add_column", "column": "note", "type": "string"},
+#     {"op": "import_excel", "file": "lang.xlsx", "sheet": "Sheet1",
+#      "columns": ["en", "zh"], "excel_key": "ID", "json_key": "ID"},
+#     {"op": "change_type", "column": "level", "type": "int"},
+#     {"op": "compute_column", "column": "hp", "expression": "hp * 1.1",
+#      "where": "level > 10", "type": "float"},
+#     {"op": "rename_column", "column": "desc", "new_name": "description"},
+#     {"op": "delete_column", "column": "old"},
+#     {"op": "save"}
+# ]
+
+import argparse
+import json  # 导入json模块，用于处理JSON数据
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import json_editor_excel  # 导入Excel工作簿缓存模块
+import json_editor_formula  # 导入计算列模块
+import json_editor_tasks  # 导入后台任务模块
+import json_editor_types  # 导入列类型与存储类型模块
+from json_editor_functions import JsonEditorFunctions  # 导入JsonEditorFunctions类
+
+DEFAULT_EXTENSIONS = (".json", ".jsonl")  # 目录中默认处理的文件扩展名
+
+_excel_cache = json_editor_excel.WorkbookCache()  # 每个工作进程共用的工作簿
+_excel_frames = {}  # (路径, 修改时间, 工作表, 列) -> 已读取的Excel数据
+
+
+class BatchError(Exception):  # 脚本或操作无效
+    pass
+
+
+def describe_error(error):  # 错误说明，非BatchError时带上异常类型
+    if isinstance(error, BatchError):
+        return str(error)
+    return f"{type(error).__name__}: {error}"
+
+
+def require_column(editor, col):  # 列不存在时抛出BatchError
+    if col not in editor.df.columns:
+        raise BatchError(f"Column not found: {col}")
+
+
+def read_excel_columns(file_path, sheet_name, columns):  # 同一进程中重复使用已读取的Excel列
+    key = (file_path, os.path.getmtime(file_path), sheet_name, tuple(columns))
+    if key not in _excel_frames:
+        _excel_frames[key] = _excel_cache.read_columns(file_path, sheet_name, columns)
+    return _excel_frames[key]
+
+
+def import_excel(editor, operation):  # 导入Excel列，与导入对话框的规则相同
+    file_path = operation["file"]
+    sheet_name = operation.get("sheet") or _excel_cache.sheet_names(file_path)[0]
+    excel_columns = operation["columns"]
+    excel_key, json_key = operation.get("excel_key"), operation.get("json_key")
+    if bool(excel_key) != bool(json_key):
+        raise BatchError("excel_key and json_key must be given together")
+    if json_key:
+        require_column(editor, json_key)
+    target = operation.get("target")
+    if target and len(excel_columns) == 1:
+        imports = [(excel_columns[0], target)]
+    else:
+        imports = [(col, col) for col in excel_columns]
+    columns = list(dict.fromkeys(excel_columns + ([excel_key] if excel_key else [])))
+    excel_data = read_excel_columns(file_path, sheet_name, columns)
+    report = editor.import_excel_data(excel_data, imports, excel_key, json_key)
+    if report:
+        editor.messages.append(report.strip())
+
+
+def compute_column(editor, operation):  # 按表达式计算列，与计算列对话框的规则相同
+    col, col_type = operation["column"], operation.get("type")
+    if col_type is not None and col_type not in json_editor_types.COLUMN_TYPES:
+        raise BatchError(f"Unknown column type: {col_type}")
+    strict = col_type is None
+    if strict:
+        col_type = editor.column_types.get(col)
+    try:
+        values, col_type, bad_rows = json_editor_formula.compute_column(
+            editor.df, col, col_type, operation["expression"], operation.get("where"), strict
+        )
+    except json_editor_formula.FormulaError as e:
+        raise BatchError(str(e)) from e
+    editor.apply_formula(col, col_type, operation["expression"], operation.get("where"), values)
+    if len(bad_rows):
+        editor.messages.append(
+            f"Column {col}: {len(bad_rows)} results could not be converted to "
+            f"{col_type} (rows: {json_editor_types.format_error_rows(bad_rows)})"
+        )
+
+
+def run_operation(editor, operation, dry_run):  # 执行一个操作，返回是否写入了文件
+    op = operation.get("op")
+    if op == "add_column":
+        col = operation["column"]
+        if col in editor.df.columns:
+            raise BatchError(f"Column already exists: {col}")
+        editor.create_column(col, operation.get("type", "string"))
+    elif op == "delete_column":
+        col = operation["column"]
+        if col not in editor.df.columns and operation.get("missing_ok"):
+            return False
+        require_column(editor, col)
+        editor.remove_column(col)
+    elif op == "rename_column":
+        col, new_name = operation["column"], operation["new_name"]
+        require_column(editor, col)
+        if new_name in editor.df.columns:
+            raise BatchError(f"Column already exists: {new_name}")
+        editor.rename_column(col, new_name)
+    elif op == "change_type":
+        col, col_type = operation["column"], operation["type"]
+        require_column(editor, col)
+        if col_type not in json_editor_types.COLUMN_TYPES:
+            raise BatchError(f"Unknown column type: {col_type}")
+        converted, bad_rows = json_editor_types.convert_column(editor.df[col], col_type)
+        editor.set_column_type(col, col_type, converted)
+        if len(bad_rows):
+            editor.messages.append(
+                f"Column {col}: {len(bad_rows)} values could not be converted to "
+                f"{col_type} (rows: {json_editor_types.format_error_rows(bad_rows)})"
+            )
+    elif op == "compute_column":
+        compute_column(editor, operation)
+    elif op == "import_excel":
+        import_excel(editor, operation)
+    elif op == "save":
+        if dry_run:
+            return False
+        indent = operation.get("indent", editor.json_indent)
+        json_editor_types.remove_unused_categories(editor.df)
+        editor.write_json_file(indent, json_editor_tasks.BackgroundTask("Saving JSON"))
+        return True
+    else:
+        raise BatchError(f"Unknown operation: {op}")
+    return False
+
+
+def process_file(file_path, operations, dry_run=False):
+    # 在工作进程中处理一个文件，错误记录在结果中而不是抛出
+    started = time.perf_counter()
+    result = {"file": file_path, "ok": False, "saved": False, "messages": []}
+    editor = JsonEditorFunctions()  # 无界面运行，不写编辑日志
+    try:
+        loaded = editor.load_json_file(
+            file_path, None, json_editor_tasks.BackgroundTask("Opening JSON")
+        )
+        editor.set_data(file_path, *loaded)
+        for number, operation in enumerate(operations, 1):
+            try:
+                result["saved"] |= run_operation(editor, operation, dry_run)
+            except Exception as e:
+                raise BatchError(
+                    f"operation {number} ({operation.get('op')}): {describe_error(e)}"
+                ) from e
+        result.update(ok=True, rows=len(editor.df), columns=len(editor.df.columns))
+    except Exception as e:
+        result["error"] = describe_error(e)
+    finally:
+        if editor.jsonl is not None:
+            editor.jsonl.close()  # 解除JSON Lines文件的映射
+        result["messages"] = editor.messages
+        result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def load_script(script_path):  # 读取操作脚本，Excel路径相对于脚本所在目录
+    with open(script_path, "r", encoding="utf-8") as file:
+        script = json.load(file)
+    operations = script.get("operations") if isinstance(script, dict) else script
+    if not isinstance(operations, list) or not all(
+        isinstance(operation, dict) for operation in operations
+    ):
+        raise BatchError("Script must be a list of operations")
+    base = os.path.dirname(os.path.abspath(script_path))
+    for operation in operations:
+        if operation.get("op") == "import_excel":
+            operation["file"] = os.path.join(base, operation["file"])
+    return operations
+
+
+def collect_files(paths, extensions=DEFAULT_EXTENSIONS, recursive=False):  # 展开目录
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                files.extend(
+                    os.path.join(root, name)
+                    for name in names
+                    if name.lower().endswith(tuple(extensions))
+                )
+                if not recursive:
+                    break
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def run_batch(files, operations, jobs=None, dry_run=False, on_result=None):
+    # 用进程池并行处理文件，返回按文件顺序排列的结果
+    results = {}
+    if jobs == 1:  # 单进程时直接执行，便于调试
+        for file_path in files:
+            results[file_path] = process_file(file_path, operations, dry_run)
+            if on_result is not None:
+                on_result(results[file_path])
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                executor.submit(process_file, file_path, operations, dry_run): file_path
+                for file_path in files
+            }
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:  # 工作进程异常退出
+                    result = {
+                        "file": futures[future],
+                        "ok": False,
+                        "saved": False,
+                        "messages": [],
+                        "error": f"{type(e).__name__}: {e}",
+                        "seconds": 0,
+                    }
+                results[result["file"]] = result
+                if on_result is not None:
+                    on_result(result)
+    return [results[file_path] for file_path in files]
+
+
+def print_result(result):  # 每个文件输出一行结果，附带警告
+    if result["ok"]:
+        action = "saved" if result["saved"] else "checked"
+        print(
+            f"OK      {result['file']} ({result['rows']} rows, "
+            f"{result['columns']} columns, {action}, {result['seconds']}s)"
+        )
+    else:
+        print(f"FAILED  {result['file']}: {result['error']}")
+    for message in result["messages"]:
+        print("        " + message.replace("\n", "\n        "))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run a script of JSON editor operations over many files"
+    )
+    parser.add_argument("script", help="JSON file with the list of operations")
+    parser.add_argument("paths", nargs="+", help="files or directories to process")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes")
+    parser.add_argument("--recursive", action="store_true", help="walk subdirectories")
+    parser.add_argument(
+        "--extension",
+        action="append",
+        help="file extension to process in directories (default: .json, .jsonl)",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="run every operation but do not save"
+    )
+    parser.add_argument("--report", help="write the per-file results as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        operations = load_script(args.script)
+    except (OSError, ValueError, BatchError) as e:
+        print(f"Invalid script {args.script}: {e}", file=sys.stderr)
+        return 2
+    files = collect_files(
+        args.paths, args.extension or DEFAULT_EXTENSIONS, args.recursive
+    )
+    started = time.perf_counter()
+    results = run_batch(files, operations, args.jobs, args.dry_run, print_result)
+    failed = sum(not result["ok"] for result in results)
+    print(
+        f"{len(results) - failed}/{len(results)} files succeeded in "
+        f"{time.perf_counter() - started:.1f}s" + (" (dry run)" if args.dry_run else "")
+    )
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as file:
+            json.dump(results, file, ensure_ascii=False, indent=4)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":  # 主程序入口
+    sys.exit(main())
@@ -0,0 +1,395 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+# -*- coding: utf-8 -*-
+
+# 性能基准：用合成数据在无界面环境中测量打开、建表、编辑、添加行和保存的耗时与峰值内存
+# 用法：python json_editor_bench.py --rows 1000,100000 --output results.json
+#       python json_editor_bench.py --baseline baseline.json  # 与基线比较，超出容差时返回1
+# startup用例在新进程中测量导入和创建界面的耗时，超出预算或启动时导入了pandas也返回1
+
+import argparse
+import gc
+import json  # 导入json模块，用于处理JSON数据
+import os
+import platform  # 导入platform模块，用于检测操作系统
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+import json_editor_functions
+import json_editor_gui
+from json_editor_lazy import numpy as np  # 首次使用时才导入numpy，缩短启动时间
+from json_editor_lazy import pandas as pd  # 首次使用时才导入pandas，缩短启动时间
+
+DEFAULT_ROWS = (1000, 10000, 100000, 1000000)  # 默认测试的行数
+SHAPES = ("flat", "nested")  # 扁平记录与嵌套记录
+EDIT_COUNT = 1000  # edit_cell阶段编辑的单元格数
+ADD_COUNT = 100  # add_row阶段添加的行数
+TIME_TOLERANCE = 0.25  # 耗时超过基线的比例上限
+MEMORY_TOLERANCE = 0.25  # 峰值内存超过基线的比例上限
+MIN_SECONDS = 0.005  # 低于该差值的耗时变化视为噪声
+MIN_BYTES = 1 << 20  # 低于该差值的内存变化视为噪声
+STARTUP_CASE = "startup"  # 启动用例的名称
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow")  # 启动时不应导入的模块
+
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import json_editor_gui
+imported = time.perf_counter()
+import json_editor_bench
+stub = json_editor_bench.DpgStub()
+json_editor_bench.make_app(stub)
+created = time.perf_counter()
+print(json.dumps({
+    "import": imported - started,
+    "create_app": created - imported,
+    "widget_calls": stub.calls,
+    "modules": [name for name in json_editor_bench.HEAVY_MODULES if name in sys.modules],
+}))
+"""  # 在新进程中执行，避免已导入的模块影响结果
+
+CITY_NAMES = [  # 与test.json类似的中英文混合文本
+    "纽约", "关羽", "Chicago", "Houston", "上海", "北京", "東京", "서울",
+    "Los Angeles", "深圳", "张飞", "诸葛亮", "Phoenix", "广州", "重庆", "成都",
+]  # fmt: skip
+
+
+class StubItem(int):  # 占位控件编号，也可以作为with语句中的容器
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class DpgStub:  # Dear PyGui的无界面替身：记录调用次数，控件操作不做任何事
+    def __init__(self, width=1280, height=800):
+        self.width = width  # 表格窗口和视口的大小决定可见行列数
+        self.height = height
+        self.values = {}
+        self.configs = defaultdict(lambda: defaultdict(int))
+        self.calls = 0  # 调用次数，反映建表和刷新的控件操作量
+        self.next_id = 0
+
+    def __getattr__(self, name):  # 未单独实现的函数都视为创建或修改控件
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            self.calls += 1
+            self.next_id += 1
+            return StubItem(self.next_id)
+
+        return call
+
+    def set_value(self, item, value):
+        self.calls += 1
+        self.values[item] = value
+
+    def get_value(self, item):
+        return self.values.get(item)
+
+    def configure_item(self, item, **kwargs):
+        self.calls += 1
+        self.configs[item].update(kwargs)
+
+    def get_item_configuration(self, item):
+        return self.configs[item]
+
+    def get_item_width(self, item):
+        return self.width
+
+    def get_item_height(self, item):
+        return self.height
+
+    def get_viewport_client_width(self):
+        return self.width
+
+    def get_viewport_client_height(self):
+        return self.height
+
+    def get_item_children(self, item, slot=None):
+        return {} if slot is None else []
+
+    def get_item_user_data(self, item):
+        return None
+
+    def is_item_shown(self, item):
+        return False
+
+    def is_item_hovered(self, item):
+        return False
+
+    def is_key_down(self, key):
+        return False
+
+    def is_dearpygui_running(self):
+        return False
+
+
+def generate_records(rows, shape="flat", seed=0):  # 生成可复现的合成记录
+    rng = np.random.default_rng(seed)
+    names = np.array(CITY_NAMES)[rng.integers(0, len(CITY_NAMES), rows)]
+    suffixes = rng.integers(0, 100000, rows)
+    population = rng.integers(1000, 10000000, rows)
+    area = np.round(rng.uniform(10, 2000, rows), 1)
+    flags = rng.random((rows, 3)) < 0.5
+    colors = rng.integers(0, 1 << 24, rows)
+    records = []
+    for i in range(rows):
+        record = {
+            "city": f"{names[i]}{suffixes[i]}",
+            "population": int(population[i]),
+            "area": float(area[i]) if flags[i, 0] else False,  # 与test.json一样混合类型
+            "f": bool(flags[i, 1]),
+            "1": bool(flags[i, 2]),
+            "color": f"#{colors[i]:06x}",
+        }
+        if shape == "nested":
+            record["stats"] = {"hp": int(suffixes[i]), "atk": int(population[i] % 997)}
+            record["name"] = {"zh": str(names[i]), "en": f"City {suffixes[i]}"}
+            record["tags"] = [str(names[i]), int(suffixes[i] % 7)]
+        records.append(record)
+    return records
+
+
+def write_dataset(file_path, rows, shape, seed=0):  # 写入与保存格式相同的数据集
+    with open(file_path, "w", encoding="utf-8") as file:
+        json.dump(generate_records(rows, shape, seed), file, ensure_ascii=False, indent=4)
+
+
+def make_app(stub):  # 用替身创建完整的界面对象，后台任务同步执行
+    json_editor_gui.dpg = stub
+    json_editor_functions.dpg = stub
+    app = json_editor_gui.JsonEditorApp()
+    app.tasks.shutdown()
+    app.tasks = None  # run_task在没有执行器时同步执行，便于计时
+    return app
+
+
+def run_stages(file_path, stub):  # 依次执行各阶段，返回[(阶段名, 函数)]供计时
+    app = make_app(stub)
+    rng = np.random.default_rng(1)
+
+    def normalize():
+        with open(file_path, "r", encoding="utf-8") as file:
+            pd.json_normalize(json.load(file))
+
+    def edit_cells():
+        rows = rng.integers(0, len(app.df), EDIT_COUNT)
+        for i, row in enumerate(rows):
+            app.edit_cell(None, f"编辑{i}", (int(row), "city"))
+
+    def add_rows():
+        for _ in range(ADD_COUNT):
+            app.add_row()
+
+    return app, [
+        ("json_normalize", normalize),
+        ("open_json", lambda: app.open_json(file_path)),
+        ("update_table", app.update_table),
+        ("edit_cell", edit_cells),
+        ("add_row", add_rows),
+        (
+            "compute_column",
+            lambda: app.apply_formula("population", "float", "population * 1.1", "f"),
+        ),
+        ("save_json", app.save_json),
+        ("save_json_compact", app.save_json_compact),
+    ]
+
+
+def measure(file_path, track_memory):  # 执行一遍全部阶段，返回{阶段: (秒, 峰值字节, 控件调用数)}
+    stub = DpgStub()
+    app, stages = run_stages(file_path, stub)
+    results = {}
+    try:
+        for name, stage in stages:
+            gc.collect()
+            calls = stub.calls
+            if track_memory:
+                tracemalloc.start()
+            started = time.perf_counter()
+            stage()
+            seconds = time.perf_counter() - started
+            peak = 0
+            if track_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            results[name] = (seconds, peak, stub.calls - calls)
+            message = stub.values.get("message_text") or ""
+            if message.startswith("Failed"):
+                raise RuntimeError(f"{name}: {message}")
+    finally:
+        app.close_journal()
+    return results
+
+
+def run_case(rows, shape, repeat, directory):  # 测量一种数据集，耗时取多次的最小值
+    file_path = os.path.join(directory, f"{shape}_{rows}.json")
+    write_dataset(file_path, rows, shape)
+    size = os.path.getsize(file_path)
+    timings = [measure(file_path, False) for _ in range(repeat)]
+    memory = measure(file_path, True)  # tracemalloc会拖慢执行，单独运行一遍
+    records = []
+    for stage in memory:
+        records.append(
+            {
+                "case": f"{shape}-{rows}",
+                "rows": rows,
+                "shape": shape,
+                "file_bytes": size,
+                "stage": stage,
+                "seconds": round(min(timing[stage][0] for timing in timings), 6),
+                "peak_bytes": memory[stage][1],
+                "widget_calls": memory[stage][2],
+            }
+        )
+    return records
+
+
+def run_startup(repeat):  # 测量导入界面模块和创建界面对象的耗时，取多次的最小值
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+    return [
+        {
+            "case": STARTUP_CASE,
+            "rows": 0,
+            "shape": STARTUP_CASE,
+            "file_bytes": 0,
+            "stage": stage,
+            "seconds": round(min(run[stage] for run in runs), 6),
+            "peak_bytes": 0,
+            "widget_calls": runs[0]["widget_calls"] if stage == "create_app" else 0,
+            "modules": runs[0]["modules"],
+        }
+        for stage in ("import", "create_app")
+    ]
+
+
+def check_startup(results, budget=json_editor_gui.STARTUP_BUDGET_SECONDS):
+    # 启动用例超出预算或导入了重量级模块时返回说明列表
+    startup = [r for r in results if r["case"] == STARTUP_CASE]
+    if not startup:
+        return []
+    problems = []
+    seconds = sum(r["seconds"] for r in startup)
+    if seconds > budget:
+        problems.append(f"startup: {seconds:.3f}s exceeds the budget of {budget:.3f}s")
+    if startup[0]["modules"]:
+        problems.append(f"startup: imports {', '.join(startup[0]['modules'])}")
+    return problems
+
+
+def environment():  # 结果中记录的运行环境
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline, time_tolerance, memory_tolerance):
+    # 与基线比较，返回超出容差的说明列表
+    base = {(r["case"], r["stage"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = base.get((result["case"], result["stage"]))
+        if old is None:
+            continue
+        label = f"{result['case']} {result['stage']}"
+        seconds, old_seconds = result["seconds"], old["seconds"]
+        if (
+            seconds > old_seconds * (1 + time_tolerance)
+            and seconds - old_seconds > MIN_SECONDS
+        ):
+            regressions.append(
+                f"{label}: {seconds:.4f}s vs baseline {old_seconds:.4f}s "
+                f"(+{(seconds / old_seconds - 1) * 100:.0f}%)"
+            )
+        peak, old_peak = result["peak_bytes"], old["peak_bytes"]
+        if peak > old_peak * (1 + memory_tolerance) and peak - old_peak > MIN_BYTES:
+            regressions.append(
+                f"{label}: peak {peak / 1048576:.1f} MB vs baseline "
+                f"{old_peak / 1048576:.1f} MB"
+            )
+    return regressions
+
+
+def print_results(results):  # 输出易读的结果表
+    print(f"{'case':<16}{'stage':<20}{'seconds':>10}{'peak MB':>10}{'widgets':>10}")
+    for r in results:
+        print(
+            f"{r['case']:<16}{r['stage']:<20}{r['seconds']:>10.4f}"
+            f"{r['peak_bytes'] / 1048576:>10.1f}{r['widget_calls']:>10}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the JSON editor hot paths")
+    parser.add_argument(
+        "--rows",
+        default=",".join(str(rows) for rows in DEFAULT_ROWS),
+        help="comma separated row counts",
+    )
+    parser.add_argument(
+        "--shapes", default=",".join(SHAPES), help="comma separated: flat,nested"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs per case")
+    parser.add_argument(
+        "--no-startup", action="store_true", help="skip the startup case"
+    )
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="compare against a previous results file")
+    parser.add_argument("--tolerance", type=float, default=TIME_TOLERANCE)
+    parser.add_argument("--memory-tolerance", type=float, default=MEMORY_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    results = [] if args.no_startup else run_startup(args.repeat)
+    with tempfile.TemporaryDirectory() as directory:
+        for shape in args.shapes.split(","):
+            for rows in (int(rows) for rows in args.rows.split(",")):
+                results.extend(run_case(rows, shape, args.repeat, directory))
+                print(f"finished {shape}-{rows}", file=sys.stderr)
+    print_results(results)
+    problems = check_startup(results)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(
+                {"environment": environment(), "results": results}, file, indent=4
+            )
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        regressions = compare(
+            results, baseline, args.tolerance, args.memory_tolerance
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print("No regressions against the baseline")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":  # 主程序入口
+    sys.exit(main())
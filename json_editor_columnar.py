@@ -0,0 +1,186 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+
+import json  # 导入json模块，用于处理JSON数据
+import os
+
+from json_editor_lazy import pandas as pd  # 首次使用时才导入pandas，缩短启动时间
+
+import json_editor_io  # 导入流式读写辅助模块
+import json_editor_schema  # 导入模式缓存模块
+import json_editor_types  # 导入列类型与存储类型模块
+
+FILE_FORMATS = {  # 扩展名 -> 列式格式
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+}
+TYPES_METADATA_KEY = b"json_editor.column_types"  # 模式元数据中保存列类型的键
+
+
+def file_format(file_path):  # 文件的列式格式，不是列式文件时返回None
+    return FILE_FORMATS.get(os.path.splitext(file_path)[1].lower())
+
+
+def require_pyarrow(fmt):  # Parquet和Arrow读写需要pyarrow
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError(f"pyarrow is required to read and write {fmt} files")
+
+
+def arrow_column_type(arrow_type):  # Arrow类型对应的列类型，无法对应时返回None
+    import pyarrow as pa
+
+    if pa.types.is_dictionary(arrow_type):
+        arrow_type = arrow_type.value_type
+    if pa.types.is_boolean(arrow_type):
+        return "bool"
+    if pa.types.is_integer(arrow_type):
+        return "int"
+    if pa.types.is_floating(arrow_type) or pa.types.is_decimal(arrow_type):
+        return "float"
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return "string"
+    return None
+
+
+def schema_column_types(schema):  # 从模式读取列类型：优先使用保存时写入的元数据
+    stored = {}
+    if schema.metadata and TYPES_METADATA_KEY in schema.metadata:
+        stored = json.loads(schema.metadata[TYPES_METADATA_KEY])
+    column_types = {}
+    for field in schema:
+        col_type = stored.get(field.name) or arrow_column_type(field.type)
+        if col_type is not None:
+            column_types[field.name] = col_type
+    return column_types
+
+
+def pandas_dtype(arrow_type):  # 转换为数据框时直接使用紧凑的存储类型
+    import pyarrow as pa
+
+    if pa.types.is_dictionary(arrow_type):
+        return None  # 字典编码的列由pyarrow转换为分类类型
+    col_type = arrow_column_type(arrow_type)
+    if col_type is None or pa.types.is_decimal(arrow_type):
+        return None
+    return pd.api.types.pandas_dtype(json_editor_types.storage_dtype(col_type))
+
+
+def frame_schema(df, column_types):  # 按列类型生成Arrow模式，列类型写入元数据
+    import pyarrow as pa
+
+    arrow_types = {
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "bool": pa.bool_(),
+        "string": pa.string(),
+        "color": pa.string(),
+    }
+    fields = []
+    for col in df.columns:
+        arrow_type = arrow_types.get(column_types.get(col))
+        if arrow_type is None:  # 没有列类型的列由pyarrow推断
+            try:
+                arrow_type = pa.Schema.from_pandas(
+                    df[[col]], preserve_index=False
+                ).field(0).type
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                raise ValueError(f"Column {col} cannot be stored: {e}")
+        fields.append(pa.field(str(col), arrow_type))
+    types = {str(col): col_type for col, col_type in column_types.items()}
+    return pa.schema(fields, metadata={TYPES_METADATA_KEY: json.dumps(types)})
+
+
+def read_table(file_path, fmt):  # 内存映射读取Parquet或Arrow文件为Arrow表
+    require_pyarrow(fmt)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_table(file_path, memory_map=True)
+    import pyarrow.feather as feather
+
+    return feather.read_table(file_path, memory_map=True)  # Arrow IPC与Feather格式相同
+
+
+def load_columnar(file_path, progress=None, schema=None):
+    # 读取列式文件，返回(数据框, 列类型字典)；progress(已完成, 总数, 说明)
+    # schema为缓存的模式（json_editor_schema），CSV等没有类型信息的文件直接使用
+    fmt = file_format(file_path)
+    if progress is not None:
+        progress(0, 2, f"Reading {fmt}...")
+    if fmt == "csv":
+        try:
+            df = pd.read_csv(file_path, engine="pyarrow")  # 多线程解析
+        except ImportError:
+            df = pd.read_csv(file_path)
+        column_types = {}
+    else:
+        table = read_table(file_path, fmt)
+        import pyarrow as pa
+
+        column_types = schema_column_types(table.schema)
+        if progress is not None:
+            progress(1, 2, "Converting columns...")
+        df = table.to_pandas(types_mapper=pandas_dtype)
+        for i, field in enumerate(table.schema):
+            if pa.types.is_nested(field.type):  # 列表/对象还原为Python值，与JSON一致
+                df[field.name] = pd.Series(
+                    table.column(i).to_pylist(), index=df.index, dtype=object
+                )
+    if progress is not None:
+        progress(2, 2, "Compacting columns...")
+    if schema is not None:
+        df = json_editor_schema.cast_chunk(df, schema)
+    return json_editor_types.compact_frame(df, column_types, schema)
+
+
+def save_columnar(
+    file_path,
+    df,
+    column_types,
+    chunk_rows=json_editor_io.WRITE_CHUNK_ROWS * 25,
+    progress=None,
+):
+    # 分块、原子地把数据框保存为列式文件；progress(已写行数, 总行数)
+    fmt = file_format(file_path)
+    row_count = len(df)
+    if fmt == "csv":
+
+        def write(file):
+            for start in range(0, max(row_count, 1), chunk_rows):
+                chunk = df.iloc[start : start + chunk_rows]
+                chunk.to_csv(file, index=False, header=start == 0)
+                if progress is not None:
+                    progress(start + len(chunk), row_count)
+
+        return json_editor_io.atomic_write(file_path, write)
+
+    require_pyarrow(fmt)
+    import pyarrow as pa
+
+    schema = frame_schema(df, column_types)
+
+    def write(file):
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            writer = pq.ParquetWriter(file, schema)
+        else:
+            writer = pa.ipc.new_file(file, schema)
+        with writer:
+            for start in range(0, row_count, chunk_rows):
+                chunk = df.iloc[start : start + chunk_rows]
+                writer.write_table(
+                    pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+                )  # 每块成为一个行组/记录批
+                if progress is not None:
+                    progress(start + len(chunk), row_count)
+            if row_count == 0:
+                writer.write_table(schema.empty_table())
+
+    json_editor_io.atomic_write(file_path, write, binary=True)
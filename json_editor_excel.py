@@ -0,0 +1,146 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+
+import os
+import threading
+
+from json_editor_lazy import numpy as np  # 首次使用时才导入numpy，缩短启动时间
+from json_editor_lazy import pandas as pd  # 首次使用时才导入pandas，缩短启动时间
+
+PROGRESS_ROWS = 5000  # 读取多少行报告一次进度
+
+
+def header_name(value, position):  # 表头单元格的列名，空单元格使用pandas的默认名
+    if value is None or str(value).strip() == "":
+        return f"Unnamed: {position}"
+    return str(value)
+
+
+class WorkbookCache:  # 按路径和修改时间缓存只读打开的工作簿，只在需要时解析单元格
+    def __init__(self):
+        self.lock = threading.Lock()  # 工作簿在后台线程中使用，同一时间只允许一个读取
+        self.path = None
+        self.stamp = None  # (修改时间, 大小)
+        self.workbook = None  # openpyxl只读工作簿，.xls文件为pd.ExcelFile
+        self.headers = {}  # 工作表名 -> 表头列名
+
+    def open(self, path):  # 获取工作簿，文件变化后重新打开（调用者需持有锁）
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if self.workbook is None or self.path != path or self.stamp != stamp:
+            self.close_workbook()
+            if path.lower().endswith(".xls"):  # openpyxl不支持旧格式
+                self.workbook = pd.ExcelFile(path)
+            else:
+                from openpyxl import load_workbook
+
+                self.workbook = load_workbook(path, read_only=True, data_only=True)
+            self.path, self.stamp = path, stamp
+        return self.workbook
+
+    def close_workbook(self):  # 关闭缓存的工作簿
+        if self.workbook is not None:
+            self.workbook.close()
+        self.workbook = None
+        self.path = self.stamp = None
+        self.headers = {}
+
+    def close(self):
+        with self.lock:
+            self.close_workbook()
+
+    def sheet_names(self, path):  # 工作表名，只读取工作簿目录，不解析单元格
+        with self.lock:
+            workbook = self.open(path)
+            if isinstance(workbook, pd.ExcelFile):
+                return list(workbook.sheet_names)
+            return list(workbook.sheetnames)
+
+    def header(self, path, sheet_name):  # 工作表第一行的列名
+        with self.lock:
+            return list(self.get_header(path, sheet_name))
+
+    def get_header(self, path, sheet_name):  # 读取并缓存表头（调用者需持有锁）
+        workbook = self.open(path)
+        if sheet_name not in self.headers:
+            if isinstance(workbook, pd.ExcelFile):
+                columns = workbook.parse(sheet_name, nrows=0).columns
+                self.headers[sheet_name] = [str(col) for col in columns]
+            else:
+                rows = workbook[sheet_name].iter_rows(max_row=1, values_only=True)
+                first_row = next(rows, ())
+                self.headers[sheet_name] = [
+                    header_name(value, i) for i, value in enumerate(first_row)
+                ]
+        return self.headers[sheet_name]
+
+    def read_columns(self, path, sheet_name, columns, progress=None):
+        # 只读取指定的列（按表头名），返回数据框；progress(已读行数, 总行数)
+        with self.lock:
+            header = self.get_header(path, sheet_name)
+            missing = [col for col in columns if col not in header]
+            if missing:
+                raise KeyError(f"Columns not found in sheet: {', '.join(missing)}")
+            positions = [header.index(col) for col in columns]
+            workbook = self.open(path)
+            if isinstance(workbook, pd.ExcelFile):
+                used = sorted(set(positions))  # parse按工作表中的顺序返回列
+                data = workbook.parse(sheet_name, usecols=used)
+                data.columns = [header[i] for i in used]
+                return data[columns]
+            sheet = workbook[sheet_name]
+            total = max((sheet.max_row or 1) - 1, 0)
+            first, last = min(positions), max(positions)
+            values = [[] for _ in columns]
+            offsets = [position - first for position in positions]
+            rows = sheet.iter_rows(
+                min_row=2, min_col=first + 1, max_col=last + 1, values_only=True
+            )  # 只解析所需列所在的范围
+            for count, row in enumerate(rows, 1):
+                for column_values, offset in zip(values, offsets):
+                    column_values.append(row[offset] if offset < len(row) else None)
+                if progress is not None and count % PROGRESS_ROWS == 0:
+                    progress(count, total)
+        data = pd.DataFrame(dict(zip(range(len(columns)), values)))
+        data.columns = columns
+        return data
+
+
+def normalize_keys(values):  # 连接键统一为去掉两端空白的文本，整数值的浮点数（如 12.0）去掉小数
+    text = pd.Series(values).astype("string").str.strip()
+    text = text.str.replace(r"^(-?\d+)\.0+$", r"\1", regex=True)
+    return text.mask(text.eq(""))  # 空键不参与连接
+
+
+def hash_join(json_keys, excel_keys):
+    # 用哈希表按键连接，返回(每个JSON行对应的Excel行号（-1表示未匹配）,
+    # 未匹配的JSON行号, 未匹配的Excel行号, 重复的Excel行号)
+    json_keys = normalize_keys(json_keys)
+    excel_keys = normalize_keys(excel_keys)
+    valid = excel_keys.notna().to_numpy()
+    duplicated = excel_keys.duplicated(keep="first").to_numpy() & valid
+    usable = np.flatnonzero(valid & ~duplicated)  # 重复的键只使用第一次出现的行
+    lookup = pd.Index(excel_keys.iloc[usable])  # 键 -> 位置的哈希表
+    found = lookup.get_indexer(json_keys)
+    positions = np.where(found >= 0, usable[found], -1)
+    matched = np.zeros(len(excel_keys), dtype=bool)
+    matched[positions[positions >= 0]] = True
+    return (
+        positions,
+        np.flatnonzero(positions < 0),
+        usable[~matched[usable]],
+        np.flatnonzero(duplicated),
+    )
+
+
+def take_rows(values, positions, existing=None):
+    # 按行号取Excel列的值，未匹配的行保留existing中的原值（没有时为缺失值）
+    values = np.asarray(values, dtype=object)
+    result = np.full(len(positions), None, dtype=object)
+    matched = positions >= 0
+    result[matched] = values[positions[matched]]
+    if existing is not None:
+        result[~matched] = np.asarray(existing, dtype=object)[~matched]
+    return result
@@ -0,0 +1,212 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+
+# 计算列：用pandas表达式对整列向量化计算，例如
+#   population * 1.1
+#   `name.en` + "-" + city
+# 列名含空格或点时用反引号括起来；安装了numexpr时pandas自动用它计算数值表达式
+# pandas.eval不支持的字符串拼接等运算改为直接对列（Series）求值，同样是整列向量化计算
+# 可选的行条件（例如 population > 1000）为假的行保留原值
+
+import ast
+import re
+
+from json_editor_lazy import numpy as np  # 首次使用时才导入numpy，缩短启动时间
+from json_editor_lazy import pandas as pd  # 首次使用时才导入pandas，缩短启动时间
+
+import json_editor_types  # 导入列类型与存储类型模块
+
+
+class FormulaError(Exception):  # 表达式或行条件无效
+    pass
+
+
+BACKTICK_PATTERN = re.compile(r"`([^`]*)`")  # 反引号括起来的列名
+FUNCTIONS = {  # 可以直接调用的数学函数（pandas.eval支持的函数）
+    "abs": "absolute",
+    "sqrt": "sqrt",
+    "exp": "exp",
+    "log": "log",
+    "log10": "log10",
+    "sin": "sin",
+    "cos": "cos",
+    "tan": "tan",
+}
+SERIES_METHODS = {  # 可以在列上调用的方法，都不会修改数据或访问文件
+    "abs",
+    "astype",
+    "between",
+    "clip",
+    "fillna",
+    "isin",
+    "isna",
+    "notna",
+    "round",
+}
+STR_METHODS = {  # 可以在.str上调用的方法
+    "capitalize",
+    "cat",
+    "contains",
+    "endswith",
+    "len",
+    "lower",
+    "lstrip",
+    "pad",
+    "replace",
+    "rstrip",
+    "slice",
+    "startswith",
+    "strip",
+    "title",
+    "upper",
+    "zfill",
+}
+ALLOWED_NODES = (  # 表达式中允许的语法
+    ast.Expression,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.BoolOp,
+    ast.Compare,
+    ast.Name,
+    ast.Constant,
+    ast.Load,
+    ast.Call,
+    ast.Attribute,
+    ast.keyword,
+    ast.List,
+    ast.Tuple,
+    ast.operator,
+    ast.unaryop,
+    ast.boolop,
+    ast.cmpop,
+)
+
+
+def parse_expression(df, expression):
+    # 检查表达式的语法（在求值之前），返回(语法树, {标识符: 列名})
+    # 只允许运算、列名、常量和白名单中的函数与方法，避免表达式写文件或修改数据
+    columns = {}
+
+    def replace(match):  # 反引号列名替换为合法的标识符
+        name = f"col{len(columns)}_"
+        columns[name] = match.group(1)
+        return name
+
+    try:
+        tree = ast.parse(BACKTICK_PATTERN.sub(replace, expression).strip(), mode="eval")
+    except SyntaxError as e:
+        raise FormulaError(f"Invalid expression {expression!r}: {e.msg}") from e
+    functions = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_NODES):
+            raise FormulaError(
+                f"Unsupported syntax {type(node).__name__} in {expression!r}"
+            )
+        if isinstance(node, ast.Call):
+            func = node.func
+            if isinstance(func, ast.Name) and func.id in FUNCTIONS:
+                functions.add(func.id)
+            elif not (
+                isinstance(func, ast.Attribute)
+                and (
+                    func.attr in SERIES_METHODS
+                    or func.attr in STR_METHODS
+                    and isinstance(func.value, ast.Attribute)
+                    and func.value.attr == "str"
+                )
+            ):
+                raise FormulaError(f"Unsupported function call in {expression!r}")
+        elif isinstance(node, ast.Attribute) and not (
+            node.attr == "str" or node.attr in SERIES_METHODS or node.attr in STR_METHODS
+        ):
+            raise FormulaError(f"Unsupported attribute .{node.attr} in {expression!r}")
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id not in functions:
+            col = columns.get(node.id, node.id)
+            if col not in df.columns:
+                raise FormulaError(f"Column not found: {col}")
+    return tree, columns
+
+
+def evaluate_series(df, tree, columns):
+    # 直接对列求值（pandas.eval不支持的字符串拼接等），语法树已由parse_expression检查
+    namespace = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id not in namespace:
+            if node.id in FUNCTIONS and node.id not in df.columns:
+                namespace[node.id] = getattr(np, FUNCTIONS[node.id])
+                continue
+            series = df[columns.get(node.id, node.id)]
+            if isinstance(series.dtype, pd.CategoricalDtype):  # 分类列不支持拼接
+                series = series.astype(json_editor_types.STRING_DTYPE)
+            namespace[node.id] = series
+    return eval(compile(tree, "<formula>", "eval"), {"__builtins__": {}}, namespace)
+
+
+def evaluate(df, expression):  # 计算表达式，返回与数据框行对齐的Series
+    if not expression.strip():
+        raise FormulaError("Expression is empty")
+    tree, columns = parse_expression(df, expression)
+    try:
+        try:
+            values = df.eval(expression)
+        except TypeError:  # 例如字符串与常量拼接
+            values = evaluate_series(df, tree, columns)
+    except Exception as e:  # pandas对运算错误、类型不符等抛出各种异常
+        raise FormulaError(f"Invalid expression {expression!r}: {e}") from e
+    if isinstance(values, pd.Series):
+        if not values.index.equals(df.index):
+            raise FormulaError(f"Expression must produce one value per row: {expression!r}")
+        return values
+    if isinstance(values, (bool, int, float, str, np.generic)):  # 常量表达式
+        return pd.Series(values, index=df.index)
+    raise FormulaError(f"Expression must produce one value per row: {expression!r}")
+
+
+def row_mask(df, where):  # 行条件为真的行，没有条件时返回None；缺失值视为假
+    if not where or not where.strip():
+        return None
+    mask = evaluate(df, where)
+    if not pd.api.types.is_bool_dtype(mask.dtype):
+        raise FormulaError(f"Row condition must be true or false: {where!r}")
+    return mask.to_numpy(dtype=bool, na_value=False)
+
+
+def compute_column(df, col, col_type, expression, where=None, strict=False):
+    # 计算列的新值（工作线程），返回(按列类型存储的列, 列类型, 无法转换的行号数组)
+    # col_type为None时按结果推断；strict时有结果无法转换为列类型就抛出FormulaError而不是清除
+    values = evaluate(df, expression)
+    mask = row_mask(df, where)
+    if col_type is None:
+        col_type = json_editor_types.infer_column_type(values) or "string"
+    if mask is not None and col_type == "string":  # 合并后再决定是否转换为分类类型
+        converted = values.astype("string")
+        bad = np.empty(0, dtype=np.int64)
+    else:
+        converted, bad = json_editor_types.convert_column(values, col_type)
+    if strict and len(bad) and (mask is None or mask[bad].any()):
+        rows = bad if mask is None else bad[mask[bad]]
+        raise FormulaError(
+            f"{len(rows)} results cannot be stored as {col_type}, choose a column type "
+            f"(rows: {json_editor_types.format_error_rows(rows)})"
+        )
+    if mask is None:
+        return converted, col_type, bad
+    dtype = json_editor_types.storage_dtype(col_type)
+    if col in df.columns:  # 不满足条件的行必须能原样保留为新类型，否则不修改
+        base, base_bad = json_editor_types.convert_column(df[col], col_type)
+        base_bad = base_bad[~mask[base_bad]]
+        if len(base_bad):
+            raise FormulaError(
+                f"{len(base_bad)} rows outside the condition cannot be stored as "
+                f"{col_type}, change the column type first "
+                f"(rows: {json_editor_types.format_error_rows(base_bad)})"
+            )
+    else:
+        base = pd.Series(pd.NA, index=df.index)
+    result = base.astype(dtype).where(~mask, converted.astype(dtype))
+    if col_type == "string":
+        result = json_editor_types.maybe_categorize(result)
+    return result, col_type, bad[mask[bad]] if len(bad) else np.empty(0, np.int64)
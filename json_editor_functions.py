@@ -4,78 +4,1095 @@
 # Copyright (c) 2024 zhang kang All rights reserved.
 
 import json  # 导入json模块，用于处理JSON数据
-import pandas as pd  # 导入pandas库，用于数据处理
+from json_editor_lazy import numpy as np  # 首次使用时才导入numpy，缩短启动时间
+from json_editor_lazy import pandas as pd  # 首次使用时才导入pandas，缩短启动时间
 import sys
 import os
 import platform  # 导入platform模块，用于检测操作系统
 import subprocess
-import dearpygui.dearpygui as dpg  # 导入Dear PyGui库，用于创建图形用户界面
+import time
+try:  # 无界面批处理时可以不安装Dear PyGui
+    import dearpygui.dearpygui as dpg  # 导入Dear PyGui库，用于创建图形用户界面
+except ImportError:
+    dpg = None
+import json_editor_columnar  # 导入CSV/Parquet/Arrow读写模块
+import json_editor_excel  # 导入Excel工作簿缓存模块
+import json_editor_formula  # 导入计算列模块
+import json_editor_history  # 导入撤销历史模块
+import json_editor_index  # 导入查找索引模块
+import json_editor_io  # 导入流式读写辅助模块
+import json_editor_profile  # 导入耗时记录模块
+import json_editor_schema  # 导入模式缓存模块
+import json_editor_tasks  # 导入后台任务模块
+import json_editor_types  # 导入列类型与存储类型模块
+import json_editor_workspace  # 导入多文档工作区模块
+
+
+DEBUG_REFRESH_SECONDS = 0.5  # 性能分析窗口的刷新间隔
 
 
 class JsonEditorFunctions:  # 定义JsonEditorFunctions类
-    def __init__(self, dpg_instance):  # 初始化函数
+    document_state = json_editor_workspace.DOCUMENT_STATE  # 切换文档时保存和恢复的属性
+
+    def __init__(self, dpg_instance=None):  # 初始化函数，dpg_instance为None时无界面运行
         self.df = None  # 数据框
         self.file_path = ""  # 文件路径
         self.dpg = dpg_instance  # Dear PyGui实例
         self.column_types = {}  # 列类型字典
-
-    def open_json(self, file_path):  # 打开JSON文件函数
-        if file_path:
+        self.streaming_load_threshold = 16 * 1024 * 1024  # 超过该大小的文件使用流式读取
+        self.progressive_open_bytes = 4 * 1024 * 1024  # 超过该大小的文件先显示第一页
+        self.preview_document = None  # 正在渐进打开、只显示了部分数据的文档
+        self.json_indent = 4  # 保存JSON时的缩进
+        self.schema_on_open = dpg_instance is not None  # 无界面运行（批处理）时打开文件不写模式缓存
+        self.index_color_differentiation = False  # 索引颜色区分，界面设置中开启
+        self.background_convert_rows = 100000  # 超过该行数的列在后台转换类型
+        self.journal = None  # 编辑日志
+        self.source_spans = None  # 每条原始记录在文件中的字节范围
+        self.source_indent = json_editor_io.UNKNOWN_INDENT  # 文件中记录的缩进，与保存的缩进相同时才增量保存
+        self.row_origin = None  # 每行对应的原始记录编号，-1表示新增
+        self.row_dirty = None  # 每行是否已修改，保存时需重新序列化
+        self.jsonl = None  # 打开的JSON Lines文件（内存映射）
+        self.tasks = None  # 后台任务执行器，界面类创建
+        self.data_index = json_editor_index.DataIndex()  # 查找用的列索引
+        self.filter_rows = None  # 查找匹配的行，None表示不过滤
+        self.sort_cache = json_editor_index.SortCache()  # 缓存的排序结果
+        self.sort_keys = []  # 排序键 [(列名, 是否升序)]，第一个为主键
+        self.history = json_editor_history.EditHistory()  # 撤销/重做历史
+        self.view_rows = None  # 表格按顺序显示的行，None表示全部行
+        self.excel_cache = json_editor_excel.WorkbookCache()  # 导入对话框使用的工作簿
+        self.messages = []  # 无界面时收集的消息
+        self.pending_color = None  # 颜色选择器拖动时尚未应用的(行, 列, 颜色)
+        self.pending_recovery = None  # 等待用户选择是否恢复的未保存编辑
+        self.color_picker_history = None  # 颜色选择器打开期间合并撤销的历史
+        self.debug_refresh_time = 0.0  # 性能分析窗口上次刷新的时间
+        self.workspace = json_editor_workspace.Workspace()  # 打开的文档（标签）
+
+    def open_json(self, file_path, streaming=None):  # 打开JSON文件函数
+        document = self.workspace.find(file_path) if file_path else None
+        if document is not None:  # 已经打开的文件切换到其标签
+            self.switch_document(document)
+        elif file_path:
+            progressive = self.is_progressive_open(file_path)
+            self.run_task(
+                "Opening JSON",
+                lambda task: self.load_json_file(file_path, streaming, task, progressive),
+                lambda result: self.finish_open_json(file_path, *result),
+                "Failed to open JSON file",
+                on_update=lambda preview: self.show_preview(file_path, *preview),
+                on_failed=self.discard_preview,
+            )  # 在后台读取，完成后回到界面线程
+
+    def is_progressive_open(self, file_path):  # 是否先显示第一页再在后台读取其余记录
+        if json_editor_columnar.file_format(file_path):
+            return False  # 列式文件内存映射读取，本身很快
+        try:
+            return os.path.getsize(file_path) >= self.progressive_open_bytes
+        except OSError:
+            return False
+
+    def preview_reporter(self, task, schema=None):  # 工作线程：把已读取的部分数据交给show_preview
+        preview_types = {}
+
+        def report(df):
+            if not preview_types:  # 使用缓存的列类型，没有时按第一页推断，之后的部分数据沿用
+                if schema is not None:
+                    preview_types.update(json_editor_schema.schema_column_types(schema))
+                else:
+                    preview_types.update(json_editor_types.compact_frame(df)[1])
+            task.update((df, dict(preview_types)))
+
+        return report
+
+    @json_editor_profile.timed
+    def load_json_file(self, file_path, streaming, task, progressive=False):
+        # 读取JSON文件（工作线程），progressive时先交出第一页
+        schema = json_editor_schema.load_schema(file_path)  # 与文件内容匹配的缓存模式
+        preview = self.preview_reporter(task, schema) if progressive else None
+        convert = None
+        if schema is not None:  # 每块数据直接转换为缓存的存储类型
+            convert = lambda frame: json_editor_schema.cast_chunk(frame, schema)
+        if json_editor_columnar.file_format(file_path):  # 列式文件直接读取为数据框
+            df, column_types = json_editor_columnar.load_columnar(
+                file_path, progress=task.report, schema=schema
+            )
+            if self.schema_on_open:
+                self.save_schema(file_path, df, column_types)
+            return df, None, column_types, None
+        lines = None
+        if file_path.lower().endswith(".jsonl"):  # JSON Lines：建立行索引后分块解析
+            if preview is not None:  # 建立行索引前先显示开头的记录
+                head = json_editor_io.read_json_lines_head(
+                    file_path, json_editor_io.PREVIEW_RECORDS
+                )
+                preview(pd.json_normalize(head))
+            lines = json_editor_io.JsonLinesFile(file_path)
             try:
-                with open(file_path, "r", encoding="utf-8") as file:  # 打开JSON文件
+                df = lines.load_frame(
+                    progress=lambda records, done, total: task.report(
+                        done, total, f"Loading JSON Lines... {records} records"
+                    ),
+                    preview=preview,
+                    preview_records=json_editor_io.PREVIEW_RECORDS * 2,
+                    convert=convert,
+                )
+            except BaseException:
+                lines.close()
+                raise
+            spans = lines.spans
+            streaming = False
+        elif streaming is None:  # 未指定时根据文件大小选择读取方式
+            streaming = (
+                preview is not None
+                or os.path.getsize(file_path) >= self.streaming_load_threshold
+            ) and json_editor_io.is_json_array_file(file_path)
+        if streaming:
+            df, spans = json_editor_io.load_json_streaming(
+                file_path,
+                progress=lambda records, done, total: task.report(
+                    done, total, f"Loading JSON... {records} records"
+                ),
+                with_spans=True,
+                preview=preview,
+                convert=convert,
+            )  # 流式读取并分块规范化JSON数组
+        elif lines is None:
+            with open(file_path, "r", encoding="utf-8") as file:  # 打开JSON文件
+                with json_editor_profile.span("json.load"):
                     data = json.load(file)  # 读取JSON数据
-                self.df = pd.json_normalize(data)  # 规范化JSON数据为数据框
-                self.file_path = file_path  # 设置文件路径
-                self.update_table()  # 更新表格
-                self.dpg.configure_item(
-                    self.save_menu_item, enabled=True
-                )  # 启用保存菜单项
+            task.report(1, 2, "Normalizing JSON...")
+            with json_editor_profile.span("json_normalize"):
+                df, spans = pd.json_normalize(data), None  # 规范化JSON数据为数据框
+            if convert is not None:
+                df = convert(df)
+        task.report(1, 1, "Compacting columns...")
+        with json_editor_profile.span("compact_frame"):
+            df, column_types = json_editor_types.compact_frame(
+                df, schema=schema
+            )  # 推断缓存中没有的列类型并压缩存储
+        if self.schema_on_open:
+            self.save_schema(file_path, df, column_types)
+        return df, spans, column_types, lines
+
+    @json_editor_profile.timed
+    def save_schema(self, file_path, df, column_types):  # 缓存文件的模式，下次打开时跳过推断（工作线程）
+        json_editor_schema.save_schema(
+            file_path, json_editor_schema.describe_frame(df, column_types)
+        )
+
+    def finish_open_json(self, file_path, df, spans, column_types, lines=None):
+        # 显示读取的数据（界面线程）
+        try:
+            if self.preview_document is not None:  # 用完整数据替换预览
+                self.workspace.remove(self.preview_document)
+                self.preview_document = None
+            self.stash_document()  # 之前的文档保留在其标签中
+            self.set_data(file_path, df, spans, column_types, lines)
+            self.workspace.add(file_path)
+            self.update_table()  # 更新表格
+            recovered = self.start_journal()  # 重放未保存的编辑并开始记录
+            self.update_document_tabs()  # 显示标签并启用保存菜单项
+            self.spill_documents()
+            if recovered:
+                self.show_message(
+                    f"File opened successfully, recovered {recovered} unsaved edits"
+                )  # 显示恢复编辑的消息
+            else:
                 self.show_message("File opened successfully")  # 显示文件打开成功消息
+        except Exception as e:
+            self.show_message(
+                f"Failed to open JSON file: {e}"
+            )  # 显示文件打开失败消息
+
+    @json_editor_profile.timed
+    def set_data(self, file_path, df, spans, column_types, lines=None):
+        # 替换当前文件的数据并重置索引、排序和历史
+        self.close_journal()  # 关闭上一个文件的编辑日志
+        if self.jsonl is not None:
+            self.jsonl.close()  # 解除上一个JSON Lines文件的映射
+        self.jsonl = lines
+        self.df = df
+        self.column_types = column_types  # 列类型决定存储类型
+        self.file_path = file_path  # 设置文件路径
+        self.set_source_spans(spans, json_editor_io.record_indent(file_path, spans))
+        self.data_index = json_editor_index.DataIndex()  # 索引在首次查找时构建
+        self.filter_rows = None
+        self.sort_cache = json_editor_index.SortCache()
+        self.sort_keys = []
+        self.history = json_editor_history.EditHistory(self.history.memory_limit)
+        self.update_view()
+
+    def show_preview(self, file_path, df, column_types):
+        # 显示已读取的部分数据（界面线程），读取完成前后台任务锁定数据，不能编辑
+        if self.preview_document is None:  # 第一页：之前的文档保留在其标签中
+            self.stash_document()
+            self.set_data(file_path, df, None, column_types)
+            self.preview_document = self.workspace.add(file_path)
+            self.update_table()
+            self.update_document_tabs()
+            return
+        old_columns, old_length = self.df.columns, len(self.df)
+        self.df = df
+        self.column_types = column_types
+        if df.columns.equals(old_columns):
+            self.patch_rows_appended(len(df) - old_length)  # 新读取的行追加到表格末尾
+        else:
+            self.update_table()
+
+    def discard_preview(self):  # 打开失败或取消时关闭只显示了部分数据的文档
+        document, self.preview_document = self.preview_document, None
+        if document is not None and document in self.workspace.documents:
+            self.close_document(document)
+
+    def clear_document(self):  # 编辑器回到没有打开文件的状态（日志和映射由调用者处理）
+        self.journal = None
+        self.jsonl = None
+        self.df = None
+        self.file_path = ""
+        self.column_types = {}
+        self.set_source_spans(None)
+        self.data_index = json_editor_index.DataIndex()
+        self.filter_rows = None
+        self.sort_cache = json_editor_index.SortCache()
+        self.sort_keys = []
+        self.history = json_editor_history.EditHistory(self.history.memory_limit)
+        self.view_rows = None
+
+    def stash_document(self):  # 活动文档成为非活动标签，编辑器回到无数据状态
+        if self.workspace.active is None:
+            return
+        self.workspace.deactivate(
+            {name: getattr(self, name) for name in self.document_state}
+        )
+        self.clear_document()
+
+    def switch_document(self, document):  # 切换到另一个打开的文档
+        if document is self.workspace.active or self.is_data_locked():
+            return
+        self.stash_document()
+        if document.spill is None:  # 数据仍在内存中
+            self.finish_switch_document(document, None)
+            return
+        spill = document.spill
+        self.run_task(
+            "Loading document",
+            lambda task: json_editor_workspace.read_spill(spill),
+            lambda df: self.finish_switch_document(document, df),
+            "Failed to load document",
+        )  # 从磁盘缓存读回
+
+    def finish_switch_document(self, document, df):  # 恢复文档的属性并显示（界面线程）
+        for name, value in self.workspace.activate(document, df).items():
+            setattr(self, name, value)
+        self.update_table()
+        self.update_document_tabs()
+        self.spill_documents()
+
+    def close_document(self, document=None):  # 关闭文档（默认为活动文档），未保存的编辑保留在日志中
+        document = document or self.workspace.active
+        if document is None or self.is_data_locked():
+            return
+        if document is self.workspace.active:
+            self.close_journal()
+            if self.jsonl is not None:
+                self.jsonl.close()
+            self.workspace.remove(document)
+            self.clear_document()
+            self.update_table()
+            recent = self.workspace.recent()
+            if recent is not None:
+                self.switch_document(recent)
+        else:
+            state = self.workspace.remove(document)
+            if state["journal"] is not None:
+                state["journal"].close()
+            if state["jsonl"] is not None:
+                state["jsonl"].close()
+        self.update_document_tabs()
+
+    def close_workspace(self):  # 退出时关闭非活动文档的日志和映射，删除磁盘缓存
+        for document in self.workspace.documents:
+            if document.state is not None:
+                for name in ("journal", "jsonl"):
+                    if document.state[name] is not None:
+                        document.state[name].close()
+        self.workspace.close()
+
+    def spill_documents(self):  # 超出内存预算时在后台把最久未使用的非活动文档写入磁盘缓存
+        active_bytes = json_editor_workspace.frame_bytes(self.df)
+        for document in self.workspace.spill_candidates(active_bytes):
+            document.spilling = True
+            # 浅拷贝（写时复制）：激活后原地修改数据框不会影响正在写入的数据
+            df = document.state["df"].copy(deep=False)
+            path, generation = self.workspace.spill_path(document), document.generation
+            self.run_quiet_task(
+                json_editor_tasks.BackgroundTask("Caching document", locks_data=False),
+                lambda task, df=df, path=path: json_editor_workspace.write_spill(df, path),
+                lambda spill, document=document, generation=generation: (
+                    self.workspace.finish_spill(document, spill, generation)
+                ),
+                lambda error, document=document, path=path: self.spill_failed(
+                    document, path
+                ),
+            )
+
+    def spill_failed(self, document, path):  # 写入失败时删除不完整的缓存，数据留在内存中
+        document.spilling = False
+        json_editor_workspace.remove_spill({"path": path})
+
+    def run_quiet_task(self, task, work, on_done, on_error):
+        # 不显示进度窗口的后台任务，没有任务执行器时同步执行
+        if self.tasks is None:
+            try:
+                result = work(task)
             except Exception as e:
-                self.show_message(
-                    f"Failed to open JSON file: {e}"
-                )  # 显示文件打开失败消息
+                on_error(e)
+            else:
+                on_done(result)
+            return
+        self.tasks.submit(task, work, on_done, on_error)
 
     def save_json(self):  # 保存JSON文件函数
+        self.write_json(self.json_indent)
+
+    def save_json_compact(self):  # 以紧凑格式（无缩进）保存JSON文件函数
+        self.write_json(None)
+
+    def write_json(self, indent):  # 写入JSON文件函数
         if self.df is not None:
+            json_editor_types.remove_unused_categories(self.df)  # 界面线程中整理，不在写入时修改数据
+            self.run_task(
+                "Saving JSON",
+                lambda task: self.write_json_file(indent, task),
+                lambda result: self.finish_write_json(result, indent),
+                "Failed to save JSON file",
+            )
+
+    @json_editor_profile.timed
+    def write_json_file(self, indent, task):
+        # 写入JSON文件（工作线程），返回(记录的字节范围, 重新映射的JSON Lines文件)
+        progress = lambda done, total: task.report(
+            done, total, f"Saving JSON... {done}/{total} rows"
+        )
+        result = self.write_source_file(indent, progress)
+        self.save_schema(self.file_path, self.df, self.column_types)  # 保存用户设置的列类型
+        return result
+
+    def write_source_file(self, indent, progress):  # 按打开文件的格式写入（工作线程）
+        if self.jsonl is not None:
+            return self.write_jsonl_file(progress)
+        if json_editor_columnar.file_format(self.file_path):
+            json_editor_columnar.save_columnar(
+                self.file_path, self.df, self.column_types, progress=progress
+            )  # 列类型写入文件的模式
+            return None, None
+        if (
+            indent == self.source_indent  # 原有记录与新记录的格式一致
+            and self.row_origin is not None
+            and os.path.exists(self.file_path)
+        ):
+            return (
+                json_editor_io.save_json_incremental(
+                    self.file_path,
+                    self.df,
+                    self.file_path,
+                    self.source_spans,
+                    np.where(self.row_dirty, -1, self.row_origin),
+                    indent=indent,
+                    progress=progress,
+                ),
+                None,
+            )  # 复用未修改记录的原始字节
+        return (
+            json_editor_io.save_json_streaming(
+                self.file_path, self.df, indent=indent, progress=progress
+            ),
+            None,
+        )  # 分块写入临时文件后原子替换
+
+    def export_file(self, file_path):  # 把当前数据另存为副本，格式由扩展名决定
+        if self.df is not None and file_path:
+            self.run_task(
+                "Exporting",
+                lambda task: self.write_data_file(
+                    file_path,
+                    lambda done, total: task.report(
+                        done, total, f"Exporting... {done}/{total} rows"
+                    ),
+                ),
+                lambda result: self.show_message(f"Data exported to {file_path}"),
+                "Failed to export file",
+            )
+
+    @json_editor_profile.timed
+    def write_data_file(self, file_path, progress):  # 按扩展名写入文件（工作线程）
+        if json_editor_columnar.file_format(file_path):
+            json_editor_columnar.save_columnar(
+                file_path, self.df, self.column_types, progress=progress
+            )
+        else:
+            json_editor_io.save_json_streaming(
+                file_path,
+                self.df,
+                indent=self.json_indent,
+                progress=progress,
+                lines=file_path.lower().endswith(".jsonl"),
+            )
+
+    def write_jsonl_file(self, progress):  # 保存JSON Lines文件（工作线程）
+        dirty_rows = np.flatnonzero(self.row_dirty)
+        encoded = None
+        if len(self.df) == len(self.jsonl) and np.array_equal(
+            self.row_origin, np.arange(len(self.df))
+        ):  # 行的顺序没有变化时尝试只改写修改过的行
+            encoded = json_editor_io.dump_frame(self.df.iloc[dirty_rows], None)
+            if self.jsonl.rewrite_lines(dirty_rows, encoded):
+                return self.jsonl.spans, self.jsonl
+        json_editor_io.save_json_incremental(
+            self.file_path,
+            self.df,
+            self.file_path,
+            self.jsonl.spans,
+            np.where(self.row_dirty, -1, self.row_origin),
+            progress=progress,
+            lines=True,
+            before_replace=self.jsonl.close,  # 替换前解除原文件的映射
+            encoded=encoded,  # 已经序列化过的行直接写入
+        )  # 复制未修改的行，重新序列化其余行
+        lines = json_editor_io.JsonLinesFile(self.file_path)
+        return lines.spans, lines
+
+    def finish_write_json(self, result, indent):  # 保存完成（界面线程）
+        spans, lines = result
+        if lines is not None:
+            self.jsonl = lines
+        self.set_source_spans(spans, None if lines is not None else indent)
+        if self.journal is not None:
+            self.journal.start()  # 已保存的编辑无需再保留
+        self.show_message(
+            f"Edited JSON data saved to {self.file_path}"
+        )  # 显示文件保存成功消息
+
+    def run_task(
+        self,
+        label,
+        work,
+        on_done,
+        error_message,
+        locks_data=True,
+        on_update=None,
+        on_failed=None,
+    ):
+        # 在后台线程执行work(task)，完成后在界面线程调用on_done(结果)
+        # task.update(值)在界面线程调用on_update(值)；失败或取消时显示消息后调用on_failed()
+        task = json_editor_tasks.BackgroundTask(label, locks_data)
+
+        def on_error(e):
+            self.task_failed(error_message, e)
+            if on_failed is not None:
+                on_failed()
+
+        work, on_done = self.timed_task(label, work, on_done)
+        if self.tasks is None:  # 没有任务执行器时同步执行
+            task.on_update = on_update
             try:
-                edited_data = self.df.to_dict(orient="records")  # 将数据框转换为字典
-                with open(self.file_path, "w", encoding="utf-8") as file:  # 打开文件
-                    json.dump(
-                        edited_data, file, ensure_ascii=False, indent=4
-                    )  # 写入JSON数据
-                self.show_message(
-                    f"Edited JSON data saved to {self.file_path}"
-                )  # 显示文件保存成功消息
+                result = work(task)
             except Exception as e:
-                self.show_message(
-                    f"Failed to save JSON file: {e}"
-                )  # 显示文件保存失败消息
+                on_error(e)
+            else:
+                on_done(result)
+            return
+        if locks_data and self.is_data_locked():
+            return
+        self.tasks.submit(task, work, on_done, on_error, on_update)
+        self.show_progress_dialog()
+
+    def timed_task(self, label, work, on_done):  # 为后台任务及其完成回调记录耗时
+        def timed_work(task):
+            with json_editor_profile.span(label):
+                return work(task)
+
+        def timed_done(result):
+            with json_editor_profile.span(f"{label}: apply"):
+                on_done(result)
+
+        return timed_work, timed_done
+
+    def task_failed(self, error_message, error):  # 任务失败或取消时显示消息
+        if isinstance(error, json_editor_tasks.TaskCancelled):
+            self.show_message(f"{error}")
+        else:
+            self.show_message(f"{error_message}: {error}")
+
+    def is_data_locked(self):  # 后台任务读写数据期间禁止修改数据
+        if self.tasks is not None and self.tasks.is_data_locked():
+            self.show_message("Please wait until the current operation finishes")
+            return True
+        return False
+
+    def process_tasks(self):  # 每帧处理后台任务结果并刷新进度条
+        self.tasks.process_results()
+        if self.tasks.active:
+            task = self.tasks.active[0]
+            self.dpg.set_value("progress_text", task.text)
+            self.dpg.set_value("progress_bar", task.fraction)
+            self.dpg.configure_item(
+                "progress_bar", overlay=f"{int(task.fraction * 100)}%"
+            )
+        elif self.dpg.is_item_shown("progress_dialog"):
+            self.dpg.hide_item("progress_dialog")  # 所有任务完成后隐藏进度窗口
+
+    def show_progress_dialog(self):  # 显示进度窗口
+        self.dpg.set_value("progress_bar", 0.0)
+        self.dpg.show_item("progress_dialog")
+
+    def cancel_tasks(self):  # 取消正在运行的任务
+        for task in self.tasks.active:
+            task.cancel()
+
+    def set_source_spans(self, spans, indent=json_editor_io.UNKNOWN_INDENT):
+        # 记录每行在文件中的字节范围及记录的缩进，用于增量保存
+        self.source_spans = spans
+        self.source_indent = indent
+        self.row_origin = None if spans is None else np.arange(len(spans))
+        self.row_dirty = None if spans is None else np.zeros(len(spans), dtype=bool)
+
+    def start_journal(self):
+        # 开始记录编辑；有与文件匹配的未保存编辑时询问是否恢复（无界面时直接恢复）
+        # 返回已恢复的条数，等待用户选择时返回0
+        self.journal = json_editor_io.EditJournal(self.file_path)
+        edits = self.journal.read_pending()
+        if not edits:
+            self.journal.start()
+        elif self.dpg is None:
+            self.recover_journal(edits)
+            return len(edits)
+        else:
+            self.pending_recovery = edits  # 选择之前不记录编辑，模态窗口阻止其他操作
+            self.dpg.set_value(
+                "recover_journal_text",
+                self.texts[self.language]["recover_journal_prompt"].format(
+                    count=len(edits)
+                ),
+            )
+            self.dpg.show_item("recover_journal_dialog")
+        return 0
+
+    @json_editor_profile.timed
+    def recover_journal(self, edits):  # 重放未保存的编辑，之后的编辑追加到同一日志
+        journal, self.journal = self.journal, None  # 重放时不重复记录
+        for edit in edits:
+            self.apply_edit(edit)
+        self.journal = journal
+        self.journal.start(keep=True)
+
+    def choose_recovery(self, sender=None, app_data=None, user_data=None):
+        # 恢复对话框的按钮：user_data为True时重放未保存的编辑，否则删除日志
+        edits, self.pending_recovery = self.pending_recovery, None
+        self.dpg.hide_item("recover_journal_dialog")
+        if self.journal is None or edits is None:
+            return
+        if user_data:
+            self.recover_journal(edits)
+            self.show_message(f"Recovered {len(edits)} unsaved edits")
+        else:
+            self.journal.start()  # 删除旧日志
+            self.show_message("Unsaved edits discarded")
+
+    def close_journal(self):  # 关闭编辑日志
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def record_edit(self, edit, inverse=None):  # 追加一条编辑到日志，并记录其逆操作用于撤销
+        if self.journal is not None:
+            self.journal.append(edit)
+        if inverse is not None:
+            self.history.record(inverse)
+
+    def column_inverse(self, col):  # 恢复列当前状态的逆操作
+        if col not in self.df.columns:
+            return {"op": "remove_column", "col": col}
+        return {
+            "op": "restore_column",
+            "col": col,
+            "position": self.df.columns.get_loc(col),
+            "type": self.column_types.get(col),
+            "values": self.df[col].copy(),
+        }
+
+    def undo(self):  # 撤销上一步编辑
+        self.replay_history("undo")
+
+    def redo(self):  # 重做上一步撤销的编辑
+        self.replay_history("redo")
+
+    @json_editor_profile.timed
+    def replay_history(self, mode):  # 执行一步撤销或重做
+        if self.df is None or self.is_data_locked():
+            return
+        if self.history.in_group():  # 合并未结束时撤销会把逆操作混入这一组，先忽略
+            return
+        inverses = self.history.take(mode)
+        if inverses is None:
+            return
+        self.history.mode = mode  # 执行时产生的逆操作放入另一个栈
+        self.history.begin_group()
+        try:
+            for edit in inverses:
+                self.apply_edit(edit)
+        finally:
+            self.history.end_group()
+            self.history.mode = None
+
+    def mark_rows_dirty(self, index=None):  # 标记行已修改，保存时需重新序列化
+        if self.row_dirty is not None:
+            if index is None:
+                self.row_dirty[:] = True  # 列结构变化，所有行都需重新序列化
+            else:
+                self.row_dirty[index] = True
+
+    def apply_edit(self, edit):  # 执行一条日志中的编辑
+        op = edit["op"]
+        if op == "set_cell":
+            self.set_cell_value(edit["index"], edit["col"], edit["value"])
+        elif op == "add_rows":
+            self.add_rows(edit["count"], edit["defaults"])
+        elif op == "remove_row":
+            self.remove_row(edit["index"])
+        elif op == "remove_rows":
+            self.remove_rows(edit["index"], edit["count"])
+        elif op == "insert_rows":
+            self.insert_rows(edit["index"], edit["rows"])
+        elif op == "create_column":
+            self.create_column(edit["col"], edit["type"])
+        elif op == "remove_column":
+            self.remove_column(edit["col"])
+        elif op == "rename_column":
+            self.rename_column(edit["old"], edit["new"])
+        elif op == "set_column_type":
+            self.set_column_type(edit["col"], edit["type"])
+        elif op == "set_column_values":
+            self.set_column_values(edit["col"], edit["values"])
+        elif op == "apply_formula":
+            self.apply_formula(
+                edit["col"], edit["type"], edit["expression"], edit.get("where")
+            )
+        elif op == "restore_column":
+            self.restore_column(
+                edit["col"], edit["position"], edit["type"], edit["values"]
+            )
 
     def show_message(self, message):  # 显示消息函数
+        if self.dpg is None:
+            self.messages.append(message)  # 无界面时由调用者读取
+            return
         self.dpg.set_value("message_text", message)  # 设置消息文本
         self.dpg.show_item("message_box")  # 显示消息框
 
     def edit_cell(self, sender, app_data, user_data):  # 编辑单元格函数
         index, col = user_data  # 获取行索引和列名
         if self.df is not None:
-            if self.column_types.get(col) == "bool":  # 如果列类型是布尔值
-                self.df.at[index, col] = app_data == "True"  # 设置单元格值
-            else:
-                self.df.at[index, col] = app_data  # 设置单元格值
+            try:
+                value = json_editor_types.coerce_value(
+                    app_data, self.column_types.get(col)
+                )  # 按列类型转换输入，避免数值列被写入字符串
+            except ValueError:
+                return  # 输入尚不是有效值时不修改数据
+            self.set_cell_value(index, col, value, patch=False)  # 控件已显示新值
+
+    # 数据修改接口：修改数据框、记录日志并局部更新表格
+    @json_editor_profile.timed
+    def set_cell_value(self, index, col, value, patch=True):  # 设置单元格值
+        if self.is_data_locked():
+            self.patch_cell(index, col)  # 恢复控件显示的旧值
+            return
+        old_value = self.df.at[index, col]
+        if not isinstance(old_value, (list, dict)) and pd.isna(old_value):
+            old_value = None  # 缺失值统一用None恢复
+        json_editor_types.assign_cell(self.df, index, col, value)  # 设置单元格值
+        self.data_index.cell_changed(col, index, self.df.at[index, col])
+        self.sort_cache.invalidate(col)  # 行的位置保持不变，下次排序时重新计算
+        self.mark_rows_dirty(index)
+        self.record_edit(
+            {"op": "set_cell", "index": index, "col": col, "value": value},
+            {"op": "set_cell", "index": index, "col": col, "value": old_value},
+        )
+        if patch:
+            self.patch_cell(index, col)
 
     def add_row(self):  # 添加行函数
-        if self.df is not None:
+        self.add_rows(1)
+
+    @json_editor_profile.timed
+    def add_rows(self, count, defaults=None):  # 批量添加行函数
+        if self.df is not None and count > 0 and not self.is_data_locked():
             new_row = {  # 创建新行
                 col: self.get_default_value_for_type(self.column_types.get(col))
                 for col in self.df.columns
             }
-            if self.index_color_differentiation:
-                new_row["ColorDif"] = "#000000"  # 默认颜色
+            if "ColorDisplay" in new_row:
+                new_row["ColorDisplay"] = "#000000"  # 索引颜色列的默认颜色
+            if defaults:
+                new_row.update(defaults)  # 使用调用者提供的默认值
+            new_rows = pd.DataFrame(
+                new_row, index=pd.RangeIndex(count)
+            )  # 一次性分配全部新行
+            new_rows = json_editor_types.match_dtypes(new_rows, self.df)  # 保持紧凑存储
             self.df = pd.concat(
-                [self.df, pd.DataFrame([new_row])], ignore_index=True
+                [self.df, new_rows], ignore_index=True
             )  # 添加新行到数据框
-            self.update_table()  # 更新表格
+            if self.row_origin is not None:
+                self.row_origin = np.concatenate(
+                    (self.row_origin, np.full(count, -1, dtype=np.int64))
+                )
+                self.row_dirty = np.concatenate(
+                    (self.row_dirty, np.ones(count, dtype=bool))
+                )
+            self.data_index.rows_appended(self.df, count)
+            self.sort_cache.invalidate()
+            self.view_rows_appended(count)
+            self.record_edit(
+                {"op": "add_rows", "count": count, "defaults": new_row},
+                {"op": "remove_rows", "index": len(self.df) - count, "count": count},
+            )
+            self.patch_rows_appended(count)  # 只追加新行
+
+    def remove_row(self, index):  # 删除一行，之后的行前移
+        self.remove_rows(index, 1)
+
+    @json_editor_profile.timed
+    def remove_rows(self, index, count):  # 删除从index开始的count行，之后的行前移
+        if self.is_data_locked():
+            return
+        removed = self.df.iloc[index : index + count].reset_index(drop=True)
+        self.df = pd.concat(
+            [self.df.iloc[:index], self.df.iloc[index + count :]], ignore_index=True
+        )  # 删除行
+        if self.row_origin is not None:
+            self.row_origin = np.delete(self.row_origin, slice(index, index + count))
+            self.row_dirty = np.delete(self.row_dirty, slice(index, index + count))
+        self.data_index.rows_removed(index, count)
+        self.sort_cache.rows_removed(index, count)
+        self.view_rows_removed(index, count)
+        self.record_edit(
+            {"op": "remove_rows", "index": index, "count": count},
+            {"op": "insert_rows", "index": index, "rows": removed},
+        )
+        self.patch_row_deleted(index)  # 只刷新被删除行之后的索引
+
+    @json_editor_profile.timed
+    def insert_rows(self, index, rows):  # 在index处插入若干行（撤销删除行）
+        if self.is_data_locked():
+            return
+        if not isinstance(rows, pd.DataFrame):  # 日志中保存的是记录列表
+            rows = pd.DataFrame(rows)
+        rows = json_editor_types.match_dtypes(rows.reset_index(drop=True), self.df)
+        count = len(rows)
+        self.df = pd.concat(
+            [self.df.iloc[:index], rows, self.df.iloc[index:]], ignore_index=True
+        )
+        if self.row_origin is not None:  # 插入的行需重新序列化
+            self.row_origin = np.insert(self.row_origin, index, np.full(count, -1))
+            self.row_dirty = np.insert(self.row_dirty, index, np.ones(count, bool))
+        self.data_index.invalidate()
+        self.sort_cache.invalidate()
+        self.view_rows_inserted(index, count)
+        self.record_edit(
+            {
+                "op": "insert_rows",
+                "index": index,
+                "rows": rows.to_dict(orient="records"),
+            },
+            {"op": "remove_rows", "index": index, "count": count},
+        )
+        self.patch_rows_inserted(index)  # 重新绑定插入位置之后的行
+
+    @json_editor_profile.timed
+    def create_column(self, col, col_type):  # 添加一列并设置类型
+        if self.is_data_locked():
+            return
+        inverse = self.column_inverse(col)
+        self.df[col] = json_editor_types.to_storage(
+            pd.Series(self.get_default_value_for_type(col_type), index=self.df.index),
+            col_type,
+        )  # 添加新列到数据框
+        self.column_types[col] = col_type  # 设置新列类型
+        self.invalidate_column(col)
+        self.mark_rows_dirty()
+        self.record_edit({"op": "create_column", "col": col, "type": col_type}, inverse)
+        self.patch_columns_changed()  # 刷新列结构
+
+    @json_editor_profile.timed
+    def remove_column(self, col):  # 删除一列
+        if self.is_data_locked():
+            return
+        inverse = self.column_inverse(col)
+        self.df = self.df.drop(columns=[col])  # 删除列
+        if col in self.column_types:
+            del self.column_types[col]  # 删除列类型
+        self.invalidate_column(col)
+        self.sort_keys = [(c, asc) for c, asc in self.sort_keys if c != col]
+        self.mark_rows_dirty()
+        self.record_edit({"op": "remove_column", "col": col}, inverse)
+        self.patch_columns_changed()  # 刷新列结构
+
+    @json_editor_profile.timed
+    def rename_column(self, old_name, new_name):  # 重命名一列
+        if self.is_data_locked():
+            return
+        self.df.rename(columns={old_name: new_name}, inplace=True)  # 重命名列
+        if old_name in self.column_types:
+            self.column_types[new_name] = self.column_types.pop(
+                old_name
+            )  # 更新列类型
+        self.invalidate_column(old_name)
+        self.invalidate_column(new_name)
+        self.sort_keys = [
+            (new_name if c == old_name else c, asc) for c, asc in self.sort_keys
+        ]
+        self.mark_rows_dirty()
+        self.record_edit(
+            {"op": "rename_column", "old": old_name, "new": new_name},
+            {"op": "rename_column", "old": new_name, "new": old_name},
+        )
+        self.patch_column_renamed(old_name, new_name)  # 只更新列标题
+
+    @json_editor_profile.timed
+    def set_column_type(self, col, col_type, converted=None):
+        # 设置列类型并转换整列数据，converted为已在后台转换好的列
+        if self.is_data_locked():
+            return
+        if converted is None:
+            converted, _ = json_editor_types.convert_column(self.df[col], col_type)
+        inverse = self.column_inverse(col)
+        self.column_types[col] = col_type  # 设置列类型
+        self.df[col] = converted  # 无法转换的值已变为缺失值
+        self.invalidate_column(col)  # 存储类型变化后重新构建
+        self.mark_rows_dirty()
+        self.record_edit(
+            {"op": "set_column_type", "col": col, "type": col_type}, inverse
+        )
+        self.patch_column_type(col)  # 只替换该列的控件
+
+    @json_editor_profile.timed
+    def set_column_values(self, col, values):  # 整列替换数据
+        if self.is_data_locked():
+            return
+        inverse = self.column_inverse(col)
+        is_new = col not in self.df.columns
+        series = pd.Series(values, index=self.df.index, dtype=object)  # 缺失值保持为None
+        col_type = self.column_types.get(col) or json_editor_types.infer_column_type(
+            series.infer_objects()
+        )
+        if col_type is not None:  # 没有类型的列按数据推断，缺失值存为NA而不是NaN
+            try:
+                series = json_editor_types.to_storage(series, col_type)
+                self.column_types[col] = col_type
+            except (ValueError, TypeError):
+                pass  # 数据与类型不符时保留原有存储
+        self.df[col] = series
+        self.invalidate_column(col)
+        self.mark_rows_dirty()
+        self.record_edit(
+            {"op": "set_column_values", "col": col, "values": series}, inverse
+        )
+        if is_new:
+            self.patch_columns_changed()
+        else:
+            self.patch_column_type(col)  # 重新绑定该列的控件
+
+    @json_editor_profile.timed
+    def apply_formula(self, col, col_type, expression, where=None, values=None):
+        # 按表达式计算整列（有行条件时只改满足条件的行），values为已在后台计算好的列
+        # 日志中只记录表达式，重放时重新计算
+        if self.is_data_locked():
+            return
+        if values is None:
+            values, col_type, _ = json_editor_formula.compute_column(
+                self.df, col, col_type, expression, where
+            )
+        inverse = self.column_inverse(col)
+        is_new = col not in self.df.columns
+        self.df[col] = values
+        self.column_types[col] = col_type
+        self.invalidate_column(col)
+        self.mark_rows_dirty()
+        self.record_edit(
+            {
+                "op": "apply_formula",
+                "col": col,
+                "type": col_type,
+                "expression": expression,
+                "where": where,
+            },
+            inverse,
+        )
+        if is_new:
+            self.patch_columns_changed()
+        else:
+            self.patch_column_type(col)  # 重新绑定该列的控件
+
+    @json_editor_profile.timed
+    def restore_column(self, col, position, col_type, values):
+        # 把列恢复为给定的位置、类型和数据（撤销列操作）
+        if self.is_data_locked():
+            return
+        inverse = self.column_inverse(col)
+        is_new = col not in self.df.columns
+        if not isinstance(values, pd.Series):  # 日志中保存的是值列表
+            values = pd.Series(values, index=self.df.index)
+            if col_type is not None:
+                try:
+                    values = json_editor_types.to_storage(values, col_type)
+                except (ValueError, TypeError):
+                    pass  # 数据与类型不符时保留原样
+        if is_new:
+            self.df.insert(min(position, len(self.df.columns)), col, values)
+        else:
+            self.df[col] = values
+        if col_type is None:
+            self.column_types.pop(col, None)
+        else:
+            self.column_types[col] = col_type
+        self.invalidate_column(col)
+        self.mark_rows_dirty()
+        self.record_edit(
+            {
+                "op": "restore_column",
+                "col": col,
+                "position": position,
+                "type": col_type,
+                "values": values,  # 由日志的写入线程编码
+            },
+            inverse,
+        )
+        if is_new:
+            self.patch_columns_changed()
+        else:
+            self.patch_column_type(col)
+
+    # 查找、排序与视图：表格按view_rows的顺序显示行，数据框本身的顺序不变
+    def invalidate_column(self, col):  # 列被修改、重命名或删除，丢弃其索引和排序缓存
+        self.data_index.invalidate(col)
+        self.sort_cache.invalidate(col)
+
+    @json_editor_profile.timed
+    def update_view(self):  # 根据排序键和查找结果计算显示的行
+        order = None
+        if self.sort_keys:
+            order = self.sort_cache.permutation(self.df, self.sort_keys)
+        if self.filter_rows is None:
+            self.view_rows = order
+        elif order is None:
+            self.view_rows = self.filter_rows
+        else:  # 按排序顺序保留匹配的行
+            mask = np.zeros(len(self.df), dtype=bool)
+            mask[self.filter_rows] = True
+            self.view_rows = order[mask[order]]
+
+    @json_editor_profile.timed
+    def show_view(self, order=None):  # 重新计算并显示视图，排序结果未缓存时先在后台计算
+        keys = list(self.sort_keys)
+        if order is None and keys and not self.sort_cache.is_ready(keys):
+            self.run_task(
+                "Sorting",
+                lambda task: self.sort_cache.permutation(self.df, keys, task),
+                self.show_view,
+                "Failed to sort rows",
+            )
+            return
+        self.update_view()
+        self.refresh_view()
+
+    def sort_by(self, keys):  # 按[(列名, 是否升序)]排序显示，空列表恢复原顺序
+        self.sort_keys = [(col, asc) for col, asc in keys if col in self.df.columns]
+        self.show_view()
+
+    def view_rows_appended(self, count):  # 新行追加到查找结果和视图末尾，便于继续编辑
+        new_rows = np.arange(len(self.df) - count, len(self.df))
+        if self.filter_rows is not None:
+            self.filter_rows = np.concatenate((self.filter_rows, new_rows))
+        if self.view_rows is not None:
+            self.view_rows = np.concatenate((self.view_rows, new_rows))
+
+    def view_rows_removed(self, index, count):  # 从查找结果和视图中去掉被删除的行
+        if self.filter_rows is not None:
+            self.filter_rows, _ = json_editor_index.remove_positions(
+                self.filter_rows, index, count
+            )  # 之后的行前移
+        if self.view_rows is not None:
+            self.view_rows, _ = json_editor_index.remove_positions(
+                self.view_rows, index, count
+            )
+
+    def view_rows_inserted(self, index, count):  # 插入的行显示在查找结果和视图中
+        new_rows = np.arange(index, index + count)
+        if self.filter_rows is not None:
+            rows = self.filter_rows + count * (self.filter_rows >= index)  # 之后的行后移
+            self.filter_rows = np.insert(rows, np.searchsorted(rows, index), new_rows)
+        if not self.sort_keys:
+            self.view_rows = self.filter_rows
+        elif self.view_rows is not None:  # 已排序时与新行一样显示在末尾
+            rows = self.view_rows + count * (self.view_rows >= index)
+            self.view_rows = np.concatenate((rows, new_rows))
+
+    def get_view_length(self):  # 表格显示的行数
+        if self.df is None:
+            return 0
+        return len(self.df) if self.view_rows is None else len(self.view_rows)
+
+    def get_view_rows(self, start, stop):  # 显示位置[start, stop)对应的数据框行
+        if self.view_rows is None:
+            return np.arange(start, stop)
+        return self.view_rows[start:stop]
+
+    def refresh_view(self):  # 显示的行变化后刷新表格
+        self.update_table()
+
+    def find_rows(self):  # 按查找栏的条件过滤表格
+        if self.df is None:
+            return
+        text = self.dpg.get_value("filter_text")
+        if text == "":
+            self.clear_filter()
+            return
+        col = self.dpg.get_value("filter_column")
+        mode = self.dpg.get_value("filter_mode")
+        columns = [col] if col in self.df.columns else list(self.df.columns)
+        if self.data_index.is_ready(columns, mode):  # 索引已构建时直接查找
+            try:
+                rows = self.data_index.find(self.df, columns, mode, text)
+            except ValueError as e:
+                self.show_message(f"Failed to filter rows: {e}")
+                return
+            self.set_filter_rows(rows)
+        else:  # 首次查找时在后台构建索引
+            self.run_task(
+                "Building index",
+                lambda task: self.data_index.find(self.df, columns, mode, text, task),
+                self.set_filter_rows,
+                "Failed to filter rows",
+            )
+
+    def set_filter_rows(self, rows):  # 只显示匹配的行
+        self.filter_rows = rows
+        self.dpg.set_value(
+            "filter_status", f"{len(rows)} {self.texts[self.language]['matches']}"
+        )
+        self.show_view()
+
+    def clear_filter(self):  # 清除查找条件，显示全部行
+        self.filter_rows = None
+        self.dpg.set_value("filter_text", "")
+        self.dpg.set_value("filter_status", "")
+        self.show_view()
+
+    def update_filter_columns(self):  # 更新查找栏的列选项
+        all_columns = self.texts[self.language]["all_columns"]
+        columns = [] if self.df is None else list(self.df.columns)
+        self.dpg.configure_item("filter_column", items=[all_columns] + columns)
+        if self.dpg.get_value("filter_column") not in columns:
+            self.dpg.set_value("filter_column", all_columns)
 
     def add_column(self):  # 添加列函数
         self.dpg.show_item("column_dialog")  # 显示添加列对话框
@@ -84,11 +1101,7 @@ class JsonEditorFunctions:  # 定义JsonEditorFunctions类
         new_col = self.dpg.get_value("new_column_name")  # 获取新列名
         new_col_type = self.dpg.get_value("new_column_type")  # 获取新列类型
         if new_col and self.df is not None:
-            self.df[new_col] = self.get_default_value_for_type(
-                new_col_type
-            )  # 添加新列到数据框
-            self.column_types[new_col] = new_col_type  # 设置新列类型
-            self.update_table()  # 更新表格
+            self.create_column(new_col, new_col_type)  # 添加新列到数据框
         self.dpg.hide_item("column_dialog")  # 隐藏添加列对话框
 
     def delete_row(self):  # 删除行函数
@@ -98,8 +1111,7 @@ class JsonEditorFunctions:  # 定义JsonEditorFunctions类
         row_index = self.dpg.get_value("row_index")  # 获取行索引
         if row_index is not None and self.df is not None:
             if 0 <= row_index < len(self.df):
-                self.df = self.df.drop(row_index).reset_index(drop=True)  # 删除行
-                self.update_table()  # 更新表格
+                self.remove_row(row_index)  # 删除行
         self.dpg.hide_item("row_dialog")  # 隐藏删除行对话框
 
     def delete_column(self):  # 删除列函数
@@ -108,28 +1120,113 @@ class JsonEditorFunctions:  # 定义JsonEditorFunctions类
     def delete_column_by_name(self, sender, app_data):  # 根据列名删除列函数
         col_name = self.dpg.get_value("column_name_delete")  # 获取列名
         if col_name and self.df is not None:
-            self.df = self.df.drop(columns=[col_name])  # 删除列
-            if col_name in self.column_types:
-                del self.column_types[col_name]  # 删除列类型
-            self.update_table()  # 更新表格
+            self.remove_column(col_name)  # 删除列
         self.dpg.hide_item("column_delete_dialog")  # 隐藏删除列对话框
 
     def edit_column_name(self, sender, app_data):  # 编辑列名函数
         current_name = self.dpg.get_value("current_column_name")  # 获取当前列名
         new_name = self.dpg.get_value("new_column_name_edit")  # 获取新列名
         if self.df is not None and current_name in self.df.columns and new_name:
-            self.df.rename(columns={current_name: new_name}, inplace=True)  # 重命名列
-            if current_name in self.column_types:
-                self.column_types[new_name] = self.column_types.pop(
-                    current_name
-                )  # 更新列类型
-            self.update_table()  # 更新表格
+            self.rename_column(current_name, new_name)  # 重命名列
         self.dpg.hide_item("edit_column_dialog")  # 隐藏编辑列名对话框
 
     def change_column_type(self, sender, app_data, user_data):  # 改变列类型函数
-        col = user_data  # 获取列名
-        self.column_types[col] = app_data  # 设置列类型
-        self.update_table()  # 更新表格
+        col, col_type = user_data, app_data  # user_data为列名
+        if self.df is None or col not in self.df.columns:
+            return
+        if self.is_data_locked():
+            self.patch_column_type(col)  # 恢复下拉框显示的类型
+            return
+        series = self.df[col]
+        convert = lambda task: json_editor_types.convert_column(series, col_type)
+        on_done = lambda result: self.finish_change_column_type(col, col_type, result)
+        if len(series) >= self.background_convert_rows:  # 大列在后台转换
+            self.run_task("Converting column", convert, on_done, "Failed to convert column")
+            return
+        try:
+            result = convert(None)
+        except Exception as e:
+            self.show_message(f"Failed to convert column: {e}")
+            return
+        on_done(result)
+
+    def finish_change_column_type(self, col, col_type, result):  # 应用转换结果并报告错误
+        converted, bad_rows = result
+        self.set_column_type(col, col_type, converted)
+        if len(bad_rows):
+            self.show_message(
+                f"Column {col} converted to {col_type}: {len(bad_rows)} values "
+                f"could not be converted and were cleared.\n"
+                f"Rows: {json_editor_types.format_error_rows(bad_rows)}"
+            )  # 列出无法转换的行，可撤销恢复
+
+    def compute_column(self, sender, app_data):  # 计算列对话框的应用按钮
+        col = dpg.get_value("formula_column").strip()
+        col_type = dpg.get_value("formula_type") or None  # 空表示沿用现有类型或按结果推断
+        expression = dpg.get_value("formula_expression")
+        where = dpg.get_value("formula_where").strip() or None
+        if self.df is None or not col:
+            return
+        if self.is_data_locked():
+            return
+        strict = col_type is None  # 沿用的类型放不下结果时报错，而不是清除数据
+        if strict:
+            col_type = self.column_types.get(col)
+        df = self.df
+        compute = lambda task: json_editor_formula.compute_column(
+            df, col, col_type, expression, where, strict
+        )
+        on_done = lambda result: self.finish_compute_column(
+            col, expression, where, result
+        )
+        if len(df) >= self.background_convert_rows:  # 大表在后台计算
+            self.run_task("Computing column", compute, on_done, "Failed to compute column")
+            return
+        try:
+            result = compute(None)
+        except Exception as e:
+            self.show_message(f"Failed to compute column: {e}")
+            return
+        on_done(result)
+
+    def finish_compute_column(self, col, expression, where, result):
+        # 应用计算结果（界面线程），整列作为一步撤销
+        values, col_type, bad_rows = result
+        self.apply_formula(col, col_type, expression, where, values)
+        if len(bad_rows):
+            self.show_message(
+                f"Column {col} computed as {col_type}: {len(bad_rows)} results "
+                f"could not be converted and were cleared.\n"
+                f"Rows: {json_editor_types.format_error_rows(bad_rows)}"
+            )
+
+    def update_document_tabs(self):  # 打开的文档变化，由界面类实现
+        pass
+
+    def update_table(self):  # 重建表格，由界面类实现
+        pass
+
+    # 表格局部更新接口：默认整表重建，界面类可覆盖为只更新受影响的控件
+    def patch_cell(self, index, col):  # 单元格值变化
+        self.update_table()
+
+    def patch_rows_appended(self, count):  # 末尾追加了count行
+        self.update_table()
+
+    def patch_row_deleted(self, index):  # 删除了index行，之后的行前移
+        self.update_table()
+
+    def patch_rows_inserted(self, index):  # 在index处插入了行，之后的行后移
+        self.update_table()
+
+    def patch_column_renamed(self, old_name, new_name):  # 列被重命名
+        self.update_table()
+
+    def patch_column_type(self, col):  # 列类型变化
+        self.update_table()
+
+    def patch_columns_changed(self):  # 列被添加或删除
+        self.update_table()
 
     def get_default_value_for_type(self, col_type):  # 获取列类型的默认值函数
         if col_type == "int":
@@ -203,7 +1300,7 @@ class JsonEditorFunctions:  # 定义JsonEditorFunctions类
         dpg.set_item_width("Main Window", width)  # 设置主窗口宽度
         dpg.set_item_height("Main Window", height)  # 设置主窗口高度
         dpg.set_item_width("Table Window", width - 20)  # 设置表格窗口宽度
-        dpg.set_item_height("Table Window", height - 60)  # 设置表格窗口高度
+        dpg.set_item_height("Table Window", height - 95)  # 设置表格窗口高度（减去菜单栏和查找栏）
 
     def show_add_row_dialog(self):  # 显示添加行对话框函数
         dpg.show_item("row_dialog")  # 显示对话框
@@ -240,21 +1337,93 @@ class JsonEditorFunctions:  # 定义JsonEditorFunctions类
     def toggle_index_color_differentiation(self, sender, app_data, user_data):
         self.index_color_differentiation = app_data  # 获取索引颜色区分的值
 
+    def show_debug_window(self):  # 显示或隐藏性能分析窗口
+        if dpg.is_item_shown("debug_window"):
+            dpg.hide_item("debug_window")
+        else:
+            self.debug_refresh_time = 0.0  # 立即刷新
+            dpg.show_item("debug_window")
+
+    def toggle_profiling(self, sender, app_data):  # 开启或关闭耗时记录
+        json_editor_profile.PROFILER.enabled = app_data
+
+    def toggle_memory_tracking(self, sender, app_data):  # 开启或关闭tracemalloc
+        json_editor_profile.PROFILER.set_track_memory(app_data)
+
+    def export_trace(self):  # 把记录导出为Chrome Trace文件（chrome://tracing或Perfetto打开）
+        if self.file_path:
+            trace_path = os.path.splitext(self.file_path)[0] + ".trace.json"
+        else:
+            trace_path = os.path.abspath("json_editor.trace.json")
+        try:
+            json_editor_profile.PROFILER.export_chrome_trace(trace_path)
+            self.show_message(f"Trace exported to {trace_path}")
+        except Exception as e:
+            self.show_message(f"Failed to export trace: {e}")
+
+    def update_debug_window(self):  # 每帧调用，窗口显示时定期刷新内容
+        now = time.perf_counter()
+        if now - self.debug_refresh_time < DEBUG_REFRESH_SECONDS:
+            return
+        self.debug_refresh_time = now
+        if not dpg.is_item_shown("debug_window"):
+            return
+        profiler = json_editor_profile.PROFILER
+        mean, worst = profiler.frame_stats()
+        lines = [
+            f"Frame time: {mean * 1000:.1f} ms avg, {worst * 1000:.1f} ms max",
+            f"Widgets: {len(dpg.get_all_items())}",
+        ]
+        if self.df is not None:
+            memory = int(self.df.memory_usage(index=True).sum())  # 不深入统计，避免卡顿
+            lines.append(
+                f"DataFrame: {len(self.df)} rows x {len(self.df.columns)} columns, "
+                f"{json_editor_types.format_bytes(memory)}"
+            )
+        dpg.set_value("debug_stats_text", "\n".join(lines))
+        dpg.set_value(
+            "debug_spans_text",
+            "\n".join(json_editor_profile.format_span(span) for span in profiler.recent()),
+        )
+
     def show_settings_dialog(self):  # 显示设置对话框函数
         # dpg.hide_item("file_dialog_id")
         dpg.configure_item("settings_dialog")
         dpg.set_item_width("settings_dialog", 420)
-        dpg.set_item_height("settings_dialog", 240)
+        dpg.set_item_height("settings_dialog", 420)
+        self.update_memory_report()  # 刷新每列内存占用
         dpg.show_item("settings_dialog")  # 显示对话框
         dpg.focus_item("settings_dialog")  # 使对话框获得焦点
 
+    def update_memory_report(self):  # 更新设置对话框中的内存报告
+        if self.df is None:
+            dpg.set_value("memory_report_text", "")
+            return
+        report = json_editor_types.memory_report(self.df)
+        total = sum(size for _, _, size in report)
+        lines = [
+            f"{col}: {dtype}, {json_editor_types.format_bytes(size)}"
+            for col, dtype, size in sorted(report, key=lambda item: -item[2])
+        ]
+        lines.insert(0, f"Total: {json_editor_types.format_bytes(total)}")
+        dpg.set_value("memory_report_text", "\n".join(lines))
+
     def show_import_excel_dialog(self):  # 显示导入Excel列对话框函数
         dpg.configure_item("import_excel_dialog")
         dpg.set_item_width("import_excel_dialog", 420)
-        dpg.set_item_height("import_excel_dialog", 300)
+        dpg.set_item_height("import_excel_dialog", 420)
+        json_columns = [] if self.df is None else list(self.df.columns)
+        dpg.configure_item("json_key_column", items=[""] + json_columns)  # 空表示按行号导入
         dpg.show_item("import_excel_dialog")  # 显示对话框
         dpg.focus_item("import_excel_dialog")  # 使对话框获得焦点
 
+    def show_formula_dialog(self):  # 显示计算列对话框函数
+        dpg.configure_item("formula_dialog")
+        dpg.set_item_width("formula_dialog", 480)
+        dpg.set_item_height("formula_dialog", 240)
+        dpg.show_item("formula_dialog")  # 显示对话框
+        dpg.focus_item("formula_dialog")  # 使对话框获得焦点
+
     def show_select_excel_file_dialog(self):  # 显示选择Excel文件对话框函数
         dpg.show_item("select_excel_file_dialog")  # 显示对话框
         dpg.focus_item("select_excel_file_dialog")  # 使对话框获得焦点
@@ -262,25 +1431,76 @@ class JsonEditorFunctions:  # 定义JsonEditorFunctions类
     def open_file_callback(self, sender, app_data):  # 打开文件回调函数
         self.open_json(app_data["file_path_name"])  # 打开JSON文件
 
+    def export_file_callback(self, sender, app_data):  # 导出文件回调函数
+        self.export_file(app_data["file_path_name"])
+
+    def show_export_file_dialog(self):  # 显示导出文件对话框函数
+        if self.df is not None:
+            dpg.set_item_width("export_file_dialog", 680)
+            dpg.set_item_height("export_file_dialog", 420)
+            dpg.show_item("export_file_dialog")
+            dpg.focus_item("export_file_dialog")
+
     def select_excel_file_callback(self, sender, app_data):  # 选择Excel文件回调函数
         excel_file_path = app_data["file_path_name"]  # 获取Excel文件路径
         dpg.set_value("excel_file_path", excel_file_path)  # 设置Excel文件路径
         self.update_sheet_names(excel_file_path)  # 更新工作表名
 
     def update_sheet_names(self, excel_file_path):  # 更新工作表名函数
-        try:
-            sheet_names = pd.ExcelFile(excel_file_path).sheet_names  # 获取工作表名
-            dpg.configure_item("sheet_name", items=sheet_names)  # 配置工作表名下拉框
-        except Exception as e:
-            self.show_message(
-                f"Failed to read sheet names: {e}"
-            )  # 显示读取工作表名失败的消息
+        self.run_task(
+            "Reading sheet names",
+            lambda task: self.excel_cache.sheet_names(excel_file_path),  # 获取工作表名
+            self.finish_update_sheet_names,
+            "Failed to read sheet names",
+            locks_data=False,
+        )
+
+    def finish_update_sheet_names(self, sheet_names):  # 配置工作表名下拉框
+        dpg.configure_item("sheet_name", items=sheet_names)
+        if sheet_names:
+            dpg.set_value("sheet_name", sheet_names[0])  # 默认选择第一个工作表
+            self.update_excel_headers()
+
+    def update_excel_headers(self):  # 读取所选工作表的表头（只读第一行）
+        excel_file_path = dpg.get_value("excel_file_path")
+        sheet_name = dpg.get_value("sheet_name")
+        if not excel_file_path or not sheet_name:
+            return
+        self.run_task(
+            "Reading column headers",
+            lambda task: self.excel_cache.header(excel_file_path, sheet_name),
+            self.finish_update_excel_headers,
+            "Failed to read column headers",
+            locks_data=False,
+        )
+
+    def finish_update_excel_headers(self, header):  # 配置Excel列复选框和键列下拉框
+        dpg.delete_item("excel_columns_list", children_only=True)
+        for col in header:
+            dpg.add_checkbox(label=col, user_data=col, parent="excel_columns_list")
+        dpg.configure_item("excel_key_column", items=[""] + header)
+        dpg.set_value("excel_key_column", "")
+
+    def get_selected_excel_columns(self):  # 勾选的Excel列
+        return [
+            dpg.get_item_user_data(item)
+            for item in dpg.get_item_children("excel_columns_list", 1)
+            if dpg.get_value(item)
+        ]
 
     def apply_settings(self):  # 应用设置函数
         is_enabled = dpg.get_value(
             "index_color_differentiation_checkbox"
         )  # 获取启用索引颜色区分复选框的值
         self.index_color_differentiation = is_enabled  # 设置类属性
+        undo_memory_mb = max(1, dpg.get_value("undo_memory_limit_input"))
+        self.history.set_memory_limit(undo_memory_mb * 1024 * 1024)  # 撤销历史内存上限
+        for document in self.workspace.documents:
+            if document.state is not None:
+                document.state["history"].set_memory_limit(undo_memory_mb * 1024 * 1024)
+        workspace_memory_mb = max(1, dpg.get_value("workspace_memory_input"))
+        self.workspace.memory_budget = workspace_memory_mb * 1024 * 1024
+        self.spill_documents()  # 预算减小时溢出非活动文档
 
         # 更新表格以应用新设置
         self.update_table()
@@ -293,32 +1513,104 @@ class JsonEditorFunctions:  # 定义JsonEditorFunctions类
     def import_excel_column(self):  # 导入Excel列函数
         excel_file_path = dpg.get_value("excel_file_path")  # 获取Excel文件路径
         sheet_name = dpg.get_value("sheet_name")  # 获取工作表名
-        excel_column = dpg.get_value("excel_column")  # 获取Excel列名
+        excel_columns = self.get_selected_excel_columns()  # 获取勾选的Excel列
         target_json_column = dpg.get_value("target_json_column")  # 获取目标JSON列名
+        excel_key = dpg.get_value("excel_key_column")  # Excel中的连接键列
+        json_key = dpg.get_value("json_key_column")  # JSON中的连接键列
+        if self.df is None or not excel_columns:
+            return
+        if bool(excel_key) != bool(json_key):
+            self.show_message("Select both key columns, or neither to import by row")
+            return
+        if len(excel_columns) == 1 and target_json_column:
+            imports = [(excel_columns[0], target_json_column)]  # 单列可以改名导入
+        else:
+            imports = [(col, col) for col in excel_columns]  # 多列按表头名导入
+        columns = list(dict.fromkeys(excel_columns + ([excel_key] if excel_key else [])))
+
+        self.run_task(
+            "Importing Excel columns",
+            lambda task: self.excel_cache.read_columns(
+                excel_file_path,
+                sheet_name,
+                columns,
+                progress=lambda done, total: task.report(
+                    done, total, f"Reading Excel... {done} rows"
+                ),
+            ),  # 在后台一次读取所需的全部列
+            lambda excel_data: self.finish_import_excel_column(
+                excel_data, imports, excel_key, json_key
+            ),
+            "Failed to import Excel column",
+        )
 
+    def finish_import_excel_column(self, excel_data, imports, excel_key, json_key):
+        # 将读取的Excel列写入数据框（界面线程）
         try:
-            excel_data = pd.read_excel(
-                excel_file_path, sheet_name=sheet_name, usecols=[excel_column]
-            )  # 读取Excel数据
-            if target_json_column not in self.df.columns:  # 如果目标JSON列不存在
-                self.df[target_json_column] = ""  # 添加目标JSON列
-
-            if len(excel_data) > len(self.df):  # 如果Excel数据行数大于JSON数据行数
-                for _ in range(len(excel_data) - len(self.df)):
-                    self.add_row()  # 添加行
-
-            self.df[target_json_column] = excel_data[
-                excel_column
-            ].values  # 将Excel列数据导入目标JSON列
-            self.update_table()  # 更新表格
+            report = self.import_excel_data(excel_data, imports, excel_key, json_key)
             self.show_message(
-                "Excel column imported successfully"
+                f"{len(imports)} Excel column(s) imported successfully{report}"
             )  # 显示导入成功的消息
         except Exception as e:
             self.show_message(
                 f"Failed to import Excel column: {e}"
             )  # 显示导入失败的消息
 
+    @json_editor_profile.timed
+    def import_excel_data(self, excel_data, imports, excel_key=None, json_key=None):
+        # 把Excel列[(Excel列名, 目标JSON列名)]写入数据框，有键列时按键进行哈希连接
+        # 整次导入作为一步撤销，返回按键连接的结果说明
+        report = ""
+        self.history.begin_group()
+        try:
+            if json_key:
+                positions, json_missing, excel_missing, duplicates = (
+                    json_editor_excel.hash_join(self.df[json_key], excel_data[excel_key])
+                )
+                report = self.format_join_report(
+                    json_missing, excel_missing, duplicates, excel_data[excel_key]
+                )
+            else:
+                if len(excel_data) > len(self.df):  # 如果Excel数据行数大于JSON数据行数
+                    self.add_rows(len(excel_data) - len(self.df))  # 一次性补齐行
+                positions = np.arange(len(self.df))
+                positions[positions >= len(excel_data)] = -1  # Excel较短时保留原值
+            for excel_column, target_json_column in imports:
+                existing = (
+                    self.df[target_json_column]
+                    if target_json_column in self.df.columns
+                    else None
+                )
+                self.set_column_values(
+                    target_json_column,
+                    json_editor_excel.take_rows(
+                        excel_data[excel_column], positions, existing
+                    ),
+                )  # 将Excel列数据导入目标JSON列
+        finally:
+            self.history.end_group()
+        return report
+
+    def format_join_report(self, json_missing, excel_missing, duplicates, excel_keys):
+        # 按键导入的结果说明：两侧未匹配的键数量及示例
+        lines = [""]
+        if len(json_missing):
+            lines.append(
+                f"JSON rows without a matching key: {len(json_missing)} "
+                f"(rows: {json_editor_types.format_error_rows(json_missing)})"
+            )
+        if len(excel_missing):
+            lines.append(
+                f"Excel keys not found in JSON: {len(excel_missing)} "
+                f"({json_editor_types.format_error_rows(excel_keys.iloc[excel_missing].tolist())})"
+            )
+        if len(duplicates):
+            lines.append(
+                f"Duplicate Excel keys ignored: {len(duplicates)} "
+                f"({json_editor_types.format_error_rows(excel_keys.iloc[duplicates].tolist())})"
+            )
+        return "\n".join(lines)
+
     def change_language(self, sender, app_data):  # 切换语言函数
         selected_language = (
             "English" if app_data == self.texts["English"]["english"] else "Chinese"
@@ -331,6 +1623,13 @@ class JsonEditorFunctions:  # 定义JsonEditorFunctions类
         dpg.set_item_label("Main Window", self.texts[self.language]["main_window"])
         # dpg.set_item_label(self.open_menu_item, self.texts[self.language]["open_json"])
         dpg.set_item_label(self.save_menu_item, self.texts[self.language]["save_json"])
+        dpg.set_item_label(
+            self.save_compact_menu_item,
+            self.texts[self.language]["save_json_compact"],
+        )
+        dpg.set_item_label(
+            self.export_menu_item, self.texts[self.language]["export_file"]
+        )
         dpg.set_item_label(
             self.setting_menu_item, self.texts[self.language]["settings"]
         )
@@ -340,6 +1639,11 @@ class JsonEditorFunctions:  # 定义JsonEditorFunctions类
             "file_menu": self.texts[self.language]["file_menu"],
             "edit_menu": self.texts[self.language]["edit_menu"],
             "editor_menu": self.texts[self.language]["editor_menu"],
+            "undo_menu_item": self.texts[self.language]["undo"],
+            "debug_window_menu_item": self.texts[self.language]["debug_window"],
+            "close_tab_menu_item": self.texts[self.language]["close_tab"],
+            "compute_column_menu_item": self.texts[self.language]["compute_column"],
+            "redo_menu_item": self.texts[self.language]["redo"],
         }
 
         for item_tag, label in menu_items.items():
@@ -375,17 +1679,40 @@ class JsonEditorFunctions:  # 定义JsonEditorFunctions类
                 ("close", "close"),
             ],
             "message_box": [("close", "close")],
+            "recover_journal_dialog": [
+                ("recover", "recover_journal_button"),
+                ("discard", "discard_journal_button"),
+            ],
             "settings_dialog": [
                 ("enable_feature", "enable_feature_checkbox"),
                 ("apply", "apply"),
                 ("language", "language_combo"),
+                ("undo_memory", "undo_memory_limit_input"),
+                ("workspace_memory", "workspace_memory_input"),
                 ("close", "close"),
             ],
+            "formula_dialog": [
+                ("formula_column", "formula_column"),
+                ("column_type", "formula_type"),
+                ("formula_expression", "formula_expression"),
+                ("formula_where", "formula_where"),
+                ("apply", "apply_formula_button"),
+                ("close", "close_formula_dialog_button"),
+            ],
+            "progress_dialog": [("cancel", "cancel_task_button")],
+            "filter_bar": [("find", "find_button"), ("clear", "clear_filter_button")],
+            "debug_window": [
+                ("enable_profiling", "enable_profiling_checkbox"),
+                ("track_memory", "track_memory_checkbox"),
+                ("export_trace", "export_trace_button"),
+                ("clear", "clear_profile_button"),
+            ],
             "import_excel_dialog": [
                 ("select_excel_file", "select_excel_file"),
                 ("selected_excel_file", "excel_file_path"),
                 ("sheet_name", "sheet_name"),
-                ("excel_column", "excel_column"),
+                ("excel_key_column", "excel_key_column"),
+                ("json_key_column", "json_key_column"),
                 ("target_json_column", "target_json_column"),
                 ("import", "import"),
                 ("close", "close"),
@@ -395,6 +1722,8 @@ class JsonEditorFunctions:  # 定义JsonEditorFunctions类
         for dialog_tag, items in dialog_items.items():
             for label, tag in items:
                 dpg.set_item_label(tag, self.texts[self.language][label])
+        dpg.set_value("excel_columns_label", self.texts[self.language]["excel_column"])
+        self.update_filter_columns()  # “全部列”选项随语言变化
 
     def get_font_path(self):  # 获取字体路径函数
         if platform.system() == "Windows":  # 如果是Windows系统
@@ -406,27 +1735,48 @@ class JsonEditorFunctions:  # 定义JsonEditorFunctions类
 
     def show_color_picker(self, sender, app_data, user_data):  # 显示颜色选择器函数
         index, col = user_data
+        if dpg.does_item_exist("color_picker_window"):
+            self.close_color_picker()
+        rgb = json_editor_types.color_array([self.df.at[index, col]], "#000000")[0]
+        self.color_picker_history = self.history
+        self.history.begin_group()  # 拖动过程中的所有颜色合并为一步撤销
         with dpg.window(
             label="Color Picker",
             modal=True,
             tag="color_picker_window",
             width=400,
             height=400,
+            on_close=self.close_color_picker,
         ):
             dpg.add_color_picker(
-                callback=self.color_picker_callback, user_data=(index, col)
-            )
-            dpg.add_button(
-                label="Close", callback=lambda: dpg.delete_item("color_picker_window")
+                default_value=[*rgb.tolist(), 255],
+                no_alpha=True,
+                callback=self.color_picker_callback,
+                user_data=(index, col),
             )
+            dpg.add_button(label="Close", callback=self.close_color_picker)
 
     def color_picker_callback(self, sender, app_data, user_data):  # 颜色选择器回调函数
         index, col = user_data
         color = "#{:02x}{:02x}{:02x}".format(
             int(app_data[0] * 255), int(app_data[1] * 255), int(app_data[2] * 255)
         )
-        self.df.at[index, col] = color
-        self.update_table()
+        self.pending_color = (index, col, color)  # 拖动时每帧只应用最后一个颜色
+
+    def apply_pending_color(self):  # 每帧渲染前应用颜色选择器的最新颜色，只更新该单元格
+        if self.pending_color is None:
+            return
+        (index, col, color), self.pending_color = self.pending_color, None
+        if self.df is not None and col in self.df.columns and index < len(self.df):
+            self.set_cell_value(index, col, color)
+
+    def close_color_picker(self, sender=None, app_data=None):  # 应用最后的颜色并结束合并
+        self.apply_pending_color()
+        if self.color_picker_history is not None:
+            self.color_picker_history.end_group()
+            self.color_picker_history = None
+        if dpg.does_item_exist("color_picker_window"):
+            dpg.delete_item("color_picker_window")
 
     def create_dialogs(self):  # 创建对话框函数
         with dpg.window(
@@ -439,7 +1789,7 @@ class JsonEditorFunctions:  # 定义JsonEditorFunctions类
             )  # 添加输入框，用于输入列名
             dpg.add_combo(
                 label=self.texts[self.language]["column_type"],
-                items=["string", "int", "float", "bool"],
+                items=json_editor_types.COLUMN_TYPES,
                 tag="new_column_type",
             )  # 添加下拉框，用于选择列类型
             dpg.add_button(
@@ -528,6 +1878,28 @@ class JsonEditorFunctions:  # 定义JsonEditorFunctions类
                     tag="close_message_box_button",
                 )  # 添加关闭按钮
 
+            with dpg.window(
+                label=self.texts[self.language]["recover_journal_dialog"],
+                show=False,
+                modal=True,
+                no_close=True,
+                tag="recover_journal_dialog",
+            ):  # 打开文件时发现未保存的编辑，询问是否恢复
+                dpg.add_text("", tag="recover_journal_text")
+                dpg.add_button(
+                    label=self.texts[self.language]["recover"],
+                    callback=self.choose_recovery,
+                    user_data=True,
+                    tag="recover_journal_button",
+                )  # 重放未保存的编辑
+                dpg.add_same_line()
+                dpg.add_button(
+                    label=self.texts[self.language]["discard"],
+                    callback=self.choose_recovery,
+                    user_data=False,
+                    tag="discard_journal_button",
+                )  # 删除日志
+
             with dpg.file_dialog(
                 directory_selector=False,
                 show=False,
@@ -537,6 +1909,24 @@ class JsonEditorFunctions:  # 定义JsonEditorFunctions类
                 dpg.add_file_extension(
                     ".json", color=(150, 255, 150, 255)
                 )  # 添加文件扩展名过滤器
+                dpg.add_file_extension(
+                    ".jsonl", color=(150, 255, 150, 255)
+                )  # 添加JSON Lines扩展名过滤器
+                for extension in json_editor_columnar.FILE_FORMATS:
+                    dpg.add_file_extension(
+                        extension, color=(150, 200, 255, 255)
+                    )  # 添加列式格式扩展名过滤器
+
+            with dpg.file_dialog(
+                directory_selector=False,
+                show=False,
+                callback=self.export_file_callback,
+                tag="export_file_dialog",
+            ):  # 创建导出文件对话框
+                for extension in [".json", ".jsonl"] + list(
+                    json_editor_columnar.FILE_FORMATS
+                ):
+                    dpg.add_file_extension(extension, color=(150, 255, 150, 255))
 
             with dpg.window(
                 label=self.texts[self.language]["settings_dialog"],
@@ -566,12 +1956,33 @@ class JsonEditorFunctions:  # 定义JsonEditorFunctions类
                     default_value=self.texts[self.language]["english"],
                     callback=self.change_language,
                 )  # 添加下拉框，用于选择语言
+                dpg.add_input_int(
+                    label=self.texts[self.language]["undo_memory"],
+                    default_value=self.history.memory_limit // (1024 * 1024),
+                    min_value=1,
+                    min_clamped=True,
+                    width=120,
+                    tag="undo_memory_limit_input",
+                )  # 撤销历史最多占用的内存（MB）
+                dpg.add_input_int(
+                    label=self.texts[self.language]["workspace_memory"],
+                    default_value=self.workspace.memory_budget // (1024 * 1024),
+                    min_value=1,
+                    min_clamped=True,
+                    width=120,
+                    tag="workspace_memory_input",
+                )  # 所有打开文档最多占用的内存（MB），超出时非活动文档写入磁盘缓存
                 dpg.add_button(
                     label=self.texts[self.language]["apply"],
                     callback=self.apply_settings,
                     tag="apply_settings_button",
                 )  # 添加按钮，用于应用设置
                 dpg.add_same_line()
+                dpg.add_text(
+                    self.texts[self.language]["memory_report"], tag="memory_report_label"
+                )  # 内存报告标题
+                with dpg.child_window(height=200, width=-1):
+                    dpg.add_text("", tag="memory_report_text")  # 每列的存储类型和内存占用
 
             with dpg.file_dialog(
                 directory_selector=False,
@@ -606,10 +2017,24 @@ class JsonEditorFunctions:  # 定义JsonEditorFunctions类
                     label=self.texts[self.language]["sheet_name"],
                     tag="sheet_name",
                     items=[],
+                    callback=self.update_excel_headers,
                 )  # 添加下拉框，用于选择工作表名
-                dpg.add_input_text(
-                    label=self.texts[self.language]["excel_column"], tag="excel_column"
-                )  # 添加输入框，用于输入Excel列名
+                dpg.add_text(
+                    self.texts[self.language]["excel_column"], tag="excel_columns_label"
+                )
+                dpg.add_child_window(
+                    tag="excel_columns_list", height=150
+                )  # 添加复选框列表，用于选择要导入的Excel列（来自表头）
+                dpg.add_combo(
+                    label=self.texts[self.language]["excel_key_column"],
+                    tag="excel_key_column",
+                    items=[""],
+                )  # 添加下拉框，用于选择Excel中的连接键列
+                dpg.add_combo(
+                    label=self.texts[self.language]["json_key_column"],
+                    tag="json_key_column",
+                    items=[""],
+                )  # 添加下拉框，用于选择JSON中的连接键列，为空时按行号导入
                 dpg.add_input_text(
                     label=self.texts[self.language]["target_json_column"],
                     tag="target_json_column",
@@ -626,12 +2051,99 @@ class JsonEditorFunctions:  # 定义JsonEditorFunctions类
                     tag="close_import_excel_dialog_button",
                 )  # 添加关闭按钮
 
+            with dpg.window(
+                label=self.texts[self.language]["formula_dialog"],
+                show=False,
+                tag="formula_dialog",
+            ):  # 创建计算列对话框
+                dpg.add_input_text(
+                    label=self.texts[self.language]["formula_column"],
+                    tag="formula_column",
+                )  # 目标列名，不存在时新建
+                dpg.add_combo(
+                    label=self.texts[self.language]["column_type"],
+                    items=[""] + json_editor_types.COLUMN_TYPES,
+                    tag="formula_type",
+                )  # 为空时沿用现有类型或按结果推断
+                dpg.add_input_text(
+                    label=self.texts[self.language]["formula_expression"],
+                    hint='population * 1.1    `name.en` + "-" + city',
+                    tag="formula_expression",
+                )  # 对整列计算的表达式
+                dpg.add_input_text(
+                    label=self.texts[self.language]["formula_where"],
+                    hint="population > 1000",
+                    tag="formula_where",
+                )  # 可选的行条件，为假的行保留原值
+                dpg.add_button(
+                    label=self.texts[self.language]["apply"],
+                    callback=self.compute_column,
+                    tag="apply_formula_button",
+                )  # 添加按钮，用于计算列
+                dpg.add_same_line()
+                dpg.add_button(
+                    label=self.texts[self.language]["close"],
+                    callback=lambda: dpg.hide_item("formula_dialog"),
+                    tag="close_formula_dialog_button",
+                )  # 添加关闭按钮
+
+            with dpg.window(
+                label=self.texts[self.language]["progress_dialog"],
+                show=False,
+                no_close=True,
+                width=420,
+                tag="progress_dialog",
+            ):  # 创建后台任务进度窗口，不阻塞其他窗口
+                dpg.add_text("", tag="progress_text")  # 添加进度说明
+                dpg.add_progress_bar(
+                    default_value=0.0, width=-1, tag="progress_bar"
+                )  # 添加进度条
+                dpg.add_button(
+                    label=self.texts[self.language]["cancel"],
+                    callback=self.cancel_tasks,
+                    tag="cancel_task_button",
+                )  # 添加取消按钮
+
+            with dpg.window(
+                label=self.texts[self.language]["debug_window"],
+                show=False,
+                width=520,
+                height=480,
+                tag="debug_window",
+            ):  # 创建性能分析窗口：最近操作耗时、控件数、帧耗时和数据框内存
+                dpg.add_checkbox(
+                    label=self.texts[self.language]["enable_profiling"],
+                    callback=self.toggle_profiling,
+                    tag="enable_profiling_checkbox",
+                )  # 开启后记录操作耗时和帧耗时
+                dpg.add_checkbox(
+                    label=self.texts[self.language]["track_memory"],
+                    callback=self.toggle_memory_tracking,
+                    tag="track_memory_checkbox",
+                )  # 开启tracemalloc，记录每个操作的内存变化
+                dpg.add_text("", tag="debug_stats_text")  # 汇总信息
+                dpg.add_separator()
+                dpg.add_text("", tag="debug_spans_text")  # 最近的操作
+                with dpg.group(horizontal=True):
+                    dpg.add_button(
+                        label=self.texts[self.language]["export_trace"],
+                        callback=self.export_trace,
+                        tag="export_trace_button",
+                    )  # 导出Chrome Trace
+                    dpg.add_button(
+                        label=self.texts[self.language]["clear"],
+                        callback=json_editor_profile.PROFILER.clear,
+                        tag="clear_profile_button",
+                    )  # 清除记录
+
     languageDirc = {  # 定义中英文文本字典
         "English": {  # 英文文本
             "main_window": "Main Window",
             "file_menu": "File",
             "open_json": "Open JSON",
             "save_json": "Save JSON",
+            "save_json_compact": "Save JSON (Compact)",
+            "export_file": "Export As...",
             "edit_menu": "Edit",
             "add_row": "Add Row",
             "add_column": "Add Column",
@@ -645,6 +2157,10 @@ class JsonEditorFunctions:  # 定义JsonEditorFunctions类
             "column_type": "Column Type",
             "add": "Add",
             "close": "Close",
+            "recover_journal_dialog": "Recover Unsaved Edits",
+            "recover_journal_prompt": "This file has {count} unsaved edits from a previous session.",
+            "recover": "Recover",
+            "discard": "Discard",
             "delete_row_dialog": "Delete Row",
             "row_index": "Row Index",
             "delete": "Delete",
@@ -662,9 +2178,32 @@ class JsonEditorFunctions:  # 定义JsonEditorFunctions类
             "select_excel_file": "Select Excel File",
             "selected_excel_file": "Selected Excel File",
             "sheet_name": "Sheet Name",
-            "excel_column": "Excel Column",
+            "excel_column": "Excel Columns",
+            "excel_key_column": "Excel Key Column",
+            "json_key_column": "JSON Key Column",
             "target_json_column": "Target JSON Column",
             "import": "Import",
+            "progress_dialog": "Working...",
+            "cancel": "Cancel",
+            "memory_report": "Memory per column",
+            "find": "Find",
+            "undo": "Undo",
+            "redo": "Redo",
+            "undo_memory": "Undo Memory (MB)",
+            "workspace_memory": "Open Files Memory (MB)",
+            "close_tab": "Close Tab",
+            "compute_column": "Compute Column",
+            "formula_dialog": "Compute Column",
+            "formula_column": "Target Column",
+            "formula_expression": "Expression",
+            "formula_where": "Only Rows Where",
+            "clear": "Clear",
+            "debug_window": "Profiler",
+            "enable_profiling": "Record operation timings",
+            "track_memory": "Track memory (tracemalloc, slower)",
+            "export_trace": "Export Chrome Trace",
+            "all_columns": "All Columns",
+            "matches": "matches",
             "language": "Language",
             "english": "English",
             "chinese": "Chinese",
@@ -674,6 +2213,8 @@ class JsonEditorFunctions:  # 定义JsonEditorFunctions类
             "file_menu": "文件",
             "open_json": "打开 JSON",
             "save_json": "保存 JSON",
+            "save_json_compact": "紧凑保存 JSON",
+            "export_file": "导出为...",
             "edit_menu": "编辑",
             "add_row": "添加行",
             "add_column": "添加列",
@@ -687,6 +2228,10 @@ class JsonEditorFunctions:  # 定义JsonEditorFunctions类
             "column_type": "列类型",
             "add": "添加",
             "close": "关闭",
+            "recover_journal_dialog": "恢复未保存的编辑",
+            "recover_journal_prompt": "该文件有上次未保存的 {count} 处编辑。",
+            "recover": "恢复",
+            "discard": "丢弃",
             "delete_row_dialog": "删除行",
             "row_index": "行索引",
             "delete": "删除",
@@ -705,8 +2250,31 @@ class JsonEditorFunctions:  # 定义JsonEditorFunctions类
             "selected_excel_file": "已选择的 Excel 文件",
             "sheet_name": "工作表名",
             "excel_column": "Excel 列",
+            "excel_key_column": "Excel 键列",
+            "json_key_column": "JSON 键列",
             "target_json_column": "目标 JSON 列",
             "import": "导入",
+            "progress_dialog": "处理中...",
+            "cancel": "取消",
+            "memory_report": "每列内存占用",
+            "find": "查找",
+            "undo": "撤销",
+            "redo": "重做",
+            "undo_memory": "撤销历史内存 (MB)",
+            "workspace_memory": "打开文件内存 (MB)",
+            "close_tab": "关闭标签",
+            "compute_column": "计算列",
+            "formula_dialog": "计算列",
+            "formula_column": "目标列",
+            "formula_expression": "表达式",
+            "formula_where": "仅限满足条件的行",
+            "clear": "清除",
+            "debug_window": "性能分析",
+            "enable_profiling": "记录操作耗时",
+            "track_memory": "跟踪内存（tracemalloc，较慢）",
+            "export_trace": "导出 Chrome Trace",
+            "all_columns": "全部列",
+            "matches": "条匹配",
             "language": "语言",
             "english": "英文",
             "chinese": "中文",
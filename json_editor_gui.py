@@ -4,20 +4,60 @@
 # Copyright (c) 2024 zhang kang All rights reserved.
 # -*- coding: utf-8 -*-
 
+import time
+
+STARTUP_TIME = time.perf_counter()  # 启动计时的起点，在导入其他模块之前记录
+
+import argparse
+import os
+import sys
 import dearpygui.dearpygui as dpg  # 导入Dear PyGui库，用于创建图形用户界面
 import platform  # 导入platform模块，用于检测操作系统
+import warnings
 from json_editor_functions import JsonEditorFunctions  # 导入JsonEditorFunctions类
-import pandas as pd  # 导入pandas库，用于数据处理
+import json_editor_index  # 导入查找索引模块
+import json_editor_lazy  # 导入延迟导入模块
+import json_editor_profile  # 导入耗时记录模块
+import json_editor_tasks  # 导入后台任务模块
+import json_editor_types  # 导入列类型模块
+from json_editor_lazy import pandas as pd  # 首次使用时才导入pandas，缩短启动时间
+
+STARTUP_BUDGET_SECONDS = 1.0  # 从启动到显示第一帧的时间预算
+FONT_SIZE = 20  # 字体大小
+SORT_ARROWS = {True: "▲", False: "▼"}  # 表头上排序列的方向
 
 
 class JsonEditorApp(
     JsonEditorFunctions
 ):  # 定义JsonEditorApp类，继承自JsonEditorFunctions
+    document_state = JsonEditorFunctions.document_state + (
+        "view_row_start",
+        "view_col_start",
+    )  # 每个文档还保留各自的滚动位置
+
     def __init__(self):  # 初始化函数
         super().__init__(dpg)  # 调用父类的初始化函数
+        self.tasks = json_editor_tasks.TaskRunner()  # 后台任务执行器
         self.column_width = 150  # 每列的固定宽度
         self.language = "Chinese"  # 默认语言为英语
         self.index_color_differentiation = False  # 初始化为不启用索引颜色区分
+        self.row_height = 30  # 每行的估计高度
+        self.scrollbar_size = 20  # 滚动条宽度
+        self.wheel_rows = 3  # 鼠标滚轮每格滚动的行数
+        self.view_row_start = 0  # 第一条可见行
+        self.view_col_start = 0  # 第一条可见列
+        self.table_columns = []  # 表格显示的全部列
+        self.table_column_ids = []  # 复用的表格列
+        self.table_type_combos = []  # 复用的类型下拉框
+        self.table_row_ids = []  # 复用的表格行
+        self.table_index_texts = []  # 复用的行索引文本
+        self.table_cells = []  # 复用的单元格 [group, 控件, 控件类型]
+        self.table_row_index = []  # 每个复用行当前显示的数据框行，-1表示隐藏
+        self.color_themes = {}  # 颜色按钮 -> (主题, 按钮颜色项)，绑定时只修改颜色值
+        self.display_colors = None  # ColorDisplay列的RGB数组，按需计算
+        self.table_sort_specs = {}  # 表头槽位上Dear ImGui的排序状态 {槽位: (列名, 是否升序)}
+        self.hidden_sort_columns = []  # 为清除排序箭头而隐藏一帧的表头 [(列, 隐藏时的帧号)]
+        self.cell_edit = None  # 正在输入的单元格控件和合并其撤销的历史 (控件, 历史)
         dpg.create_context()  # 创建Dear PyGui上下文
 
         dpg.create_viewport(  # 创建视口
@@ -29,17 +69,21 @@ class JsonEditorApp(
             large_icon="ico.ico",  # 大图标
         )
 
-        FONT = self.get_font_path()  # 获取字体路径
-        with dpg.font_registry():  # 注册字体
-            with dpg.font(FONT, 20) as ft:  # 设置字体大小为20
-                dpg.add_font_range_hint(dpg.mvFontRangeHint_Default)  # 默认字体范围提示
-                dpg.add_font_range_hint(
-                    dpg.mvFontRangeHint_Chinese_Simplified_Common
-                )  # 简体中文常用字体范围提示
-                dpg.add_font_range_hint(
-                    dpg.mvFontRangeHint_Chinese_Full
-                )  # 全部简体中文字体范围提示
-            dpg.bind_font(ft)  # 绑定字体
+        # 启动时只栅格化常用字符，数据中出现的其他字符在打开文件后按需加入
+        self.font_path = self.get_font_path()  # 获取字体路径
+        self.font_registry = dpg.add_font_registry()  # 注册字体
+        self.font = None  # 当前绑定的字体
+        self.font_chars = json_editor_types.text_chars(
+            [],
+            (
+                text
+                for texts in [*JsonEditorFunctions.languageDirc.values(), SORT_ARROWS]
+                for text in texts.values()
+            ),
+        )  # 常用范围之外、按需加入字体的字符，初始为界面文本中的字符
+        self.dynamic_glyphs = False  # Dear PyGui是否自行按需栅格化字符
+        self.create_font()
+        self.startup_seconds = None  # 从启动到显示第一帧的时间
 
         self.texts = JsonEditorFunctions.languageDirc  # 获取语言字典
 
@@ -80,10 +124,40 @@ class JsonEditorApp(
                     enabled=False,  # 默认禁用
                     tag="save_json_menu_item",  # 菜单项标签
                 )
+                self.save_compact_menu_item = dpg.add_menu_item(  # 添加紧凑保存菜单项
+                    label=self.texts[self.language]["save_json_compact"],
+                    callback=self.save_json_compact,
+                    enabled=False,
+                    tag="save_json_compact_menu_item",
+                )
+                self.export_menu_item = dpg.add_menu_item(  # 添加导出菜单项
+                    label=self.texts[self.language]["export_file"],
+                    callback=self.show_export_file_dialog,
+                    enabled=False,
+                    tag="export_menu_item",
+                )
+                self.close_tab_menu_item = dpg.add_menu_item(  # 关闭当前标签
+                    label=self.texts[self.language]["close_tab"],
+                    callback=lambda: self.close_document(),
+                    enabled=False,
+                    tag="close_tab_menu_item",
+                )
 
             with dpg.menu(
                 label=self.texts[self.language]["edit_menu"], tag="edit_menu"
             ):  # 创建编辑菜单
+                dpg.add_menu_item(
+                    label=self.texts[self.language]["undo"],
+                    shortcut="Ctrl+Z",
+                    callback=self.undo,
+                    tag="undo_menu_item",
+                )  # 添加撤销菜单项
+                dpg.add_menu_item(
+                    label=self.texts[self.language]["redo"],
+                    shortcut="Ctrl+Y",
+                    callback=self.redo,
+                    tag="redo_menu_item",
+                )  # 添加重做菜单项
                 dpg.add_menu_item(
                     label=self.texts[self.language]["add_row"],
                     callback=self.add_row,
@@ -109,6 +183,11 @@ class JsonEditorApp(
                     callback=self.show_import_excel_dialog,
                     tag="import_excel_menu_item",
                 )  # 添加导入Excel列菜单项
+                dpg.add_menu_item(
+                    label=self.texts[self.language]["compute_column"],
+                    callback=self.show_formula_dialog,
+                    tag="compute_column_menu_item",
+                )  # 添加计算列菜单项
 
             with dpg.menu(
                 label=self.texts[self.language]["editor_menu"], tag="editor_menu"
@@ -118,92 +197,712 @@ class JsonEditorApp(
                     callback=self.show_settings_dialog,
                     tag="settings_menu_item",
                 )  # 添加设置菜单项
+                dpg.add_menu_item(
+                    label=self.texts[self.language]["debug_window"],
+                    callback=self.show_debug_window,
+                    tag="debug_window_menu_item",
+                )  # 添加性能分析窗口菜单项
 
     def create_table_window(self):  # 创建表格窗口函数
+        dpg.add_tab_bar(
+            callback=self.on_document_tab, tag="document_tabs"
+        )  # 每个打开的文件一个标签
+        with dpg.group(horizontal=True):  # 查找栏
+            dpg.add_combo(
+                items=[self.texts[self.language]["all_columns"]],
+                default_value=self.texts[self.language]["all_columns"],
+                width=self.column_width,
+                tag="filter_column",
+            )  # 查找的列
+            dpg.add_combo(
+                items=json_editor_index.FILTER_MODES,
+                default_value=json_editor_index.FILTER_MODES[0],
+                width=100,
+                tag="filter_mode",
+            )  # 查找方式
+            dpg.add_input_text(
+                hint=f"text / 10{json_editor_index.RANGE_SEPARATOR}20",
+                width=250,
+                on_enter=True,
+                callback=self.find_rows,
+                tag="filter_text",
+            )  # 回车开始查找
+            dpg.add_button(
+                label=self.texts[self.language]["find"],
+                callback=self.find_rows,
+                tag="find_button",
+            )
+            dpg.add_button(
+                label=self.texts[self.language]["clear"],
+                callback=self.clear_filter,
+                tag="clear_filter_button",
+            )
+            dpg.add_text("", tag="filter_status")  # 匹配的行数
+
         with dpg.child_window(  # 创建子窗口
-            width=-1, height=-1, horizontal_scrollbar=True, tag="Table Window"
+            width=-1, height=-1, no_scrollbar=True, tag="Table Window"
         ):
-            self.table_id = dpg.add_table(  # 添加表格
-                header_row=True,  # 表头行
-                resizable=False,  # 不可调整大小
-                borders_innerH=True,  # 内部水平边框
-                borders_outerH=True,  # 外部水平边框
-                borders_innerV=True,  # 内部垂直边框
-                borders_outerV=True,  # 外部垂直边框
-                policy=dpg.mvTable_SizingFixedFit,  # 固定列宽
+            with dpg.group(horizontal=True):
+                self.table_id = dpg.add_table(  # 添加表格
+                    header_row=True,  # 表头行
+                    resizable=False,  # 不可调整大小
+                    borders_innerH=True,  # 内部水平边框
+                    borders_outerH=True,  # 外部水平边框
+                    borders_innerV=True,  # 内部垂直边框
+                    borders_outerV=True,  # 外部垂直边框
+                    policy=dpg.mvTable_SizingFixedFit,  # 固定列宽
+                    sortable=True,  # 点击表头排序
+                    sort_multi=True,  # 按住Shift点击表头添加次要排序键
+                    sort_tristate=True,  # 再次点击可取消排序
+                    callback=self.on_table_sort,
+                )
+                dpg.add_slider_int(  # 垂直滚动条，最大值在上方
+                    vertical=True,
+                    min_value=0,
+                    max_value=0,
+                    format="",
+                    width=self.scrollbar_size,
+                    height=-self.scrollbar_size,
+                    callback=self.on_table_v_scroll,
+                    tag="table_v_scroll",
+                )
+            dpg.add_slider_int(  # 水平滚动条
+                min_value=0,
+                max_value=0,
+                format="",
+                width=-self.scrollbar_size,
+                callback=self.on_table_h_scroll,
+                tag="table_h_scroll",
             )
 
-    def update_table(self):  # 更新表格函数
-        dpg.delete_item(self.table_id, children_only=True)  # 删除表格中的所有子项
-        if self.df is None:  # 如果数据框为空，返回
+        with dpg.handler_registry():  # 鼠标滚轮驱动表格滚动，快捷键撤销/重做
+            dpg.add_mouse_wheel_handler(callback=self.on_table_wheel)
+            dpg.add_key_press_handler(dpg.mvKey_Z, callback=self.on_undo_key)
+            dpg.add_key_press_handler(dpg.mvKey_Y, callback=self.on_redo_key)
+
+    def create_font(self):  # 创建并绑定字体：基本范围、常用简体中文和按需加入的字符
+        with dpg.font(self.font_path, FONT_SIZE, parent=self.font_registry) as font:
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always", DeprecationWarning)
+                dpg.add_font_range_hint(dpg.mvFontRangeHint_Default)  # 默认字体范围提示
+                dpg.add_font_range_hint(
+                    dpg.mvFontRangeHint_Chinese_Simplified_Common
+                )  # 简体中文常用字体范围提示
+                if self.font_chars:
+                    dpg.add_font_chars(sorted(ord(char) for char in self.font_chars))
+        # 新版Dear PyGui按需栅格化字符，范围提示已废弃，之后不再重建字体
+        self.dynamic_glyphs = any(
+            issubclass(warning.category, DeprecationWarning) for warning in caught
+        )
+        dpg.bind_font(font)  # 绑定字体
+        if self.font is not None:
+            dpg.delete_item(self.font)
+        self.font = font
+
+    def add_glyph_chars(self, chars):  # 出现新字符时重建字体
+        if self.dynamic_glyphs:
             return
+        new_chars = set(chars) - self.font_chars
+        if new_chars:
+            self.font_chars |= new_chars
+            self.create_font()
+
+    def add_glyphs(self, texts):  # 把文本中的字符加入字体
+        self.add_glyph_chars(json_editor_types.text_chars([], texts))
 
+    def scan_glyphs(self, columns=None):  # 在后台收集列中的字符，完成后按需重建字体
+        if self.df is None or self.dynamic_glyphs:
+            return
+        if columns is None:
+            columns = list(self.df.columns)
+        series = [self.df[col] for col in columns if col in self.df.columns]
+        names = [str(col) for col in columns]
+        self.run_quiet_task(
+            json_editor_tasks.BackgroundTask("Scanning characters", locks_data=False),
+            lambda task: json_editor_types.text_chars(series, names),
+            self.add_glyph_chars,
+            lambda error: None,  # 扫描失败时只是少显示一些字符
+        )
+
+    def finish_open_json(self, file_path, df, spans, column_types, lines=None):
+        super().finish_open_json(file_path, df, spans, column_types, lines)
+        self.scan_glyphs()
+
+    def set_cell_value(self, index, col, value, patch=True):
+        if isinstance(value, str):
+            self.add_glyphs([value])  # 新输入的字符
+        super().set_cell_value(index, col, value, patch)
+        if col == "ColorDisplay" and self.display_colors is not None:
+            self.display_colors[index] = json_editor_types.color_array(
+                [self.df.at[index, col]]
+            )[0]  # 只更新这一行的颜色
+            self.patch_row_color(index)
+
+    def invalidate_column(self, col):
+        super().invalidate_column(col)
+        if col == "ColorDisplay":
+            self.display_colors = None
+
+    def update_document_tabs(self):  # 每个打开的文档一个标签，选中活动文档
+        dpg.delete_item("document_tabs", children_only=True)
+        for document in self.workspace.documents:
+            tab = dpg.add_tab(
+                label=f"{os.path.basename(document.file_path)}##{document.number}",
+                parent="document_tabs",
+                user_data=document,
+            )  # ##之后的编号使同名文件的标签不冲突
+            if document is self.workspace.active:
+                dpg.set_value("document_tabs", tab)
+        enabled = self.df is not None
+        for item in (
+            self.save_menu_item,
+            self.save_compact_menu_item,
+            self.export_menu_item,
+            self.close_tab_menu_item,
+        ):
+            dpg.configure_item(item, enabled=enabled)
+        if self.filter_rows is None:  # 查找栏显示该文档的查找结果
+            dpg.set_value("filter_text", "")
+            dpg.set_value("filter_status", "")
+        else:
+            dpg.set_value(
+                "filter_status",
+                f"{len(self.filter_rows)} {self.texts[self.language]['matches']}",
+            )
+
+    def on_document_tab(self, sender, app_data):  # 点击标签切换文档
+        document = dpg.get_item_user_data(app_data)
+        if document is not None and document is not self.workspace.active:
+            self.switch_document(document)
+
+    def get_table_columns(self):  # 获取表格要显示的列
+        if self.df is None:
+            return []
         columns = list(self.df.columns)  # 获取数据框的列名
         if self.index_color_differentiation and "ColorDisplay" not in columns:
             columns.append("ColorDisplay")
             self.df["ColorDisplay"] = "#000000"  # 默认颜色
+            self.display_colors = None
+        return columns
+
+    def get_display_colors(self):  # 每行索引文字的RGB数组，行数变化后重新计算
+        if self.display_colors is None or len(self.display_colors) != len(self.df):
+            self.display_colors = json_editor_types.color_array(self.df["ColorDisplay"])
+        return self.display_colors
+
+    def patch_row_color(self, index):  # 只更新一个可见行的索引颜色
+        if self.index_color_differentiation and index in self.table_row_index:
+            slot = self.table_row_index.index(index)
+            dpg.configure_item(
+                self.table_index_texts[slot],
+                color=self.get_display_colors()[index].tolist(),
+            )
+
+    def get_visible_capacity(self):  # 计算表格窗口能容纳的行数和列数
+        width = dpg.get_item_width("Table Window") or dpg.get_viewport_client_width()
+        height = (
+            dpg.get_item_height("Table Window") or dpg.get_viewport_client_height()
+        )
+        if width <= 0 or height <= 0:  # 窗口尚未布局时使用视口大小
+            width = dpg.get_viewport_client_width() - 20
+            height = dpg.get_viewport_client_height() - 60
+        rows = (height - self.scrollbar_size) // self.row_height - 2  # 减去表头和类型行
+        cols = (width - self.scrollbar_size) // self.column_width - 1  # 减去索引列
+        return max(1, rows), max(1, cols)
+
+    @json_editor_profile.timed
+    def update_table(self):  # 更新表格函数：按可见区域重建控件池
+        dpg.delete_item(self.table_id, children_only=True)  # 删除表格中的所有子项
+        for theme, _ in self.color_themes.values():
+            dpg.delete_item(theme)
+        self.color_themes = {}
+        self.display_colors = None  # 数据或文档可能已变化
+        self.table_columns = []
+        self.table_column_ids = []
+        self.table_sort_specs = {}  # 新建的表头没有排序状态
+        self.hidden_sort_columns = []
+        self.table_type_combos = []
+        self.table_row_ids = []
+        self.table_index_texts = []
+        self.table_cells = []
+        self.table_row_index = []
+        self.update_filter_columns()
+        if self.df is None:  # 如果数据框为空，返回
+            return
+
+        self.table_columns = self.get_table_columns()
+        visible_rows, visible_cols = self.get_visible_capacity()
+        visible_rows = min(visible_rows, self.get_view_length())
+        visible_cols = min(visible_cols, len(self.table_columns))
         total_width = (
-            len(columns) + 1
+            visible_cols + 1
         ) * self.column_width  # 计算表格总宽度 (包含索引列)
-
         dpg.set_item_width(self.table_id, total_width)  # 设置表格宽度
 
         dpg.add_table_column(
-            label="", parent=self.table_id, width=self.column_width
-        )  # 添加索引列
-
-        for col in columns:  # 设置表格列
-            dpg.add_table_column(
-                label=col, parent=self.table_id, width=self.column_width
-            )  # 添加表格列
+            label="", parent=self.table_id, width=self.column_width, no_sort=True
+        )  # 添加固定的索引列
+        for _ in range(visible_cols):  # 添加可复用的数据列
+            self.table_column_ids.append(
+                dpg.add_table_column(
+                    label="", parent=self.table_id, width=self.column_width
+                )
+            )
 
         with dpg.table_row(parent=self.table_id):  # 添加数据类型选项
             dpg.add_text("Type")  # 添加索引列的标题
-            for col in columns:
-                dpg.add_combo(
-                    items=["string", "int", "float", "bool", "color"],
-                    default_value=self.column_types.get(col, "string"),
-                    user_data=col,
-                    callback=self.change_column_type,
-                    width=self.column_width,
+            for _ in range(visible_cols):
+                self.table_type_combos.append(
+                    dpg.add_combo(
+                        items=json_editor_types.COLUMN_TYPES,
+                        callback=self.change_column_type,
+                        width=self.column_width,
+                    )
                 )  # 添加下拉框，用于选择列类型
 
-        for index, row in self.df.iterrows():  # 添加数据行
-            with dpg.table_row(parent=self.table_id):
+        for _ in range(visible_rows):  # 添加可复用的数据行
+            self.add_table_row_slot()
+
+        self.clamp_table_scroll()
+        self.bind_visible_columns()
+        self.bind_visible_rows()
+
+    def add_table_row_slot(self):  # 在控件池末尾添加一行
+        with dpg.table_row(parent=self.table_id) as row_id:
+            self.table_row_ids.append(row_id)
+            self.table_row_index.append(-1)
+            self.table_index_texts.append(dpg.add_text(""))  # 行索引
+            # 每个单元格用group包裹，类型变化时只替换group内的控件
+            self.table_cells.append(
+                [[dpg.add_group(), None, None] for _ in self.table_column_ids]
+            )
+
+    def remove_table_row_slot(self):  # 移除控件池的最后一行
+        dpg.delete_item(self.table_row_ids.pop())
+        self.table_row_index.pop()
+        self.table_index_texts.pop()
+        self.table_cells.pop()
+
+    def fit_table_row_slots(self):  # 使控件池行数与显示行数和窗口容量一致
+        visible_rows, _ = self.get_visible_capacity()
+        wanted = min(visible_rows, self.get_view_length())
+        while len(self.table_row_ids) < wanted:
+            self.add_table_row_slot()
+        while len(self.table_row_ids) > wanted:
+            self.remove_table_row_slot()
+
+    def clamp_table_scroll(self):  # 限制滚动位置并同步滚动条
+        row_count = self.get_view_length()
+        max_row = max(0, row_count - len(self.table_row_ids))
+        max_col = max(0, len(self.table_columns) - len(self.table_column_ids))
+        self.view_row_start = min(max(self.view_row_start, 0), max_row)
+        self.view_col_start = min(max(self.view_col_start, 0), max_col)
+        dpg.configure_item("table_v_scroll", max_value=max_row)
+        dpg.set_value("table_v_scroll", max_row - self.view_row_start)
+        dpg.configure_item("table_h_scroll", max_value=max_col)
+        dpg.set_value("table_h_scroll", self.view_col_start)
+
+    def get_cell_kind(self, col):  # 获取单元格控件类型
+        col_type = self.column_types.get(col)
+        return col_type if col_type in ("bool", "color") else "text"
+
+    @json_editor_profile.timed
+    def bind_visible_columns(self):  # 将可见列绑定到表头和类型下拉框
+        for slot, column_id in enumerate(self.table_column_ids):
+            col = self.table_columns[self.view_col_start + slot]
+            dpg.set_item_label(column_id, self.column_label(col))  # 设置列标题
+            dpg.configure_item(self.table_type_combos[slot], user_data=col)
+            dpg.set_value(
+                self.table_type_combos[slot], self.column_types.get(col, "string")
+            )
+        self.clear_stale_sort_specs()
+
+    def column_label(self, col):  # 表头文字：排序列显示方向，多列排序时显示次序
+        for order, (key, ascending) in enumerate(self.sort_keys):
+            if key == col:
+                if len(self.sort_keys) > 1:
+                    return f"{col} {SORT_ARROWS[ascending]}{order + 1}"
+                return f"{col} {SORT_ARROWS[ascending]}"
+        return col
+
+    def clear_stale_sort_specs(self):
+        # 表头槽位是复用的：槽位上的列变化后，Dear ImGui在该槽位显示的排序箭头已不属于它
+        # 没有直接设置排序状态的接口，隐藏该表头一帧使Dear ImGui清除其排序状态
+        visible = self.get_visible_columns()
+        for slot, (col, _) in list(self.table_sort_specs.items()):
+            if slot < len(visible) and visible[slot] == col:
+                continue
+            del self.table_sort_specs[slot]  # 清除后的排序回调不再视为点击
+            if slot < len(self.table_column_ids):
+                column_id = self.table_column_ids[slot]
+                dpg.configure_item(column_id, show=False)
+                self.hidden_sort_columns.append((column_id, dpg.get_frame_count()))
+
+    def restore_sort_columns(self):  # 每帧渲染前重新显示已经隐藏过一帧的表头
+        if not self.hidden_sort_columns:
+            return
+        frame = dpg.get_frame_count()
+        waiting = []
+        for column_id, hidden_frame in self.hidden_sort_columns:
+            if frame <= hidden_frame + 1:
+                waiting.append((column_id, hidden_frame))
+            elif dpg.does_item_exist(column_id):
+                dpg.configure_item(column_id, show=True)
+        self.hidden_sort_columns = waiting
+
+    def get_visible_columns(self):  # 获取当前可见的列
+        return self.table_columns[
+            self.view_col_start : self.view_col_start + len(self.table_column_ids)
+        ]
+
+    @json_editor_profile.timed
+    def bind_visible_rows(self, first_index=0, only_col=None):
+        # 将可见行的数据绑定到复用的控件，可只绑定显示位置first_index之后的行或单独一列
+        if not self.table_row_ids:
+            return
+        start = max(self.view_row_start, first_index)
+        stop = min(
+            self.view_row_start + len(self.table_row_ids), self.get_view_length()
+        )
+        col_slots = [
+            (col_slot, col)
+            for col_slot, col in enumerate(self.get_visible_columns())
+            if only_col is None or col == only_col
+        ]
+        if start < stop:
+            rows = self.get_view_rows(start, stop)  # 显示位置对应的数据框行
+            block = (
+                self.df[[col for _, col in col_slots]]
+                .iloc[rows]
+                .to_numpy(dtype=object)
+            )
+            if self.index_color_differentiation and only_col is None:
+                colors = self.get_display_colors()[rows].tolist()  # 预先计算的RGB
+            button_colors = {  # 颜色列整块转换为按钮颜色
+                k: json_editor_types.color_array(block[:, k], "#000000").tolist()
+                for k, (_, col) in enumerate(col_slots)
+                if self.get_cell_kind(col) == "color"
+            }
+        for slot in range(start - self.view_row_start, len(self.table_row_ids)):
+            position = self.view_row_start + slot
+            if position >= stop:
+                self.table_row_index[slot] = -1
+                dpg.hide_item(self.table_row_ids[slot])  # 隐藏超出数据范围的行
+                continue
+            index = int(rows[position - start])
+            self.table_row_index[slot] = index
+            values = block[position - start]
+            if only_col is None:
+                dpg.show_item(self.table_row_ids[slot])
                 if self.index_color_differentiation:
-                    color = row["ColorDisplay"]
+                    color_rgb = colors[position - start]
                 else:
-                    color = "#FFFFFF"
-                color_rgb = [int(color[i : i + 2], 16) for i in (1, 3, 5)]
-                dpg.add_text(str(index), color=color_rgb)  # 添加行索引并设置颜色
-                for col in columns:
-                    if self.column_types.get(col) == "bool":
-                        dpg.add_combo(
-                            items=["True", "False"],
-                            default_value="True" if row[col] else "False",
-                            user_data=(index, col),
-                            callback=self.edit_cell,
-                            width=self.column_width,
-                        )  # 添加下拉框，用于选择布尔值
-                    elif self.column_types.get(col) == "color":
-                        dpg.add_button(
-                            label=row[col],
-                            callback=self.show_color_picker,
-                            user_data=(index, col),
+                    color_rgb = [255, 255, 255]
+                dpg.set_value(self.table_index_texts[slot], str(index))
+                dpg.configure_item(
+                    self.table_index_texts[slot], color=color_rgb
+                )  # 设置行索引并设置颜色
+            for k, (col_slot, col) in enumerate(col_slots):
+                self.bind_cell(
+                    self.table_cells[slot][col_slot],
+                    index,
+                    col,
+                    values[k],
+                    button_colors[k][position - start] if k in button_colors else None,
+                )
+
+    def get_visible_column_slot(self, col):  # 获取列在控件池中的位置
+        visible = self.get_visible_columns()
+        return visible.index(col) if col in visible else None
+
+    def patch_cell(self, index, col):  # 只重新绑定一个可见单元格
+        if index not in self.table_row_index:
+            return
+        slot = self.table_row_index.index(index)
+        col_slot = self.get_visible_column_slot(col)
+        if col_slot is not None:
+            self.bind_cell(
+                self.table_cells[slot][col_slot], index, col, self.df.at[index, col]
+            )
+
+    def patch_rows_appended(self, count):  # 追加行：只补充控件池并绑定新行
+        self.display_colors = None
+        if not self.table_column_ids and self.table_columns:
+            self.update_table()
+            return
+        self.fit_table_row_slots()
+        self.clamp_table_scroll()
+        self.bind_visible_rows(first_index=self.get_view_length() - count)
+
+    def patch_row_deleted(self, index):  # 删除行：只重新编号被删除行之后的可见行
+        self.display_colors = None
+        old_start = self.view_row_start
+        self.fit_table_row_slots()
+        self.clamp_table_scroll()
+        if self.view_row_start != old_start or self.view_rows is not None:
+            index = 0  # 滚动位置被修正或只显示部分行时，整体重新绑定
+        self.bind_visible_rows(first_index=index)
+
+    def patch_rows_inserted(self, index):  # 插入行：与删除行相同，只重新绑定之后的可见行
+        self.patch_row_deleted(index)
+
+    def patch_column_renamed(self, old_name, new_name):  # 重命名列：只更新该列
+        self.table_columns = [
+            new_name if col == old_name else col for col in self.table_columns
+        ]
+        self.update_filter_columns()
+        self.table_sort_specs = {
+            slot: (new_name if col == old_name else col, asc)
+            for slot, (col, asc) in self.table_sort_specs.items()
+        }
+        col_slot = self.get_visible_column_slot(new_name)
+        if col_slot is not None:
+            dpg.set_item_label(self.table_column_ids[col_slot], self.column_label(new_name))
+            dpg.configure_item(self.table_type_combos[col_slot], user_data=new_name)
+            self.bind_visible_rows(only_col=new_name)  # 更新单元格的user_data
+
+    @json_editor_profile.timed
+    def patch_column_type(self, col):  # 改变列类型：只替换该列的控件
+        self.scan_glyphs([col])
+        col_slot = self.get_visible_column_slot(col)
+        if col_slot is not None:
+            dpg.set_value(
+                self.table_type_combos[col_slot], self.column_types.get(col, "string")
+            )
+            self.bind_visible_rows(only_col=col)
+
+    @json_editor_profile.timed
+    def patch_columns_changed(self):  # 添加或删除列：控件池列数不变时只重新绑定
+        self.scan_glyphs()
+        columns = self.get_table_columns()
+        _, visible_cols = self.get_visible_capacity()
+        if min(visible_cols, len(columns)) != len(self.table_column_ids):
+            self.update_table()
+            return
+        self.update_filter_columns()
+        self.table_columns = columns
+        self.clamp_table_scroll()
+        self.bind_visible_columns()
+        self.bind_visible_rows()
+
+    def bind_cell(self, cell, index, col, value, rgb=None):
+        # 将单个值绑定到单元格控件，rgb为颜色列已转换好的按钮颜色
+        group, widget, kind = cell
+        new_kind = self.get_cell_kind(col)
+        if new_kind != kind:  # 列类型变化时替换控件
+            if kind == "color":
+                dpg.delete_item(self.color_themes.pop(widget)[0])
+            dpg.delete_item(group, children_only=True)
+            if new_kind == "bool":
+                widget = dpg.add_combo(
+                    items=["True", "False"],
+                    callback=self.edit_cell,
+                    width=self.column_width,
+                    parent=group,
+                )  # 添加下拉框，用于选择布尔值
+            elif new_kind == "color":
+                widget = dpg.add_button(
+                    callback=self.show_color_picker,
+                    width=self.column_width,
+                    parent=group,
+                )  # 添加按钮，背景为单元格的颜色
+                with dpg.theme() as theme:
+                    with dpg.theme_component(dpg.mvButton):
+                        self.color_themes[widget] = (
+                            theme,
+                            dpg.add_theme_color(dpg.mvThemeCol_Button, (0, 0, 0)),
                         )
-                    else:
-                        dpg.add_input_text(
-                            default_value=str(row[col]),
-                            callback=self.edit_cell,
-                            user_data=(index, col),
-                            width=self.column_width,
-                        )  # 添加输入框，用于输入文本
-
-    def run(self):  # 运行函数
-        dpg.start_dearpygui()  # 启动Dear PyGui
+                dpg.bind_item_theme(widget, theme)
+            else:
+                widget = dpg.add_input_text(
+                    callback=self.edit_cell,
+                    width=self.column_width,
+                    parent=group,
+                )  # 添加输入框，用于输入文本
+            cell[1], cell[2] = widget, new_kind
+        dpg.configure_item(widget, user_data=(index, col))
+        if value is pd.NA or value is None:  # 可空类型的缺失值显示为空
+            value = ""
+        if new_kind == "bool":
+            dpg.set_value(widget, "True" if value else "False")
+        elif new_kind == "color":
+            dpg.set_item_label(widget, str(value))
+            if rgb is None:
+                rgb = json_editor_types.color_array([value], "#000000")[0].tolist()
+            dpg.set_value(self.color_themes[widget][1], [*rgb, 255])
+        else:
+            dpg.set_value(widget, str(value))
+
+    def on_table_sort(self, sender, sort_specs):
+        # 表头排序回调：self.sort_keys按列名保存排序，Dear ImGui报告的是复用的槽位
+        # 只把这次点击变化的槽位映射为列名，再按列名合并到已有的排序键
+        if self.df is None:
+            return
+        specs = {}
+        for column_id, direction in sort_specs or []:
+            if column_id in self.table_column_ids:
+                specs[self.table_column_ids.index(column_id)] = direction > 0
+        old = self.table_sort_specs
+        changed = [slot for slot, asc in specs.items() if slot not in old or old[slot][1] != asc]
+        removed = [old[slot][0] for slot in old if slot not in specs]
+        if not changed and not removed:  # 例如清除旧槽位的排序状态后的回调
+            return
+        visible = self.get_visible_columns()
+        self.table_sort_specs = {
+            slot: (old[slot][0] if slot in old else visible[slot], asc)
+            for slot, asc in specs.items()
+        }
+        clicked = [(visible[slot], specs[slot]) for slot in changed]
+        if dpg.is_key_down(dpg.mvKey_LShift) or dpg.is_key_down(dpg.mvKey_RShift):
+            keys = [(col, asc) for col, asc in self.sort_keys if col not in removed]
+            for col, asc in clicked:
+                if any(key == col for key, _ in keys):  # 已有的排序列只改变方向
+                    keys = [(key, asc if key == col else a) for key, a in keys]
+                else:
+                    keys.append((col, asc))
+        else:  # 不按Shift点击：只按该列排序（三态点击取消时恢复原顺序）
+            keys = clicked
+        self.sort_by(keys)
+        self.bind_visible_columns()  # 更新表头上的排序箭头
+
+    def refresh_view(self):  # 显示的行变化：回到顶部并重新绑定
+        if not self.table_column_ids:
+            self.update_table()
+            return
+        self.view_row_start = 0
+        self.fit_table_row_slots()
+        self.clamp_table_scroll()
+        self.bind_visible_rows()
+
+    @json_editor_profile.timed
+    def scroll_table_to(self, row_start=None, col_start=None):  # 滚动到指定位置
+        old_col_start = self.view_col_start
+        if row_start is not None:
+            self.view_row_start = row_start
+        if col_start is not None:
+            self.view_col_start = col_start
+        self.clamp_table_scroll()
+        if self.view_col_start != old_col_start:
+            self.bind_visible_columns()
+        self.bind_visible_rows()
+
+    def on_table_v_scroll(self, sender, app_data):  # 垂直滚动条回调函数
+        max_row = dpg.get_item_configuration("table_v_scroll")["max_value"]
+        self.scroll_table_to(row_start=max_row - app_data)
+
+    def on_table_h_scroll(self, sender, app_data):  # 水平滚动条回调函数
+        self.scroll_table_to(col_start=app_data)
+
+    def on_table_wheel(self, sender, app_data):  # 鼠标滚轮回调函数
+        if self.df is None or not dpg.is_item_hovered("Table Window"):
+            return
+        steps = -int(app_data) * self.wheel_rows
+        if dpg.is_key_down(dpg.mvKey_LShift) or dpg.is_key_down(dpg.mvKey_RShift):
+            self.scroll_table_to(col_start=self.view_col_start - int(app_data))
+        else:
+            self.scroll_table_to(row_start=self.view_row_start + steps)
+
+    def is_ctrl_down(self):  # 是否按住Ctrl键
+        return dpg.is_key_down(dpg.mvKey_LControl) or dpg.is_key_down(
+            dpg.mvKey_RControl
+        )
+
+    def is_text_input_active(self):  # 是否正在输入框中输入，此时Ctrl+Z/Y由输入框自己处理
+        item = dpg.get_focused_item()
+        return bool(item) and (
+            dpg.does_item_exist(item)
+            and dpg.get_item_type(item) == "mvAppItemType::mvInputText"
+            and dpg.is_item_active(item)
+        )
+
+    def on_undo_key(self, sender, app_data):  # Ctrl+Z撤销，Ctrl+Shift+Z重做
+        if not self.is_ctrl_down() or self.is_text_input_active():
+            return
+        if dpg.is_key_down(dpg.mvKey_LShift) or dpg.is_key_down(dpg.mvKey_RShift):
+            self.redo()
+        else:
+            self.undo()
+
+    def on_redo_key(self, sender, app_data):  # Ctrl+Y重做
+        if self.is_ctrl_down() and not self.is_text_input_active():
+            self.redo()
+
+    def edit_cell(self, sender, app_data, user_data):  # 同一输入框的连续输入合并为一步撤销
+        if sender is not None and (
+            self.cell_edit is None or self.cell_edit[0] != sender
+        ):
+            self.finish_cell_edit(force=True)
+            self.cell_edit = (sender, self.history)
+            self.history.begin_group()  # 输入框失去焦点（包括回车）后由finish_cell_edit结束
+        super().edit_cell(sender, app_data, user_data)
+
+    def finish_cell_edit(self, force=False):  # 每帧检查：输入框不再激活时结束合并
+        if self.cell_edit is None:
+            return
+        widget, history = self.cell_edit
+        if force or not dpg.does_item_exist(widget) or not dpg.is_item_active(widget):
+            history.end_group()
+            self.cell_edit = None
+
+    def replay_history(self, mode):  # 点击撤销按钮时输入框刚失去焦点，先结束这次输入的合并
+        self.finish_cell_edit()
+        super().replay_history(mode)
+
+    def resize_callback(self, sender, app_data):  # 视口大小调整回调函数
+        super().resize_callback(sender, app_data)
+        if self.df is not None:
+            visible_rows, visible_cols = self.get_visible_capacity()
+            if (
+                min(visible_rows, self.get_view_length()) != len(self.table_row_ids)
+                or min(visible_cols, len(self.table_columns))
+                != len(self.table_column_ids)
+            ):
+                self.update_table()  # 可见区域大小变化时重建控件池
+
+    def run(self, startup_check=False):  # 运行函数，startup_check时显示第一帧后退出
+        while dpg.is_dearpygui_running():  # 手动渲染循环，每帧处理后台任务结果
+            self.process_tasks()
+            self.apply_pending_color()  # 颜色选择器的拖动按帧合并
+            self.restore_sort_columns()
+            self.finish_cell_edit()
+            self.update_debug_window()
+            started = time.perf_counter()
+            dpg.render_dearpygui_frame()
+            json_editor_profile.PROFILER.record_frame(
+                started, time.perf_counter() - started
+            )  # 记录帧耗时
+            if self.startup_seconds is None:  # 第一帧已显示
+                self.startup_seconds = time.perf_counter() - STARTUP_TIME
+                if startup_check:
+                    break
+                json_editor_lazy.preload(pd)  # 窗口显示后在后台导入pandas
+        self.tasks.shutdown()  # 取消未完成的后台任务
+        self.excel_cache.close()  # 关闭缓存的Excel工作簿
+        self.close_workspace()  # 删除非活动文档的磁盘缓存
         dpg.destroy_context()  # 销毁Dear PyGui上下文
 
 
-if __name__ == "__main__":  # 主程序入口
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="JSON Editor")
+    parser.add_argument("file", nargs="?", help="file to open (used by the file association)")
+    parser.add_argument(
+        "--startup-check",
+        action="store_true",
+        help="exit after the first frame and compare the startup time with the budget",
+    )
+    args = parser.parse_args(argv)
     app = JsonEditorApp()  # 创建JsonEditorApp实例
-    app.run()  # 运行应用程序
+    if args.file:
+        app.open_json(args.file)  # 在后台打开，窗口先显示
+    app.run(startup_check=args.startup_check)  # 运行应用程序
+    if args.startup_check:
+        print(
+            f"Startup: {app.startup_seconds:.3f}s "
+            f"(budget {STARTUP_BUDGET_SECONDS:.3f}s)"
+        )
+        return 0 if app.startup_seconds <= STARTUP_BUDGET_SECONDS else 1
+    return 0
+
+
+if __name__ == "__main__":  # 主程序入口
+    sys.exit(main())
@@ -0,0 +1,94 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+
+import sys
+from collections import deque
+
+from json_editor_lazy import pandas as pd  # 首次使用时才导入pandas，缩短启动时间
+
+UNDO_MEMORY_LIMIT = 64 * 1024 * 1024  # 撤销历史默认最多占用的内存
+
+
+def edit_size(edit):  # 估算一条编辑占用的内存
+    size = sys.getsizeof(edit)
+    for value in edit.values():
+        if isinstance(value, (pd.Series, pd.DataFrame)):
+            usage = value.memory_usage(deep=True, index=False)
+            size += int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+        elif isinstance(value, (list, dict)):
+            size += sys.getsizeof(value) + sum(
+                sys.getsizeof(item) for item in value
+            )
+        else:
+            size += sys.getsizeof(value)
+    return size
+
+
+class EditHistory:  # 撤销/重做历史，只保存每次编辑的逆操作
+    def __init__(self, memory_limit=UNDO_MEMORY_LIMIT):
+        self.memory_limit = memory_limit  # 超过后丢弃最早的记录
+        self.undo_stack = deque()  # [(逆操作列表, 占用内存)]
+        self.redo_stack = []
+        self.undo_size = 0
+        self.redo_size = 0
+        self.mode = None  # 正在执行的是 "undo" 还是 "redo"
+        self.group = None  # 正在合并的一组逆操作
+        self.group_depth = 0  # 嵌套的合并层数，最外层结束时才放入栈
+
+    def record(self, inverse):  # 记录一次编辑的逆操作
+        if self.group is not None:
+            self.group.append(inverse)
+            return
+        self.push([inverse])
+
+    def push(self, inverses):  # 把一组逆操作放入对应的栈
+        size = sum(edit_size(inverse) for inverse in inverses)
+        if self.mode == "undo":  # 撤销产生的逆操作用于重做
+            self.redo_stack.append((inverses, size))
+            self.redo_size += size
+            return
+        if self.mode is None:  # 新的编辑使重做历史失效
+            self.redo_stack.clear()
+            self.redo_size = 0
+        self.undo_stack.append((inverses, size))
+        self.undo_size += size
+        self.evict()
+
+    def evict(self):  # 丢弃最早的记录直到不超过内存上限（至少保留最近一条）
+        while self.undo_size > self.memory_limit and len(self.undo_stack) > 1:
+            _, size = self.undo_stack.popleft()
+            self.undo_size -= size
+
+    def set_memory_limit(self, memory_limit):  # 修改内存上限
+        self.memory_limit = memory_limit
+        self.evict()
+
+    def begin_group(self):  # 之后记录的逆操作合并为一步撤销，可以嵌套
+        if self.group_depth == 0:
+            self.group = []
+        self.group_depth += 1
+
+    def end_group(self):  # 结束合并，最外层结束时放入栈
+        if self.group_depth == 0:
+            return
+        self.group_depth -= 1
+        if self.group_depth == 0:
+            group, self.group = self.group, None
+            if group:
+                self.push(group)
+
+    def in_group(self):  # 是否正在合并（例如颜色选择器打开时）
+        return self.group_depth > 0
+
+    def take(self, mode):  # 取出要执行的一步撤销或重做，没有时返回None
+        stack = self.undo_stack if mode == "undo" else self.redo_stack
+        if not stack:
+            return None
+        inverses, size = stack.pop()
+        if mode == "undo":
+            self.undo_size -= size
+        else:
+            self.redo_size -= size
+        return inverses[::-1]  # 一组操作按相反的顺序撤销
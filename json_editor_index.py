@@ -0,0 +1,374 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+
+from json_editor_lazy import numpy as np  # 首次使用时才导入numpy，缩短启动时间
+from json_editor_lazy import pandas as pd  # 首次使用时才导入pandas，缩短启动时间
+from json_editor_types import STRING_DTYPE  # 字符串切片使用的存储类型
+
+FILTER_MODES = ["contains", "equals", "range"]  # 查找方式：子串、精确、范围
+GRAM_SIZE = 3  # 子串索引的n-gram长度
+GRAM_TEXT_LIMIT = 64  # 超过该长度的文本不建n-gram索引，查找时直接检查
+RANGE_SEPARATOR = ".."  # 范围查找的上下限分隔符，如 10..20
+
+
+def display_text(value):  # 单元格在表格中显示的文本，查找时按该文本匹配
+    if value is None or value is pd.NA:
+        return ""
+    if isinstance(value, float) and np.isnan(value):
+        return "nan"
+    return str(value)
+
+
+def text_grams(text):  # 文本中所有不重复的n-gram
+    return {text[i : i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+def remove_positions(rows, index, count):
+    # 从行号数组中去掉[index, index + count)并让之后的行前移，返回(新数组, 保留的掩码)
+    keep = (rows < index) | (rows >= index + count)
+    rows = rows[keep]
+    return rows - count * (rows >= index + count), keep
+
+
+def intersect_sorted(arrays):  # 多个升序数组的交集，从最短的开始
+    arrays = sorted(arrays, key=len)
+    result = arrays[0]
+    for array in arrays[1:]:
+        if not len(result):
+            break
+        result = np.intersect1d(result, array, assume_unique=True)
+    return result
+
+
+class ColumnIndex:  # 单列索引：哈希（精确）、排序（范围）、n-gram（子串），各自按需构建
+    def __init__(self, series):
+        self.series = series  # 构建索引时读取的列数据
+        self.numeric = pd.api.types.is_numeric_dtype(series.dtype) and not (
+            pd.api.types.is_bool_dtype(series.dtype)
+        )
+        self.codes = None  # 每行显示文本的编号
+        self.texts = None  # 编号对应的显示文本
+        self.lookup = None  # 哈希索引：显示文本 -> 编号
+        self.sorted_keys = None  # 排序后的值（不含缺失值）
+        self.sorted_rows = None  # 排序后的值对应的行
+        self.grams = None  # n-gram -> 包含它的文本编号（升序数组）
+        self.lowered = None  # 小写文本，子串查找不区分大小写
+        self.unindexed = None  # 过短或过长、未加入n-gram索引的文本编号
+
+    def build_hash(self):  # 构建哈希索引
+        try:
+            codes, uniques = pd.factorize(self.series, use_na_sentinel=False)
+        except TypeError:  # 列表等不可哈希的值按显示文本分组
+            codes, uniques = pd.factorize(self.series.map(display_text))
+        texts = [display_text(value) for value in uniques]
+        lookup = {text: code for code, text in enumerate(texts)}
+        if len(lookup) != len(texts):  # 不同的值显示为相同文本（如 1 和 "1"），按文本重新编号
+            text_codes, text_uniques = pd.factorize(np.array(texts, dtype=object))
+            codes = text_codes[codes]
+            texts = list(text_uniques)
+            lookup = {text: code for code, text in enumerate(texts)}
+        self.codes = np.asarray(codes, dtype=np.int64)
+        self.texts = texts
+        self.lookup = lookup
+
+    def build_sorted(self):  # 构建排序索引
+        if self.numeric:
+            keys = pd.to_numeric(self.series, errors="coerce").to_numpy(
+                dtype=np.float64, na_value=np.nan
+            )
+            rows = np.flatnonzero(~np.isnan(keys))
+            keys = keys[rows]
+        else:
+            if self.codes is None:
+                self.build_hash()
+            keys = np.array(self.texts, dtype=object)[self.codes]
+            rows = np.flatnonzero(keys != "")  # 空文本视为缺失值
+            keys = keys[rows]
+        order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[order]
+        self.sorted_rows = rows[order]
+
+    def build_grams(self):  # 用向量化的字符串切片构建n-gram倒排索引
+        if self.codes is None:
+            self.build_hash()
+        lowered = pd.Series(self.texts, dtype=STRING_DTYPE).str.lower()
+        lengths = lowered.str.len().to_numpy(dtype=np.int64)
+        indexed = (lengths >= GRAM_SIZE) & (lengths <= GRAM_TEXT_LIMIT)
+        gram_parts, code_parts = [], []
+        for start in range(int(lengths[indexed].max(initial=0)) - GRAM_SIZE + 1):
+            has = np.flatnonzero(indexed & (lengths >= start + GRAM_SIZE))
+            gram_parts.append(
+                lowered.iloc[has].str.slice(start, start + GRAM_SIZE).to_numpy()
+            )
+            code_parts.append(has)
+        self.grams = {}
+        if gram_parts:
+            gram_ids, gram_uniques = pd.factorize(np.concatenate(gram_parts))
+            # 合并为一个整数键去重并排序：先按n-gram，再按文本编号
+            keys = gram_ids.astype(np.int64) * len(self.texts)
+            keys += np.concatenate(code_parts)
+            keys.sort()
+            keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+            gram_ids, codes = np.divmod(keys, len(self.texts))
+            bounds = np.searchsorted(gram_ids, np.arange(len(gram_uniques) + 1))
+            for i, gram in enumerate(gram_uniques):
+                self.grams[gram] = codes[bounds[i] : bounds[i + 1]]
+        self.lowered = lowered.to_numpy(dtype=object)
+        self.unindexed = np.flatnonzero(~indexed)
+
+    def add_text(self, text):  # 添加一个新的显示文本，返回其编号
+        code = len(self.texts)
+        self.texts.append(text)
+        self.lookup[text] = code
+        if self.grams is not None:
+            lowered = text.lower()
+            self.lowered = np.append(self.lowered, np.array([lowered], dtype=object))
+            if GRAM_SIZE <= len(lowered) <= GRAM_TEXT_LIMIT:
+                for gram in text_grams(lowered):
+                    self.grams[gram] = np.append(
+                        self.grams.get(gram, np.empty(0, dtype=np.int64)), code
+                    )
+            else:
+                self.unindexed = np.append(self.unindexed, code)
+        return code
+
+    def encode(self, value):  # 获取值对应的文本编号
+        text = display_text(value)
+        code = self.lookup.get(text)
+        return self.add_text(text) if code is None else code
+
+    def sort_key(self, value):  # 排序索引使用的键，缺失值返回None
+        if value is None or value is pd.NA:
+            return None
+        if self.numeric:
+            try:
+                key = float(value)
+            except (TypeError, ValueError):
+                return None
+            return None if np.isnan(key) else key
+        return display_text(value) or None
+
+    def is_ready(self, mode):  # 查找方式所需的索引是否已构建
+        if mode == "contains":
+            return self.grams is not None
+        if mode == "range":
+            return self.sorted_keys is not None
+        return self.codes is not None
+
+    def rows_for_codes(self, codes):  # 文本编号对应的全部行
+        mask = np.zeros(len(self.texts), dtype=bool)
+        mask[np.asarray(codes, dtype=np.int64)] = True
+        return np.flatnonzero(mask[self.codes])
+
+    def check_codes(self, codes, text):  # 逐个检查文本是否包含text，返回匹配的编号
+        found = pd.Series(self.lowered[codes], dtype=object).str.contains(
+            text, regex=False
+        )
+        return codes[found.to_numpy(dtype=bool)]
+
+    def equals(self, text):  # 精确查找：显示文本与text相同的行
+        if self.codes is None:
+            self.build_hash()
+        code = self.lookup.get(text)
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(self.codes == code)
+
+    def contains(self, text):  # 子串查找（不区分大小写）
+        if self.grams is None:
+            self.build_grams()
+        text = text.lower()
+        if len(text) < GRAM_SIZE:  # 查询比n-gram短：对所有不重复文本做一次向量化检查
+            return self.rows_for_codes(
+                self.check_codes(np.arange(len(self.lowered)), text)
+            )
+        postings = [self.grams.get(gram) for gram in text_grams(text)]
+        if any(posting is None for posting in postings):
+            codes = np.empty(0, dtype=np.int64)
+        else:  # n-gram都出现的文本仍需确认是否连续包含
+            codes = self.check_codes(intersect_sorted(postings), text)
+        codes = np.concatenate((codes, self.check_codes(self.unindexed, text)))
+        return self.rows_for_codes(codes)
+
+    def range(self, low, high):  # 范围查找：low <= 值 <= high，None表示不限
+        if self.sorted_keys is None:
+            self.build_sorted()
+        if self.numeric:
+            low = None if low is None else float(low)
+            high = None if high is None else float(high)
+        start = 0 if low is None else np.searchsorted(self.sorted_keys, low, "left")
+        stop = (
+            len(self.sorted_keys)
+            if high is None
+            else np.searchsorted(self.sorted_keys, high, "right")
+        )
+        return np.sort(self.sorted_rows[start:stop])
+
+    def insert_sorted(self, index, value):  # 把一行插入排序索引
+        key = self.sort_key(value)
+        if key is None:
+            return
+        at = np.searchsorted(self.sorted_keys, key, "right")
+        self.sorted_keys = np.insert(self.sorted_keys, at, key)
+        self.sorted_rows = np.insert(self.sorted_rows, at, index)
+
+    def set_value(self, index, value):  # 单元格被修改，增量更新已构建的索引
+        if self.codes is not None:
+            self.codes[index] = self.encode(value)
+        if self.sorted_keys is not None:
+            where = np.flatnonzero(self.sorted_rows == index)
+            if len(where):
+                self.sorted_keys = np.delete(self.sorted_keys, where[0])
+                self.sorted_rows = np.delete(self.sorted_rows, where[0])
+            self.insert_sorted(index, value)
+
+    def append(self, start, values):  # 从start行开始追加了若干行
+        if self.codes is not None:
+            self.codes = np.concatenate(
+                (self.codes, np.array([self.encode(v) for v in values], dtype=np.int64))
+            )
+        if self.sorted_keys is not None:
+            for offset, value in enumerate(values):
+                self.insert_sorted(start + offset, value)
+
+    def remove(self, index, count=1):  # 删除了从index开始的count行，之后的行前移
+        if self.codes is not None:
+            self.codes = np.delete(self.codes, slice(index, index + count))
+        if self.sorted_keys is not None:
+            self.sorted_rows, keep = remove_positions(self.sorted_rows, index, count)
+            self.sorted_keys = self.sorted_keys[keep]
+
+
+class DataIndex:  # 数据框各列的索引，首次查找某列时才构建
+    def __init__(self):
+        self.columns = {}
+
+    def get(self, df, col):  # 获取列索引，不存在时构建
+        index = self.columns.get(col)
+        if index is None:
+            index = self.columns[col] = ColumnIndex(df[col])
+        else:
+            index.series = df[col]  # 尚未构建的部分需读取最新数据
+        return index
+
+    def is_ready(self, columns, mode):  # 查找所需的索引是否都已构建
+        for col in columns:
+            index = self.columns.get(col)
+            if index is None or not index.is_ready(mode):
+                return False
+        return True
+
+    def find(self, df, columns, mode, text, task=None):
+        # 在columns中查找，返回匹配的行（升序），范围格式错误时抛出ValueError
+        if mode == "range":
+            low, sep, high = text.partition(RANGE_SEPARATOR)
+            if not sep:
+                raise ValueError(f"Range must look like 10{RANGE_SEPARATOR}20")
+            low, high = low.strip() or None, high.strip() or None
+        matches = []
+        for done, col in enumerate(columns):
+            if task is not None:
+                task.report(done, len(columns), f"Indexing {col}...")
+            index = self.get(df, col)
+            if mode == "contains":
+                matches.append(index.contains(text))
+            elif mode == "equals":
+                matches.append(index.equals(text))
+            else:
+                try:
+                    matches.append(index.range(low, high))
+                except (TypeError, ValueError):
+                    if len(columns) == 1:
+                        raise ValueError(f"Invalid range for column {col}")
+                    # 查找全部列时跳过无法比较的列
+        if not matches:
+            return np.empty(0, dtype=np.int64)
+        if len(matches) == 1:
+            return matches[0]
+        return np.unique(np.concatenate(matches))
+
+    def cell_changed(self, col, index, value):  # 单元格被修改
+        if col in self.columns:
+            self.columns[col].set_value(index, value)
+
+    def rows_appended(self, df, count):  # 末尾追加了count行
+        for col, index in self.columns.items():
+            index.append(len(df) - count, df[col].iloc[-count:].tolist())
+
+    def rows_removed(self, index, count=1):  # 删除了从index开始的count行
+        for column_index in self.columns.values():
+            column_index.remove(index, count)
+
+    def invalidate(self, col=None):  # 列被修改、重命名或删除，丢弃其索引
+        if col is None:
+            self.columns.clear()
+        else:
+            self.columns.pop(col, None)
+
+
+def sort_ranks(series):  # 每行值的排序名次，缺失值排在最后
+    values = series
+    if isinstance(series.dtype, pd.CategoricalDtype):  # 分类的顺序不一定是值的顺序
+        values = series.astype(series.cat.categories.dtype)
+    try:
+        codes, uniques = pd.factorize(values, sort=True)
+    except TypeError:  # 混合类型无法比较时按显示文本排序
+        codes, uniques = pd.factorize(values.map(display_text), sort=True)
+    ranks = np.asarray(codes, dtype=np.int64)
+    ranks[ranks < 0] = len(uniques)
+    return ranks, len(uniques)
+
+
+class SortCache:  # 缓存各列的排序名次和排序结果，列被修改时只丢弃该列
+    def __init__(self):
+        self.ranks = {}  # 列名 -> (名次数组, 不重复值个数)
+        self.orders = {}  # 排序键元组 -> 行的排列
+
+    def is_ready(self, keys):  # 排序结果是否已缓存
+        return tuple(keys) in self.orders
+
+    def get_ranks(self, df, col):  # 获取列的名次，不存在时计算
+        if col not in self.ranks:
+            self.ranks[col] = sort_ranks(df[col])
+        return self.ranks[col]
+
+    def permutation(self, df, keys, task=None):
+        # 按keys（[(列名, 是否升序)]，第一个为主键）排序后的行，结果稳定且被缓存
+        keys = tuple(keys)
+        order = self.orders.get(keys)
+        if order is not None:
+            return order
+        sort_keys = []
+        for done, (col, ascending) in enumerate(keys):
+            if task is not None:
+                task.report(done, len(keys), f"Sorting by {col}...")
+            ranks, count = self.get_ranks(df, col)
+            if not ascending:  # 降序时缺失值仍排在最后
+                ranks = np.where(ranks == count, count, count - 1 - ranks)
+            sort_keys.append(ranks)
+        if len(sort_keys) == 1:
+            order = np.argsort(sort_keys[0], kind="stable")
+        else:
+            order = np.lexsort(sort_keys[::-1])  # lexsort以最后一个键为主键
+        self.orders[keys] = order
+        return order
+
+    def invalidate(self, col=None):  # 丢弃一列（或全部）的缓存
+        if col is None:
+            self.ranks.clear()
+            self.orders.clear()
+            return
+        self.ranks.pop(col, None)
+        for keys in [keys for keys in self.orders if any(c == col for c, _ in keys)]:
+            del self.orders[keys]
+
+    def rows_removed(self, index, count=1):  # 删除了从index开始的count行
+        for col, (ranks, unique_count) in self.ranks.items():
+            self.ranks[col] = (
+                np.delete(ranks, slice(index, index + count)),
+                unique_count,
+            )
+        for keys, order in self.orders.items():
+            self.orders[keys], _ = remove_positions(order, index, count)
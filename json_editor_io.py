@@ -0,0 +1,644 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+
+import json  # 导入json模块，用于处理JSON数据
+import mmap
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from array import array
+from json_editor_lazy import numpy as np  # 首次使用时才导入numpy，缩短启动时间
+from json_editor_lazy import pandas as pd  # 首次使用时才导入pandas，缩短启动时间
+
+READ_CHUNK_SIZE = 1 << 20  # 每次从文件读取的字符数
+RECORDS_PER_FRAME = 5000  # 每个数据块包含的记录数
+PREVIEW_RECORDS = 1000  # 渐进打开时先显示的记录数
+WRITE_CHUNK_ROWS = 2000  # 每次序列化的行数
+COPY_BLOCK_SIZE = 1 << 20  # 复制原文件字节时的块大小
+INDEX_BLOCK_SIZE = 64 << 20  # 建立行索引时每次扫描的字节数
+UNKNOWN_INDENT = -1  # 无法判断文件中记录的缩进
+LAYOUT_PROBE_BYTES = 4096  # 判断记录缩进时读取的记录末尾字节数
+JOURNAL_CHUNK_VALUES = 10000  # 日志中整列数据分块编码，块之间让出GIL给界面线程
+_WHITESPACE = " \t\n\r"  # JSON空白字符
+
+
+class _ArrayReader:  # 顶层数组逐条读取器
+    def __init__(self, file, chunk_size=READ_CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ""  # 当前缓冲区
+        self.pos = 0  # 缓冲区内的读取位置
+        self.eof = False
+        self.mark = 0  # 已换算成字节偏移的缓冲区位置
+        self.mark_bytes = 0  # mark对应的文件字节偏移
+
+    def byte_offset(self, pos):  # 计算缓冲区位置对应的文件字节偏移（pos只能递增）
+        self.mark_bytes += len(self.buf[self.mark : pos].encode("utf-8"))
+        self.mark = pos
+        return self.mark_bytes
+
+    def fill(self):  # 读取下一块数据，丢弃已消费的部分
+        data = self.file.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.byte_offset(self.pos)
+        self.buf = self.buf[self.pos :] + data
+        self.pos = 0
+        self.mark = 0
+        return True
+
+    def peek(self):  # 跳过空白并返回下一个非空白字符
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def decode(self):  # 解析一个完整的JSON值
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof or not self.fill():
+                    raise
+                continue
+            # 数字可能被块边界截断，值后面必须能看到分隔符才算完整
+            rest = end
+            while rest < len(self.buf) and self.buf[rest] in _WHITESPACE:
+                rest += 1
+            if rest >= len(self.buf) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return obj
+
+
+def iter_json_array(file, chunk_size=READ_CHUNK_SIZE, with_spans=False):
+    # 逐条迭代顶层JSON数组的记录，with_spans时同时返回记录的字节范围
+    # 计算字节范围时文件需以newline=""打开，避免换行符被转换
+    reader = _ArrayReader(file, chunk_size)
+    if reader.peek() != "[":
+        raise ValueError("Top-level JSON value is not an array")
+    reader.pos += 1
+    if reader.peek() == "]":
+        return
+    while True:
+        reader.peek()  # 跳过值前的空白
+        if with_spans:
+            start = reader.byte_offset(reader.pos)
+            record = reader.decode()
+            yield record, start, reader.byte_offset(reader.pos)
+        else:
+            yield reader.decode()
+        token = reader.peek()
+        if token == "]":
+            return
+        if token != ",":
+            raise json.JSONDecodeError(
+                "Expecting ',' delimiter", reader.buf, reader.pos
+            )
+        reader.pos += 1
+
+
+def is_json_array_file(file_path):  # 判断文件的顶层值是否为数组
+    with open(file_path, "r", encoding="utf-8") as file:
+        return _ArrayReader(file, 4096).peek() == "["
+
+
+def _normalize(records, convert=None):  # 规范化一块记录，convert(数据块)可直接转换存储类型
+    frame = pd.json_normalize(records)
+    return frame if convert is None else convert(frame)
+
+
+class _Previewer:  # 渐进打开：读取到preview_records条记录后交出已读取的数据，之后每翻一倍交出一次
+    def __init__(self, preview, preview_records):
+        self.preview = preview  # preview(已读取部分的数据框)，为None时不预览
+        self.next_count = preview_records
+
+    def chunk_size(self, count, records_per_frame):  # 第一块只读取预览所需的记录
+        if self.preview is not None and count < self.next_count:
+            return min(records_per_frame, self.next_count - count)
+        return records_per_frame
+
+    def offer(self, frames, count):  # 记录数达到下一个阈值时交出合并后的数据
+        if self.preview is not None and count >= self.next_count:
+            if len(frames) == 1:
+                self.preview(frames[0])
+            else:
+                self.preview(pd.concat(frames, ignore_index=True, sort=False))
+            self.next_count = count * 2  # 合并的总开销不超过最终数据的两倍
+
+
+def load_json_streaming(
+    file_path,
+    progress=None,
+    records_per_frame=RECORDS_PER_FRAME,
+    with_spans=False,
+    preview=None,
+    preview_records=PREVIEW_RECORDS,
+    convert=None,
+):
+    # 流式读取JSON数组：按块规范化记录，避免整份Python对象与数据框同时驻留内存
+    # with_spans时额外返回每条记录在文件中的字节范围（记录含嵌套对象时为None）
+    # preview(已读取部分的数据框)在读取到前preview_records条记录后调用，用于先显示第一页
+    # convert(数据块)在每块规范化后调用，例如按缓存的模式转换为存储类型
+    total_bytes = os.path.getsize(file_path)
+    previewer = _Previewer(preview, preview_records)
+    frames = []
+    chunk = []
+    count = 0
+    spans = array("q")
+    flat = True  # 嵌套记录会被展平，原始字节无法直接复用
+    with open(file_path, "r", encoding="utf-8", newline="") as file:
+        for item in iter_json_array(file, with_spans=with_spans):
+            if with_spans:
+                record, start, end = item
+                if flat:
+                    spans.append(start)
+                    spans.append(end)
+                    flat = isinstance(record, dict) and not any(
+                        isinstance(value, dict) for value in record.values()
+                    )  # null记录规范化后不再是原来的字节
+            else:
+                record = item
+            if record is not None and not isinstance(record, dict):
+                raise ValueError(
+                    f"Array element {count + len(chunk) + 1} is not a JSON object: "
+                    f"{json.dumps(record, ensure_ascii=False)[:40]}"
+                )
+            chunk.append(record)
+            if len(chunk) >= previewer.chunk_size(count, records_per_frame):
+                frames.append(_normalize(chunk, convert))  # 规范化当前数据块
+                count += len(chunk)
+                chunk = []
+                if progress is not None:
+                    progress(count, file.buffer.tell(), total_bytes)  # 报告进度
+                previewer.offer(frames, count)
+        if chunk:
+            frames.append(_normalize(chunk, convert))
+            count += len(chunk)
+    if progress is not None:
+        progress(count, total_bytes, total_bytes)
+    if not frames:
+        df = pd.DataFrame()
+    elif len(frames) == 1:
+        df = frames[0]
+    else:
+        df = pd.concat(frames, ignore_index=True, sort=False)  # 合并数据块
+        frames.clear()
+    if not with_spans:
+        return df
+    if not flat:
+        return df, None
+    return df, np.frombuffer(spans, dtype=np.int64).reshape(-1, 2).copy()
+
+
+def _array_layout(indent, lines=False):  # 数组的开头、分隔符和结尾
+    if lines:  # JSON Lines：每行一条记录
+        return b"", b"\n", b"\n"
+    if indent is None:
+        return b"[", b",", b"]"
+    pad = "\n" + " " * indent
+    return ("[" + pad).encode(), ("," + pad).encode(), b"\n]"
+
+
+def record_indent(file_path, spans):
+    # 文件中记录的缩进（对应dump_frame的indent）：单行记录为None，无法判断时为UNKNOWN_INDENT
+    # 按第一条记录的末尾判断：缩进格式的记录以换行和indent个空格后的"}"结尾
+    if spans is None or not len(spans):
+        return UNKNOWN_INDENT
+    begin, end = (int(x) for x in spans[0])
+    start = max(begin, end - LAYOUT_PROBE_BYTES)
+    try:
+        with open(file_path, "rb") as file:
+            file.seek(start)
+            data = file.read(end - start)
+    except OSError:
+        return UNKNOWN_INDENT
+    if b"\n" not in data:  # 单行记录：紧凑格式的键值之间没有空格
+        if start > begin or b'": ' in data or data == b"{}":
+            return UNKNOWN_INDENT
+        return None
+    last = data[data.rindex(b"\n") + 1 :]
+    if last.endswith(b"}") and last[:-1] == b" " * (len(last) - 1):
+        return len(last) - 1
+    return UNKNOWN_INDENT
+
+
+def _dump_rows(df, start, stop, indent):  # 序列化一段行，返回编码后的记录列表
+    return dump_frame(df.iloc[start:stop], indent)
+
+
+def json_safe_frame(frame):
+    # 缺失值和非有限浮点数改为None，写出null而不是标准JSON不支持的NaN/Infinity
+    replaced = {}
+    for col in frame.columns:
+        series = frame[col]
+        if pd.api.types.is_float_dtype(series.dtype):
+            bad = ~np.isfinite(series.to_numpy(dtype=float, na_value=np.nan))
+        else:
+            bad = series.isna().to_numpy(dtype=bool)
+        if bad.any():
+            replaced[col] = series.astype(object).where(~bad, None)
+    if not replaced:
+        return frame
+    frame = frame.copy(deep=False)
+    for col, series in replaced.items():
+        frame[col] = series
+    return frame
+
+
+def dump_frame(frame, indent):  # 序列化数据框的所有行，返回编码后的记录列表
+    separators = (",", ": ") if indent is not None else (",", ":")
+    records = json_safe_frame(frame).to_dict(orient="records")
+    texts = [
+        json.dumps(
+            record,
+            ensure_ascii=False,
+            indent=indent,
+            separators=separators,
+            allow_nan=False,  # 嵌套对象中残留的NaN直接报错，不写出无效的JSON
+            default=_json_default,
+        )
+        for record in records
+    ]
+    if indent is not None:  # 记录嵌套在数组中，需要整体缩进一层
+        pad = "\n" + " " * indent
+        texts = [text.replace("\n", pad) for text in texts]
+    return [text.encode("utf-8") for text in texts]
+
+
+def write_json_records(
+    file,
+    df,
+    indent=4,
+    chunk_rows=WRITE_CHUNK_ROWS,
+    source=None,
+    source_spans=None,
+    row_origin=None,
+    progress=None,
+    lines=False,
+    encoded=None,
+):
+    # 以与json.dump相同的格式把记录数组写入二进制文件，返回每条记录的字节范围
+    # 提供source时，row_origin中>=0的行直接复制原文件中对应记录的字节，不再重新序列化
+    # progress(已写行数, 总行数)在每块写完后调用；lines时写成JSON Lines
+    # encoded为需要序列化的行按顺序已编码好的记录时直接写入，不再重复序列化
+    row_count = len(df)
+    spans = np.empty((row_count, 2), dtype=np.int64)
+    if lines:
+        indent = None
+    if row_count == 0:
+        file.write(b"" if lines else b"[]")
+        return spans
+    prefix, separator, suffix = _array_layout(indent, lines)
+    if source is None:
+        origin = np.full(row_count, -1, dtype=np.int64)
+    else:
+        origin = np.asarray(row_origin, dtype=np.int64)
+    dirty = origin < 0
+    if encoded is not None:
+        rank = np.cumsum(dirty) - 1  # 每个需要序列化的行在encoded中的位置
+    # 按“连续的未修改记录”与“需要序列化的记录”切分成段
+    breaks = (
+        np.flatnonzero(
+            (dirty[1:] != dirty[:-1]) | (~dirty[1:] & (origin[1:] != origin[:-1] + 1))
+        )
+        + 1
+    )
+    bounds = np.concatenate(([0], breaks, [row_count]))
+    position = file.write(prefix)
+    for first, last in zip(bounds[:-1], bounds[1:]):
+        if first > 0:
+            position += file.write(separator)
+        if dirty[first]:
+            for start in range(first, last, chunk_rows):
+                if start > first:
+                    position += file.write(separator)
+                stop = min(start + chunk_rows, last)
+                if encoded is None:
+                    chunk = _dump_rows(df, start, stop, indent)
+                else:
+                    chunk = encoded[rank[start] : rank[start] + stop - start]
+                lengths = np.fromiter(map(len, chunk), np.int64, len(chunk))
+                # 每条记录的起点 = 前面记录长度之和 + 前面分隔符长度之和
+                starts = position + np.concatenate(
+                    ([0], np.cumsum(lengths[:-1] + len(separator)))
+                )
+                spans[start:stop, 0] = starts
+                spans[start:stop, 1] = starts + lengths
+                position += file.write(separator.join(chunk))
+                if progress is not None:
+                    progress(stop, row_count)  # 报告进度
+        else:  # 连续的未修改记录连同原有分隔符一起整段复制
+            begin = source_spans[origin[first], 0]
+            end = source_spans[origin[last - 1], 1]
+            source.seek(begin)
+            remaining = end - begin
+            while remaining > 0:
+                data = source.read(min(COPY_BLOCK_SIZE, remaining))
+                if not data:
+                    raise IOError("Source file is shorter than expected")
+                file.write(data)
+                remaining -= len(data)
+            spans[first:last] = (
+                source_spans[origin[first] : origin[last - 1] + 1] - begin + position
+            )
+            position += end - begin
+            if progress is not None:
+                progress(last, row_count)
+    file.write(suffix)
+    return spans
+
+
+def atomic_write(file_path, write, encoding="utf-8", binary=False, before_replace=None):
+    # 先写入同目录下的临时文件，成功后再替换原文件，避免保存中断截断原文件
+    # before_replace在替换前调用，用于关闭仍映射着原文件的句柄
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(
+        prefix="." + os.path.basename(file_path) + ".", suffix=".tmp", dir=directory
+    )
+    try:
+        if binary:
+            file = os.fdopen(fd, "wb")
+        else:
+            file = os.fdopen(fd, "w", encoding=encoding, newline="")
+        with file:
+            result = write(file)
+            file.flush()
+            os.fsync(file.fileno())  # 确保数据落盘后再替换
+        if os.path.exists(file_path):
+            shutil.copymode(file_path, temp_path)  # 保留原文件权限
+        else:  # 新文件使用默认权限，而不是临时文件的0600
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temp_path, 0o666 & ~umask)
+        if before_replace is not None:
+            before_replace()
+        os.replace(temp_path, file_path)  # 原子替换
+        return result
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def save_json_streaming(
+    file_path, df, indent=4, chunk_rows=WRITE_CHUNK_ROWS, progress=None, lines=False
+):
+    # 流式、原子地保存数据框为JSON数组（lines时为JSON Lines），返回每条记录的字节范围
+    return atomic_write(
+        file_path,
+        lambda file: write_json_records(
+            file, df, indent, chunk_rows, progress=progress, lines=lines
+        ),
+        binary=True,
+    )
+
+
+def save_json_incremental(
+    file_path,
+    df,
+    source_path,
+    source_spans,
+    row_origin,
+    indent=4,
+    progress=None,
+    lines=False,
+    before_replace=None,
+    encoded=None,
+):
+    # 增量保存：未修改的记录复用原文件中的字节，只序列化修改过的记录
+    def write(file):
+        with open(source_path, "rb") as source:
+            return write_json_records(
+                file,
+                df,
+                indent,
+                source=source,
+                source_spans=source_spans,
+                row_origin=row_origin,
+                progress=progress,
+                lines=lines,
+                encoded=encoded,
+            )
+
+    return atomic_write(file_path, write, binary=True, before_replace=before_replace)
+
+
+def read_json_lines_head(file_path, count):  # 读取JSON Lines文件的前count条记录，跳过空行
+    records = []
+    with open(file_path, "r", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                records.append(json.loads(line))
+                if len(records) >= count:
+                    break
+    return records
+
+
+def build_line_index(buffer):  # 一次扫描建立每行的字节范围，跳过空行
+    size = len(buffer)
+    newlines = [
+        np.flatnonzero(
+            np.frombuffer(
+                buffer,
+                dtype=np.uint8,
+                count=min(INDEX_BLOCK_SIZE, size - offset),
+                offset=offset,
+            )
+            == ord("\n")
+        )
+        + offset
+        for offset in range(0, size, INDEX_BLOCK_SIZE)
+    ]
+    newlines = np.concatenate(newlines) if newlines else np.empty(0, dtype=np.int64)
+    starts = np.concatenate(([0], newlines + 1)).astype(np.int64)
+    ends = np.concatenate((newlines, [size])).astype(np.int64)
+    keep = ends > starts
+    return np.stack((starts[keep], ends[keep]), axis=1)
+
+
+class JsonLinesFile:  # 内存映射的JSON Lines文件，通过行字节偏移随机访问记录
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.file = open(file_path, "rb")
+        if os.fstat(self.file.fileno()).st_size:
+            self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:  # 空文件无法映射
+            self.buffer = b""
+        self.spans = build_line_index(self.buffer)  # 每行的字节范围
+
+    def __len__(self):
+        return len(self.spans)
+
+    def read_rows(self, start, stop):  # 解析[start, stop)行，供load_frame分块调用
+        return [
+            json.loads(self.buffer[begin:end]) for begin, end in self.spans[start:stop]
+        ]
+
+    def load_frame(
+        self,
+        progress=None,
+        records_per_frame=RECORDS_PER_FRAME,
+        preview=None,
+        preview_records=PREVIEW_RECORDS,
+        convert=None,
+    ):
+        # 打开时分块解析全部行并规范化为数据框（不做可见行的延迟解析），
+        # preview和convert与load_json_streaming相同
+        previewer = _Previewer(preview, preview_records)
+        frames = []
+        start = 0
+        while start < len(self):
+            stop = min(start + previewer.chunk_size(start, records_per_frame), len(self))
+            frames.append(_normalize(self.read_rows(start, stop), convert))
+            if progress is not None:
+                progress(stop, int(self.spans[stop - 1, 1]), len(self.buffer))
+            previewer.offer(frames, stop)
+            start = stop
+        if not frames:
+            return pd.DataFrame()
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames, ignore_index=True, sort=False)
+
+    def rewrite_lines(self, line_numbers, encoded):
+        # 原位改写若干行，不足的长度用空格补齐；任一行放不下时不写入并返回False
+        lengths = self.spans[line_numbers, 1] - self.spans[line_numbers, 0]
+        if any(len(data) > length for data, length in zip(encoded, lengths)):
+            return False
+        with open(self.file_path, "r+b") as file:
+            for line, data, length in zip(line_numbers, encoded, lengths):
+                file.seek(int(self.spans[line, 0]))
+                file.write(data + b" " * int(length - len(data)))
+            file.flush()
+            os.fsync(file.fileno())
+        return True
+
+    def close(self):  # 解除映射并关闭文件
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self.buffer = b""
+        self.file.close()
+
+
+def _json_default(value):  # 序列化numpy标量、缺失值等非标准类型
+    if value is pd.NA:
+        return None
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+class EditJournal:  # 追加写入的编辑日志，用于自动保存和崩溃恢复
+    def __init__(self, source_path):
+        self.source_path = source_path  # 被编辑的文件
+        self.path = source_path + ".journal"  # 日志文件与原文件放在一起
+        self.file = None
+        self.pending = None  # 等待写入线程编码的编辑
+        self.writer = None  # 写入线程
+        self.recording = False  # start之后、close之前记录编辑
+        self.stamp = None  # 新日志的第一行；为None时在已有日志后追加
+
+    def source_stamp(self):  # 原文件版本标记：大小和修改时间
+        stat = os.stat(self.source_path)
+        return {"op": "base", "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def read_pending(self):  # 读取与原文件版本匹配的未保存编辑
+        if not os.path.exists(self.path):
+            return []
+        edits = []
+        with open(self.path, "r", encoding="utf-8") as file:
+            try:
+                if json.loads(file.readline()) != self.source_stamp():
+                    return []  # 原文件已变化，日志作废
+            except json.JSONDecodeError:
+                return []
+            for line in file:
+                try:
+                    edits.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break  # 崩溃时最后一行可能不完整
+        return edits
+
+    def start(self, keep=False):
+        # 开始记录，keep时在已有日志后继续追加；否则删除旧日志
+        # 日志文件在第一条编辑时才创建，没有编辑就关闭时不在数据旁边留下文件
+        if keep and os.path.exists(self.path):
+            self.close()
+            self.stamp = None
+        else:
+            self.discard()
+            self.stamp = self.source_stamp()
+        self.recording = True
+
+    def open(self):  # 创建（或打开已有的）日志文件并启动写入线程
+        self.file = open(self.path, "w" if self.stamp else "a", encoding="utf-8")
+        self.pending = queue.SimpleQueue()
+        self.writer = threading.Thread(
+            target=self.write_edits,
+            args=(self.file, self.pending),
+            name="json_editor_journal",
+            daemon=True,
+        )
+        self.writer.start()
+        if self.stamp:
+            self.pending.put(self.stamp)
+
+    def append(self, edit):
+        # 追加一条编辑，由写入线程编码并刷新到磁盘，界面线程不等待整列数据的编码
+        # 整列数据可以是Series，放入后不能再原地修改（pandas写时复制保证这一点）
+        if not self.recording:
+            return
+        if self.file is None:
+            self.open()
+        self.pending.put(edit)
+
+    @staticmethod
+    def write_edits(file, pending):  # 写入线程：按顺序编码并写入编辑，收到None时结束
+        while True:
+            edit = pending.get()
+            if edit is None:
+                return
+            values = edit.get("values")
+            if isinstance(values, pd.Series):  # 整列数据分块编码，其余字段先写
+                head = {key: value for key, value in edit.items() if key != "values"}
+                file.write(
+                    json.dumps(head, ensure_ascii=False, default=_json_default)[:-1]
+                    + ', "values": ['
+                )
+                for start in range(0, len(values), JOURNAL_CHUNK_VALUES):
+                    chunk = values.iloc[start : start + JOURNAL_CHUNK_VALUES]
+                    chunk = chunk.astype(object).where(chunk.notna(), None).tolist()
+                    text = json.dumps(chunk, ensure_ascii=False, default=_json_default)
+                    file.write(("," if start else "") + text[1:-1])
+                file.write("]}\n")
+            else:
+                file.write(
+                    json.dumps(edit, ensure_ascii=False, default=_json_default) + "\n"
+                )
+            file.flush()
+
+    def close(self):  # 等待写入线程写完已追加的编辑后关闭日志文件
+        self.recording = False
+        if self.writer is not None:
+            self.pending.put(None)
+            self.writer.join()
+            self.writer = None
+            self.pending = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def discard(self):  # 关闭并删除日志
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,40 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+
+import importlib
+import threading
+
+
+class LazyModule:  # 首次访问属性时才导入的模块，用于缩短启动时间
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def load(self):  # 导入并返回真正的模块（import本身是线程安全的）
+        module = self.__dict__["_module"]
+        if module is None:
+            module = importlib.import_module(self.__dict__["_name"])
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        return f"<lazy module {self.__dict__['_name']}>"
+
+
+numpy = LazyModule("numpy")
+pandas = LazyModule("pandas")
+
+
+def preload(*modules):  # 在后台线程中提前导入，窗口显示后用户打开文件前通常已完成
+    def run():
+        for module in modules:
+            module.load()
+
+    thread = threading.Thread(target=run, name="json_editor_preload", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,147 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+
+import functools
+import json  # 导入json模块，用于处理JSON数据
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+SPAN_CAPACITY = 5000  # 最多保留的操作记录数
+FRAME_CAPACITY = 600  # 最多保留的帧耗时数
+RECENT_SPANS = 20  # 调试窗口显示的最近操作数
+
+
+class Profiler:  # 记录操作耗时（以及可选的内存变化），可导出为Chrome Trace
+    def __init__(self, capacity=SPAN_CAPACITY):
+        self.enabled = False  # 未启用时span不做任何记录
+        self.spans = deque(maxlen=capacity)  # (名称, 开始秒, 耗时秒, 线程, 内存变化, 层级)
+        self.frames = deque(maxlen=FRAME_CAPACITY)  # (开始秒, 耗时秒)
+        self.origin = time.perf_counter()  # 时间戳的起点
+        self.local = threading.local()  # 每个线程当前的嵌套层级
+
+    @property
+    def track_memory(self):
+        return tracemalloc.is_tracing()
+
+    def set_track_memory(self, enabled):  # tracemalloc会拖慢Python代码，只在需要时开启
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not enabled and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @contextmanager
+    def span(self, name):  # 记录一段代码的耗时
+        if not self.enabled:
+            yield
+            return
+        depth = getattr(self.local, "depth", 0)
+        self.local.depth = depth + 1
+        memory = tracemalloc.get_traced_memory()[0] if self.track_memory else None
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            if memory is not None and self.track_memory:
+                memory = tracemalloc.get_traced_memory()[0] - memory  # 进程内所有线程的变化
+            else:
+                memory = None
+            self.local.depth = depth
+            self.spans.append(
+                (name, start - self.origin, duration, threading.get_ident(), memory, depth)
+            )
+
+    def record_frame(self, start, duration):  # 记录一帧的渲染耗时
+        if self.enabled:
+            self.frames.append((start - self.origin, duration))
+
+    def clear(self):
+        self.spans.clear()
+        self.frames.clear()
+
+    def recent(self, count=RECENT_SPANS):  # 最近完成的顶层操作，最新的在前
+        spans = [span for span in list(self.spans) if span[5] == 0]
+        return spans[: -count - 1 : -1]
+
+    def frame_stats(self):  # 最近帧的(平均耗时, 最长耗时)，单位秒
+        durations = [duration for _, duration in list(self.frames)]
+        if not durations:
+            return 0.0, 0.0
+        return sum(durations) / len(durations), max(durations)
+
+    def chrome_trace(self):  # 转换为Chrome Trace事件格式（chrome://tracing、Perfetto）
+        pid = os.getpid()
+        events = []
+        threads = {}
+        for name, start, duration, thread, memory, _ in list(self.spans):
+            threads.setdefault(thread, len(threads))
+            event = {
+                "name": name,
+                "ph": "X",
+                "ts": round(start * 1e6, 3),
+                "dur": round(duration * 1e6, 3),
+                "pid": pid,
+                "tid": thread,
+            }
+            if memory is not None:
+                event["args"] = {"memory_delta_bytes": memory}
+            events.append(event)
+        for start, duration in list(self.frames):
+            events.append(
+                {
+                    "name": "render_frame",
+                    "ph": "X",
+                    "ts": round(start * 1e6, 3),
+                    "dur": round(duration * 1e6, 3),
+                    "pid": pid,
+                    "tid": "render",
+                }
+            )
+        for thread, number in threads.items():
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": thread,
+                    "args": {"name": f"thread {number}"},
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, file_path):  # 写入Chrome Trace JSON文件
+        with open(file_path, "w", encoding="utf-8") as file:
+            json.dump(self.chrome_trace(), file)
+
+
+PROFILER = Profiler()  # 全局共用的记录器
+
+
+def span(name):  # 在全局记录器中记录一段代码
+    return PROFILER.span(name)
+
+
+def timed(func):  # 方法装饰器：启用记录时记录每次调用的耗时
+    # 包装后的参数个数与界面回调不一致，不要用于直接作为Dear PyGui回调的方法
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not PROFILER.enabled:
+            return func(*args, **kwargs)
+        with PROFILER.span(func.__name__):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def format_span(span):  # 调试窗口中的一行：名称、耗时和内存变化
+    name, _, duration, _, memory, _ = span
+    text = f"{duration * 1000:9.2f} ms  {name}"
+    if memory is not None:
+        text += f"  ({memory / 1048576:+.1f} MB)"
+    return text
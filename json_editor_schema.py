@@ -0,0 +1,115 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+
+import hashlib
+import json  # 导入json模块，用于处理JSON数据
+import os
+
+from json_editor_lazy import pandas as pd  # 首次使用时才导入pandas，缩短启动时间
+
+import json_editor_io  # 导入流式读写辅助模块
+import json_editor_types  # 导入列类型与存储类型模块
+
+SCHEMA_SUFFIX = ".schema"  # 模式文件与数据文件放在一起，扩展名不是.json，批处理不会误读
+SCHEMA_VERSION = 1  # 模式文件格式版本
+HASH_BLOCK_SIZE = 64 * 1024  # 内容指纹每次读取的字节数
+HASH_BLOCKS = 16  # 大文件只读取均匀分布的若干块计算指纹
+MAX_CACHED_CATEGORIES = 65536  # 类别超过该数量的列不缓存类别，只记录列类型
+
+
+def content_hash(file_path):  # 快速内容指纹：文件大小和均匀分布的若干块内容
+    size = os.path.getsize(file_path)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(file_path, "rb") as file:
+        if size <= HASH_BLOCK_SIZE * HASH_BLOCKS:
+            digest.update(file.read())  # 小文件读取全部内容
+        else:
+            for i in range(HASH_BLOCKS):  # 包括开头和结尾
+                file.seek((size - HASH_BLOCK_SIZE) * i // (HASH_BLOCKS - 1))
+                digest.update(file.read(HASH_BLOCK_SIZE))
+    return digest.hexdigest()
+
+
+def schema_path(file_path):  # 数据文件对应的模式文件
+    return file_path + SCHEMA_SUFFIX
+
+
+def describe_frame(df, column_types):  # 数据框的模式：每列的列类型、存储类型和分类类别
+    columns = {}
+    for col in df.columns:
+        dtype = df[col].dtype
+        entry = {"type": column_types.get(col), "dtype": str(dtype)}
+        if (
+            isinstance(dtype, pd.CategoricalDtype)
+            and len(dtype.categories) <= MAX_CACHED_CATEGORIES
+        ):
+            entry["categories"] = dtype.categories.tolist()
+        columns[col] = entry
+    return columns
+
+
+def save_schema(file_path, columns):
+    # 写入与文件当前内容对应的模式（工作线程），内容未变化时不重写；目录只读等错误被忽略
+    schema = {
+        "version": SCHEMA_VERSION,
+        "hash": content_hash(file_path),
+        "columns": columns,
+    }
+    path = schema_path(file_path)
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            if json.load(file) == schema:
+                return
+    except (OSError, ValueError):
+        pass
+    try:
+        json_editor_io.atomic_write(
+            path, lambda file: json.dump(schema, file, ensure_ascii=False)
+        )
+    except OSError:
+        pass  # 模式只是缓存，写不了时下次重新推断
+
+
+def load_schema(file_path):  # 读取与文件内容匹配的模式，没有或文件已变化时返回None
+    try:
+        with open(schema_path(file_path), "r", encoding="utf-8") as file:
+            schema = json.load(file)
+        if (
+            schema.get("version") != SCHEMA_VERSION
+            or schema.get("hash") != content_hash(file_path)
+        ):
+            return None
+        return schema["columns"]
+    except (OSError, ValueError, KeyError, AttributeError):
+        return None
+
+
+def schema_column_types(columns):  # 模式中记录的列类型
+    return {col: entry["type"] for col, entry in columns.items() if entry.get("type")}
+
+
+def cast_chunk(frame, columns):
+    # 按缓存的模式直接把数据块转换为存储类型（工作线程），不符合模式的列保持原样
+    for col in frame.columns:
+        entry = columns.get(col)
+        if entry is None:
+            continue
+        series = frame[col]
+        try:
+            if "categories" in entry:  # 使用已知的类别，省去统计不同值
+                categories = pd.Index(
+                    entry["categories"], dtype=json_editor_types.STRING_DTYPE
+                )
+                converted = series.astype(pd.CategoricalDtype(categories))
+                if converted.isna().sum() != series.isna().sum():
+                    continue  # 出现了新的值
+            elif entry.get("type"):
+                converted = json_editor_types.to_storage(series, entry["type"])
+            else:
+                continue
+        except (ValueError, TypeError):
+            continue
+        frame[col] = converted
+    return frame
@@ -0,0 +1,86 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TaskCancelled(Exception):  # 任务被用户取消
+    pass
+
+
+class BackgroundTask:  # 后台任务状态，工作线程写入进度，渲染线程读取
+    def __init__(self, label, locks_data=True):
+        self.label = label  # 任务名称
+        self.text = label  # 当前进度说明
+        self.fraction = 0.0  # 完成比例
+        self.locks_data = locks_data  # 任务运行期间是否禁止修改数据
+        self.cancel_event = threading.Event()
+        self.on_update = None  # 把中间结果交回渲染线程的函数，由执行器设置
+
+    def update(self, value):  # 交回中间结果（例如先显示的部分数据），任务继续运行
+        if self.on_update is not None:
+            self.on_update(value)
+
+    def report(self, done, total, text=None):  # 报告进度，任务已取消时抛出TaskCancelled
+        if self.cancel_event.is_set():
+            raise TaskCancelled(f"{self.label} cancelled")
+        self.fraction = min(done / total, 1.0) if total else 0.0
+        if text is not None:
+            self.text = text
+
+    def cancel(self):  # 请求取消任务
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+
+class TaskRunner:  # 在线程池中运行任务，并把结果交回渲染线程处理
+    def __init__(self, max_workers=2):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="json_editor"
+        )
+        self.results = queue.SimpleQueue()  # (任务, 回调, 结果或异常, 任务是否结束)
+        self.active = []  # 正在运行的任务
+
+    def submit(self, task, work, on_done, on_error, on_update=None):
+        # 提交任务，work(task)在工作线程中执行，task.update(值)使渲染线程调用on_update(值)
+        self.active.append(task)
+        if on_update is not None:
+            task.on_update = lambda value: self.results.put(
+                (task, on_update, value, False)
+            )
+
+        def run():
+            try:
+                result = work(task)
+            except BaseException as e:
+                self.results.put((task, on_error, e, True))
+            else:
+                self.results.put((task, on_done, result, True))
+
+        self.executor.submit(run)
+        return task
+
+    def process_results(self):  # 在渲染线程中执行已完成任务的回调
+        while True:
+            try:
+                task, callback, value, finished = self.results.get_nowait()
+            except queue.Empty:
+                return
+            if finished:
+                self.active.remove(task)
+            callback(value)
+
+    def is_data_locked(self):  # 是否有任务正在读写数据
+        return any(task.locks_data for task in self.active)
+
+    def shutdown(self):  # 取消所有任务并关闭线程池
+        for task in self.active:
+            task.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
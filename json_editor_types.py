@@ -0,0 +1,287 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+
+import importlib.util
+
+from json_editor_lazy import numpy as np  # 首次使用时才导入numpy，缩短启动时间
+from json_editor_lazy import pandas as pd  # 首次使用时才导入pandas，缩短启动时间
+
+COLUMN_TYPES = ["string", "int", "float", "bool", "color"]  # 可选的列类型
+CATEGORY_MIN_ROWS = 64  # 行数少于该值时不转换为分类类型
+CATEGORY_MAX_RATIO = 0.5  # 不同值个数占行数的比例低于该值时转换为分类类型
+CATEGORY_SAMPLE_RATIO = 0.05  # 样本中不同值的比例低于该值时直接转换为分类类型
+SAMPLE_ROWS = 2048  # 推断类型时先检查的样本行数
+BOOL_WORDS = {  # 转换为bool时可识别的文本
+    "true": True,
+    "false": False,
+    "1": True,
+    "0": False,
+    "yes": True,
+    "no": False,
+}
+COLOR_PATTERN = r"#[0-9a-fA-F]{6}"  # 颜色列的值格式
+ERROR_ROWS_SHOWN = 20  # 错误报告中最多列出的行号
+GLYPH_SCAN_VALUES = 200000  # 收集字符时每列最多检查的不同值个数
+
+# pyarrow可选，没有时使用pandas自带的字符串类型（只检查是否安装，不在启动时导入）
+if importlib.util.find_spec("pyarrow") is not None:
+    STRING_DTYPE = "string[pyarrow]"
+else:
+    STRING_DTYPE = "string"
+
+
+def storage_dtype(col_type):  # 列类型对应的存储类型
+    if col_type == "int":
+        return "Int64"
+    elif col_type == "float":
+        return "Float64"
+    elif col_type == "bool":
+        return "boolean"
+    else:
+        return STRING_DTYPE
+
+
+def sample_rows(series, rows=SAMPLE_ROWS):  # 开头、结尾和均匀分布的样本行
+    if len(series) <= rows:
+        return series
+    positions = np.unique(
+        np.concatenate(
+            (
+                np.arange(rows // 4),
+                np.linspace(0, len(series) - 1, rows // 2).astype(np.int64),
+                np.arange(len(series) - rows // 4, len(series)),
+            )
+        )
+    )
+    return series.iloc[positions]
+
+
+def infer_column_type(series):  # 根据数据推断列类型，无法确定时返回None
+    # 样本能确定结果时（小数、混合类型）不再检查整列，否则以整列为准
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return "bool"
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return "int"
+    if pd.api.types.is_float_dtype(series.dtype):
+        if not series.hasnans or (sample_rows(series).dropna() % 1 != 0).any():
+            return "float"
+        values = series.dropna()
+        # 缺失值会把整数列提升为浮点数
+        if len(values) and (values % 1 == 0).all():
+            return "int"
+        return "float"
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return "string"
+    if pd.api.types.infer_dtype(sample_rows(series), skipna=True) not in (
+        "string",
+        "boolean",
+        "empty",
+    ):
+        return None  # 样本中已有其他类型或混合类型
+    kind = pd.api.types.infer_dtype(series, skipna=True)
+    if kind == "string":
+        return "string"
+    if kind == "boolean":
+        return "bool"
+    return None
+
+
+def to_storage(series, col_type):  # 无损转换为列类型对应的存储类型，有损时抛出ValueError
+    dtype = storage_dtype(col_type)
+    if col_type in ("int", "float"):
+        converted = pd.to_numeric(series, errors="coerce")
+        if (converted.isna() & series.notna()).any():
+            raise ValueError(f"Column contains values that are not {col_type}")
+        if col_type == "int" and not (converted.dropna() % 1 == 0).all():
+            raise ValueError("Column contains non-integer numbers")
+        return converted.astype(dtype)
+    if col_type == "bool":
+        if pd.api.types.infer_dtype(series, skipna=True) not in ("boolean", "empty"):
+            raise ValueError("Column contains values that are not bool")
+        return series.astype(dtype)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series  # 分类类型已是紧凑的字符串存储
+    if pd.api.types.infer_dtype(series, skipna=True) not in ("string", "empty"):
+        series = series.where(series.isna(), series.astype(str))
+    return series.astype(dtype)
+
+
+def convert_column(series, col_type):
+    # 把整列转换为列类型，无法转换的值变为缺失值，返回(转换后的列, 无法转换的行号数组)
+    if col_type == "string":  # 任何值都可以表示为字符串
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return series, np.empty(0, dtype=np.int64)
+        converted = series.astype("string").astype(STRING_DTYPE)
+        return maybe_categorize(converted), np.empty(0, dtype=np.int64)
+    blank = series.isna().to_numpy(dtype=bool, copy=True)
+    is_numeric = pd.api.types.is_numeric_dtype(series.dtype) and not isinstance(
+        series.dtype, pd.CategoricalDtype
+    )
+    if not is_numeric or col_type == "color":
+        text = series.astype("string").str.strip()
+        blank |= text.eq("").to_numpy(dtype=bool, na_value=True)  # 空文本视为缺失值
+        text = text.where(~blank)
+    if col_type in ("int", "float"):
+        if is_numeric:
+            numbers = pd.to_numeric(series).astype("Float64")
+        else:
+            numbers = pd.to_numeric(text.astype(object), errors="coerce")
+            numbers = numbers.astype("Float64")
+        if col_type == "int":  # 带小数的值不能转换为整数
+            numbers = numbers.where((numbers % 1 == 0).fillna(True))
+        converted = numbers
+    elif col_type == "bool":
+        if pd.api.types.is_bool_dtype(series.dtype):
+            converted = series
+        elif is_numeric:
+            converted = series.map({1: True, 0: False})
+        else:
+            converted = text.str.lower().astype(object).map(BOOL_WORDS)
+    else:
+        converted = text.where(text.str.fullmatch(COLOR_PATTERN).fillna(False))
+    bad = converted.isna().to_numpy(dtype=bool) & ~blank
+    converted = converted.where(~bad).astype(storage_dtype(col_type))
+    return converted, np.flatnonzero(bad)
+
+
+def color_array(values, default="#FFFFFF"):
+    # 把"#rrggbb"文本向量化转换为(n, 3)的uint8 RGB数组，缺失或无效的值使用default
+    # 颜色列重复值很多，只解析不同的值
+    positions, uniques = pd.factorize(pd.Series(values, copy=False))
+    text = pd.Series(uniques, dtype=object)
+    valid = text.astype("string").str.fullmatch(COLOR_PATTERN).fillna(False)
+    text = text.where(valid.to_numpy(dtype=bool), default)
+    codes = np.append(text.to_numpy(dtype="S7"), default.encode())  # 缺失值的位置为-1
+    table = np.zeros(256, dtype=np.uint8)  # 十六进制字符的值
+    for digit in "0123456789abcdefABCDEF":
+        table[ord(digit)] = int(digit, 16)
+    digits = table[codes.view(np.uint8).reshape(-1, 7)[:, 1:]]
+    return (digits[:, 0::2] * 16 + digits[:, 1::2])[positions]
+
+
+def format_error_rows(rows):  # 错误报告中的行号列表
+    shown = ", ".join(str(row) for row in rows[:ERROR_ROWS_SHOWN])
+    if len(rows) > ERROR_ROWS_SHOWN:
+        shown += f" ... and {len(rows) - ERROR_ROWS_SHOWN} more"
+    return shown
+
+
+def text_chars(columns, texts=()):  # 文本列和给定文本中出现的Latin-1以外的字符
+    chars = set("".join(texts))
+    for series in columns:
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            values = series.cat.categories
+        elif pd.api.types.is_string_dtype(series.dtype) or series.dtype == object:
+            values = series.dropna().unique()
+        else:
+            continue
+        chars.update("".join(map(str, values[:GLYPH_SCAN_VALUES])))
+    return {char for char in chars if ord(char) > 0xFF}
+
+
+def maybe_categorize(series):  # 不同值较少的字符串列转换为分类类型
+    if len(series) < CATEGORY_MIN_ROWS or isinstance(series.dtype, pd.CategoricalDtype):
+        return series
+    sample = sample_rows(series)
+    if len(sample) < len(series) and sample.nunique(dropna=True) <= len(
+        sample
+    ) * CATEGORY_SAMPLE_RATIO:  # 样本中重复值很多时不再统计整列
+        return series.astype("category")
+    if series.nunique(dropna=True) <= len(series) * CATEGORY_MAX_RATIO:
+        return series.astype("category")
+    return series
+
+
+def compact_frame(df, column_types=None, schema=None):
+    # 推断缺少类型的列，并按列类型转换为紧凑存储，返回(数据框, 列类型字典)
+    # schema为缓存的模式，其中记录的列（包括无类型的列）不再推断
+    column_types = dict(column_types or {})
+    schema = schema or {}
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        col_type = column_types.get(col)
+        if col_type is None and col in schema:
+            col_type = schema[col].get("type")
+        elif col_type is None:
+            col_type = infer_column_type(series)
+        if col_type is not None:
+            try:
+                series = to_storage(series, col_type)
+                column_types[col] = col_type
+            except (ValueError, TypeError):
+                pass  # 数据与类型不符时保留原样
+            if column_types.get(col) == "string":
+                series = maybe_categorize(series)
+        columns[col] = series
+    return pd.DataFrame(columns, index=df.index), column_types
+
+
+def coerce_value(value, col_type):  # 将输入框中的文本转换为列类型的值，无效时抛出ValueError
+    if isinstance(value, str) and col_type in ("int", "float", "bool"):
+        text = value.strip()
+        if text == "":
+            return None  # 空文本表示缺失值
+        if col_type == "int":
+            return int(text)
+        if col_type == "float":
+            return float(text)
+        if text not in ("True", "False"):
+            raise ValueError(f"Invalid bool value: {value}")
+        return text == "True"
+    return value
+
+
+def assign_cell(df, index, col, value):
+    # 设置单元格，分类列缺少该值时先添加分类；不同值已经太多时改为普通字符串存储
+    series = df[col]
+    if (
+        isinstance(series.dtype, pd.CategoricalDtype)
+        and value is not None
+        and value not in series.cat.categories
+    ):
+        if len(series.cat.categories) + 1 > len(series) * CATEGORY_MAX_RATIO:
+            df[col] = series.astype(STRING_DTYPE)
+        else:
+            df[col] = series.cat.add_categories([value])
+    df.at[index, col] = value
+
+
+def remove_unused_categories(df):  # 删除不再使用的分类（例如逐字输入时留下的中间文本）
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            pruned = series.cat.remove_unused_categories()
+            if len(pruned.cat.categories) != len(series.cat.categories):
+                df[col] = pruned
+
+
+def match_dtypes(new_rows, df):  # 让新行使用与现有数据框相同的存储类型
+    for col in new_rows.columns:
+        if col not in df.columns:
+            continue
+        dtype = df[col].dtype
+        try:
+            if isinstance(dtype, pd.CategoricalDtype):
+                missing = set(new_rows[col].dropna()) - set(dtype.categories)
+                if missing:
+                    df[col] = df[col].cat.add_categories(sorted(missing, key=str))
+                    dtype = df[col].dtype
+            new_rows[col] = new_rows[col].astype(dtype)
+        except (ValueError, TypeError):
+            pass  # 无法转换时由concat决定类型
+    return new_rows
+
+
+def memory_report(df):  # 每列的存储类型和内存占用
+    usage = df.memory_usage(deep=True, index=False)
+    return [(col, str(df[col].dtype), int(usage[col])) for col in df.columns]
+
+
+def format_bytes(size):  # 以易读的单位显示字节数
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
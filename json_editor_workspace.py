@@ -0,0 +1,224 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+
+import itertools
+import os
+import pickle
+import shutil
+import tempfile
+import time
+
+from json_editor_lazy import pandas as pd  # 首次使用时才导入pandas，缩短启动时间
+
+import json_editor_index  # 导入查找索引模块
+
+DEFAULT_MEMORY_BUDGET = 1024 * 1024 * 1024  # 所有打开文档的数据框默认最多占用的内存
+DOCUMENT_STATE = (  # 每个文档独立保存的编辑器属性
+    "df",
+    "file_path",
+    "column_types",
+    "journal",
+    "source_spans",
+    "source_indent",
+    "row_origin",
+    "row_dirty",
+    "jsonl",
+    "data_index",
+    "filter_rows",
+    "sort_cache",
+    "sort_keys",
+    "history",
+    "view_rows",
+)
+
+
+def frame_bytes(df):  # 数据框占用的内存
+    if df is None:
+        return 0
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def same_path(a, b):  # 是否为同一个文件
+    return os.path.normcase(os.path.abspath(a)) == os.path.normcase(os.path.abspath(b))
+
+
+def arrow_table(df):  # 把数据框转换为Arrow表，没有pyarrow或无法转换时返回None
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (ValueError, TypeError, pa.ArrowException):
+        return None
+
+
+def write_spill(df, path):
+    # 把数据框写入本地缓存（工作线程）：普通列为Arrow IPC，对象列用pickle，返回读回所需的信息
+    objects = [col for col in df.columns if df[col].dtype == object]
+    arrow_columns = [col for col in df.columns if col not in objects]
+    table = arrow_table(df[arrow_columns]) if arrow_columns else None
+    if table is None:  # 全部用pickle
+        objects, arrow_columns = list(df.columns), []
+    else:
+        import pyarrow as pa
+
+        with pa.OSFile(path + ".arrow", "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    with open(path + ".pkl", "wb") as file:
+        pickle.dump(
+            {col: df[col].array for col in objects},
+            file,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+    return {
+        "path": path,
+        "columns": list(df.columns),
+        "dtypes": {col: df[col].dtype for col in arrow_columns},  # Arrow读回后恢复存储类型
+        "index": df.index,
+    }
+
+
+def read_spill(spill):  # 读回溢出的数据框（工作线程），Arrow部分内存映射读取
+    columns = {}
+    if spill["dtypes"]:
+        import pyarrow as pa
+
+        with pa.memory_map(spill["path"] + ".arrow") as source:
+            frame = pa.ipc.open_file(source).read_all().to_pandas()
+        for col, dtype in spill["dtypes"].items():
+            series = frame[col]
+            columns[col] = (series if series.dtype == dtype else series.astype(dtype)).array
+    with open(spill["path"] + ".pkl", "rb") as file:
+        columns.update(pickle.load(file))
+    return pd.DataFrame(
+        {col: columns[col] for col in spill["columns"]}, index=spill["index"], copy=False
+    )
+
+
+def remove_spill(spill):  # 删除缓存文件
+    for suffix in (".arrow", ".pkl"):
+        try:
+            os.remove(spill["path"] + suffix)
+        except FileNotFoundError:
+            pass
+
+
+class Document:  # 工作区中打开的一个文件
+    def __init__(self, number, file_path):
+        self.number = number  # 文档编号，用于标签和缓存文件名
+        self.file_path = file_path
+        self.state = None  # 非活动时保存的编辑器属性，活动时为None
+        self.nbytes = None  # 非活动时数据框占用的内存，检查预算时才计算
+        self.spill = None  # 数据框溢出到磁盘时读回所需的信息
+        self.spilling = False  # 正在后台写入缓存
+        self.generation = 0  # 每次激活加一，写入缓存期间被激活过的结果作废
+        self.last_used = time.monotonic()  # 最近一次成为活动文档的时间
+
+    @property
+    def resident(self):  # 非活动文档的数据框是否仍在内存中
+        return self.state is not None and self.spill is None
+
+
+class Workspace:  # 多个打开的文档，超出内存预算时把最久未使用的非活动文档溢出到磁盘
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET):
+        self.documents = []  # 按标签顺序排列
+        self.active = None  # 数据在编辑器属性中的文档
+        self.memory_budget = memory_budget
+        self.cache_dir = None  # 首次溢出时创建
+        self.numbers = itertools.count(1)
+
+    def find(self, file_path):  # 已打开的同一文件，没有时返回None
+        for document in self.documents:
+            if same_path(document.file_path, file_path):
+                return document
+        return None
+
+    def add(self, file_path):  # 新打开的文件成为活动文档
+        document = Document(next(self.numbers), file_path)
+        self.documents.append(document)
+        self.active = document
+        return document
+
+    def deactivate(self, state):  # 保存活动文档的编辑器属性，使其成为非活动文档
+        document, self.active = self.active, None
+        document.state = state
+        document.file_path = state["file_path"]
+        document.nbytes = None  # 切换标签时不遍历数据
+        return document
+
+    def activate(self, document, df=None):  # 取出文档的编辑器属性，使其成为活动文档
+        state, document.state = document.state, None
+        if document.spill is not None:
+            remove_spill(document.spill)
+            document.spill = None
+            state["df"] = df
+        document.nbytes = None
+        document.generation += 1  # 正在写入的缓存不再对应之后的数据
+        document.last_used = time.monotonic()
+        self.active = document
+        return state
+
+    def remove(self, document):  # 关闭文档，返回其编辑器属性（活动文档返回None）
+        self.documents.remove(document)
+        if document is self.active:
+            self.active = None
+        if document.spill is not None:
+            remove_spill(document.spill)
+            document.spill = None
+        state, document.state = document.state, None
+        return state
+
+    def recent(self):  # 最近使用的文档，没有时返回None
+        return max(self.documents, key=lambda document: document.last_used, default=None)
+
+    def spill_candidates(self, active_bytes):
+        # 为了不超过内存预算需要溢出的非活动文档，最久未使用的在前
+        resident = sorted(
+            (
+                document
+                for document in self.documents
+                if document.resident and not document.spilling
+            ),
+            key=lambda document: document.last_used,
+        )
+        for document in resident:
+            if document.nbytes is None:
+                document.nbytes = frame_bytes(document.state["df"])
+        total = active_bytes + sum(document.nbytes for document in resident)
+        candidates = []
+        for document in resident:
+            if total <= self.memory_budget:
+                break
+            candidates.append(document)
+            total -= document.nbytes
+        return candidates
+
+    def spill_path(self, document):  # 文档的缓存文件路径（不含扩展名）
+        if self.cache_dir is None:
+            self.cache_dir = tempfile.mkdtemp(prefix="json_editor_workspace_")
+        return os.path.join(self.cache_dir, f"document_{document.number}")
+
+    def finish_spill(self, document, spill, generation):  # 写入完成后释放数据框（界面线程）
+        document.spilling = False
+        if (
+            document.state is None
+            or document not in self.documents
+            or document.generation != generation
+        ):
+            remove_spill(spill)  # 写入期间文档被激活（可能已经修改）或关闭
+            return
+        document.spill = spill
+        document.state["df"] = None
+        document.state["data_index"] = json_editor_index.DataIndex()  # 激活后按需重建
+        document.state["sort_cache"] = json_editor_index.SortCache()
+
+    def close(self):  # 删除所有缓存文件
+        for document in self.documents:
+            document.spill = None
+        if self.cache_dir is not None:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            self.cache_dir = None
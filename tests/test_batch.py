@@ -0,0 +1,46 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+
+import json  # 导入json模块，用于处理JSON数据
+
+import pytest
+
+import json_editor_batch
+
+openpyxl = pytest.importorskip("openpyxl")
+
+
+def write_sheet(path, header, rows):  # 写入只有一个工作表的Excel文件
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Sheet1"
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+def test_import_by_row_pads_rows_when_sheet_is_longer(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    data_file = data_dir / "data1.json"
+    data_file.write_text(json.dumps([{"id": 1, "en": "a"}, {"id": 2, "en": "b"}]))
+    write_sheet(tmp_path / "lang.xlsx", ["zh"], [[f"z{i}"] for i in range(4)])
+    script = tmp_path / "script.json"
+    script.write_text(
+        json.dumps(
+            [
+                {"op": "import_excel", "file": "lang.xlsx", "columns": ["zh"]},
+                {"op": "save"},
+            ]
+        )
+    )
+    operations = json_editor_batch.load_script(str(script))
+    files = json_editor_batch.collect_files([str(data_dir)])
+    (result,) = json_editor_batch.run_batch(files, operations, jobs=1, dry_run=True)
+    assert result["ok"], result.get("error")
+    assert result["rows"] == 4
+    assert not result["saved"]
+    assert sorted(path.name for path in data_dir.iterdir()) == ["data1.json"]  # 试运行不写任何文件
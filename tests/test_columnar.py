@@ -0,0 +1,51 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+
+import pandas as pd
+import pytest
+
+import json_editor_columnar
+import json_editor_types
+
+
+def make_frame():
+    df = pd.DataFrame(
+        {
+            "id": [1, 2, None, 4],
+            "name": ["a", "北京", None, "d"],
+            "city": ["x", "y", "x", "x"],
+            "score": [0.5, None, 2.5, 3.0],
+            "ok": [True, False, None, True],
+            "color": ["#ff0000", "#00ff00", None, "#0000ff"],
+        }
+    )
+    column_types = {"id": "int", "name": "string", "city": "string", "score": "float"}
+    column_types.update({"ok": "bool", "color": "color"})
+    df, column_types = json_editor_types.compact_frame(df, column_types)
+    return df, column_types
+
+
+def values(df):  # 比较值而不是存储类型，缺失值统一为None
+    return df.astype(object).where(df.notna(), None).to_dict(orient="list")
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow", ".feather"])
+def test_columnar_round_trip_keeps_values_and_types(tmp_path, suffix):
+    pytest.importorskip("pyarrow")
+    df, column_types = make_frame()
+    path = str(tmp_path / f"data{suffix}")
+    json_editor_columnar.save_columnar(path, df, column_types, chunk_rows=3)
+    loaded, loaded_types = json_editor_columnar.load_columnar(path)
+    assert list(loaded.columns) == list(df.columns)
+    assert values(loaded) == values(df)
+    assert loaded_types == column_types  # 列类型（包括color）保存在元数据中
+
+
+def test_csv_round_trip_keeps_values(tmp_path):
+    df, column_types = make_frame()
+    path = str(tmp_path / "data.csv")
+    json_editor_columnar.save_columnar(path, df, column_types, chunk_rows=3)
+    loaded, _ = json_editor_columnar.load_columnar(path)
+    assert values(loaded) == values(df)
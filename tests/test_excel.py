@@ -0,0 +1,35 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+
+import numpy as np
+import pandas as pd
+
+import json_editor_excel
+
+
+def test_hash_join_handles_duplicate_and_missing_keys():
+    json_keys = pd.Series(["a", "b", " c ", "d", None, "a"], dtype="str")
+    excel_keys = pd.Series(["c", "a", "a", "x", 12.0, ""], dtype=object)
+    positions, json_missing, excel_missing, duplicates = json_editor_excel.hash_join(
+        json_keys, excel_keys
+    )
+    assert positions.tolist() == [1, -1, 0, -1, -1, 1]  # 重复的键使用第一次出现的行
+    assert json_missing.tolist() == [1, 3, 4]
+    assert excel_missing.tolist() == [3, 4]  # 空键不参与连接，也不算未匹配
+    assert duplicates.tolist() == [2]
+
+
+def test_hash_join_matches_numbers_written_as_floats():
+    positions, json_missing, _, _ = json_editor_excel.hash_join(
+        pd.Series([12, 7], dtype="Int64"), pd.Series([7.0, 12.0])
+    )
+    assert positions.tolist() == [1, 0]
+    assert len(json_missing) == 0
+
+
+def test_take_rows_keeps_existing_values_for_unmatched_rows():
+    values = json_editor_excel.take_rows(["x", "y"], np.array([1, -1, 0]), existing=["a", "b", "c"])
+    assert values.tolist() == ["y", "b", "x"]
+    assert json_editor_excel.take_rows(["x"], np.array([-1, 0])).tolist() == [None, "x"]
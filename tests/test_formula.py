@@ -0,0 +1,56 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+
+import pandas as pd
+import pytest
+
+import json_editor_formula
+
+
+def make_frame():
+    return pd.DataFrame(
+        {
+            "population": pd.array([1000, 2000, 3000], dtype="Int64"),
+            "city": pd.Series(["a", "b", "a"]).astype("category"),
+            "name.en": ["x", "y", "z"],
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "city.to_csv('out.csv')",
+        "city.__class__",
+        "population.values",
+        "city.str",
+        "population[0]",
+    ],
+)
+def test_evaluate_rejects_unsafe_or_non_row_expressions(tmp_path, monkeypatch, expression):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(json_editor_formula.FormulaError):
+        json_editor_formula.evaluate(make_frame(), expression)
+    assert not list(tmp_path.iterdir())
+
+
+def test_evaluate_concatenates_strings():
+    values = json_editor_formula.evaluate(make_frame(), '`name.en` + "-" + city')
+    assert values.tolist() == ["x-a", "y-b", "z-a"]
+
+
+def test_compute_column_keeps_rows_outside_the_condition():
+    frame = make_frame()
+    frame["label"] = ["1", "two", "3"]
+    with pytest.raises(json_editor_formula.FormulaError, match="rows: 1"):
+        json_editor_formula.compute_column(
+            frame, "label", "int", "population", "population < 2000"
+        )
+    values, col_type, bad = json_editor_formula.compute_column(
+        frame, "label", "int", "population", "population == 2000"
+    )
+    assert col_type == "int"
+    assert values.tolist() == [1, 2000, 3]
+    assert len(bad) == 0
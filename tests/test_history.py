@@ -0,0 +1,23 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+
+import json_editor_history
+
+
+def test_nested_groups_push_one_step():
+    history = json_editor_history.EditHistory()
+    history.begin_group()
+    history.record({"op": "a"})
+    history.begin_group()
+    history.record({"op": "b"})
+    history.end_group()
+    assert not history.undo_stack
+    history.record({"op": "c"})
+    history.end_group()
+    assert not history.in_group()
+    assert [edit["op"] for edit in history.take("undo")] == ["c", "b", "a"]
+    history.end_group()  # 多余的结束不影响之后的记录
+    history.record({"op": "d"})
+    assert len(history.undo_stack) == 1
@@ -0,0 +1,103 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import json_editor_index
+from json_editor_index import display_text
+
+
+def make_frame():
+    words = ["Apple", "apricot", "北京市", "上海", "banana", None, "x" * 80 + "App", "ab"]
+    return pd.DataFrame(
+        {
+            "name": pd.Series([words[i % len(words)] for i in range(40)], dtype="str"),
+            "city": pd.Series([words[i % 3] for i in range(40)]).astype("category"),
+            "n": pd.array([None if i % 7 == 0 else i % 11 for i in range(40)], dtype="Int64"),
+        }
+    )
+
+
+def contains_mask(series, text):  # 与索引相同的语义：显示文本不区分大小写地包含text
+    return series.map(display_text).str.lower().str.contains(text.lower(), regex=False)
+
+
+@pytest.mark.parametrize("text", ["a", "AP", "app", "北", "北京", "京市", "xxxa", "zzz"])
+def test_contains_matches_pandas(text):
+    df = make_frame()
+    index = json_editor_index.DataIndex()
+    for col in ["name", "city"]:
+        expected = np.flatnonzero(contains_mask(df[col], text))
+        assert index.find(df, [col], "contains", text).tolist() == expected.tolist()
+
+
+def test_equals_and_range_match_pandas():
+    df = make_frame()
+    index = json_editor_index.DataIndex()
+    expected = np.flatnonzero(df["name"].map(display_text) == "北京市")
+    assert index.find(df, ["name"], "equals", "北京市").tolist() == expected.tolist()
+    mask = ((df["n"] >= 3) & (df["n"] <= 6)).fillna(False)
+    assert index.find(df, ["n"], "range", "3..6").tolist() == np.flatnonzero(mask).tolist()
+    mask = (df["n"] >= 9).fillna(False)
+    assert index.find(df, ["n"], "range", "9..").tolist() == np.flatnonzero(mask).tolist()
+    with pytest.raises(ValueError):
+        index.find(df, ["n"], "range", "3")
+
+
+def test_index_follows_incremental_edits():
+    df = make_frame()
+    index = json_editor_index.DataIndex()
+    for mode, text in [("contains", "app"), ("equals", "ab"), ("range", "2..5")]:
+        index.find(df, ["name", "n"], mode, text)  # 先构建全部索引
+    df.loc[3, "name"] = "Applesauce"
+    index.cell_changed("name", 3, "Applesauce")
+    df.loc[4, "n"] = 4
+    index.cell_changed("n", 4, 4)
+    df = df.drop(index=[0, 1]).reset_index(drop=True)
+    index.rows_removed(0, 2)
+    extra = pd.DataFrame({"name": ["grape", "ab"], "n": pd.array([5, None], dtype="Int64")})
+    df = pd.concat([df, extra], ignore_index=True)
+    index.rows_appended(df, 2)
+    assert index.find(df, ["name"], "contains", "app").tolist() == np.flatnonzero(
+        contains_mask(df["name"], "app")
+    ).tolist()
+    assert index.find(df, ["name"], "equals", "ab").tolist() == np.flatnonzero(
+        df["name"] == "ab"
+    ).tolist()
+    mask = ((df["n"] >= 2) & (df["n"] <= 5)).fillna(False)
+    assert index.find(df, ["n"], "range", "2..5").tolist() == np.flatnonzero(mask).tolist()
+
+
+@pytest.mark.parametrize(
+    "keys",
+    [
+        [("n", True)],
+        [("n", False)],
+        [("city", True)],
+        [("city", False), ("n", True)],
+        [("name", True), ("n", False)],
+    ],
+)
+def test_sort_cache_matches_pandas(keys):
+    df = make_frame()
+    df["city"] = df["city"].cat.reorder_categories(["北京市", "apricot", "Apple"])
+    cache = json_editor_index.SortCache()
+    order = cache.permutation(df, keys)
+    columns = [col for col, _ in keys]
+    frame = df[columns].copy()
+    if "city" in columns:  # 按值排序，而不是分类的顺序
+        frame["city"] = frame["city"].astype(str)
+    expected = frame.sort_values(
+        columns,
+        ascending=[asc for _, asc in keys],
+        kind="stable",
+        na_position="last",
+    ).index
+    assert order.tolist() == expected.tolist()
+    assert cache.permutation(df, keys) is order  # 结果被缓存
+    cache.invalidate("n")
+    assert cache.is_ready(keys) == ("n" not in columns)
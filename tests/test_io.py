@@ -0,0 +1,191 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+
+import json  # 导入json模块，用于处理JSON数据
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import json_editor_io
+
+
+def test_dump_frame_writes_missing_values_as_null():
+    frame = pd.DataFrame(
+        {
+            "f": [1.5, np.nan, np.inf],
+            "s": pd.Series(["a", None, "c"], dtype="str"),
+            "n": pd.array([1, None, 3], dtype="Int64"),
+        }
+    )
+    records = [json.loads(text) for text in json_editor_io.dump_frame(frame, None)]
+    assert records == [
+        {"f": 1.5, "s": "a", "n": 1},
+        {"f": None, "s": None, "n": None},
+        {"f": None, "s": "c", "n": 3},
+    ]
+
+
+def test_save_jsonl_reuses_encoded_rows(tmp_path, monkeypatch):
+    path = tmp_path / "data.jsonl"
+    path.write_text('{"a":1}\n{"a":2}\n{"a":3}\n', encoding="utf-8")
+    lines = json_editor_io.JsonLinesFile(str(path))
+    frame = pd.DataFrame({"a": [10000, 2, 30000]})
+    origin = np.array([-1, 1, -1])
+    encoded = json_editor_io.dump_frame(frame.iloc[[0, 2]], None)
+
+    def fail(*args):
+        raise AssertionError("rows were serialized again")
+
+    monkeypatch.setattr(json_editor_io, "_dump_rows", fail)
+    spans = json_editor_io.save_json_incremental(
+        str(path),
+        frame,
+        str(path),
+        lines.spans,
+        origin,
+        lines=True,
+        before_replace=lines.close,
+        encoded=encoded,
+    )
+    data = path.read_bytes()
+    assert data == b'{"a":10000}\n{"a":2}\n{"a":30000}\n'
+    assert [json.loads(data[begin:end]) for begin, end in spans] == [
+        {"a": 10000},
+        {"a": 2},
+        {"a": 30000},
+    ]
+
+
+def test_journal_writes_column_values_in_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(json_editor_io, "JOURNAL_CHUNK_VALUES", 2)
+    path = tmp_path / "data.json"
+    path.write_text("[]", encoding="utf-8")
+    journal = json_editor_io.EditJournal(str(path))
+    journal.start()
+    values = pd.Series(["a", None, "c", "d", "e"], dtype="str")
+    journal.append({"op": "restore_column", "col": "s", "values": values})
+    journal.append({"op": "set_cell", "index": 0, "col": "s", "value": "x"})
+    journal.append({"op": "set_column_values", "col": "e", "values": values.iloc[:0]})
+    journal.close()
+    assert journal.read_pending() == [
+        {"op": "restore_column", "col": "s", "values": ["a", None, "c", "d", "e"]},
+        {"op": "set_cell", "index": 0, "col": "s", "value": "x"},
+        {"op": "set_column_values", "col": "e", "values": []},
+    ]
+
+
+def test_save_rewrites_records_when_the_indent_changes(tmp_path):
+    from json_editor_functions import JsonEditorFunctions
+
+    records = [{"a": i, "b": "x"} for i in range(4)]
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps(records, indent=2), encoding="utf-8")
+    editor = JsonEditorFunctions()
+    editor.open_json(str(path), streaming=True)
+    assert editor.source_indent == 2
+    editor.set_cell_value(1, "a", 10)
+    records[1]["a"] = 10
+    editor.save_json()  # 原文件的缩进与保存的缩进不同，全部重新序列化
+    assert path.read_text(encoding="utf-8") == json.dumps(records, indent=4)
+    editor.save_json_compact()
+    editor.set_cell_value(2, "a", 20)
+    records[2]["a"] = 20
+    editor.save_json()
+    assert path.read_text(encoding="utf-8") == json.dumps(records, indent=4)
+    editor.set_cell_value(3, "b", "y")  # 缩进相同时增量保存，结果相同
+    records[3]["b"] = "y"
+    editor.save_json()
+    assert editor.source_indent == 4
+    assert path.read_text(encoding="utf-8") == json.dumps(records, indent=4)
+    editor.close_document()
+
+
+@pytest.mark.parametrize("with_spans", [False, True])
+def test_load_json_streaming_rejects_non_object_elements(tmp_path, with_spans):
+    path = tmp_path / "data.json"
+    path.write_text('[{"a": 1}, 2, {"a": 3}]', encoding="utf-8")
+    with pytest.raises(ValueError, match="Array element 2 is not a JSON object"):
+        json_editor_io.load_json_streaming(str(path), with_spans=with_spans)
+
+
+def test_load_json_streaming_matches_json_normalize(tmp_path):
+    records = [
+        {"id": i, "name": f"名{i}", "meta": {"x": i * 0.5, "tags": [i]}, "flag": i % 2 == 0}
+        for i in range(23)
+    ]
+    records[5]["extra"] = "only here"
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding="utf-8")
+    expected = pd.json_normalize(json.loads(path.read_text(encoding="utf-8")))
+    df = json_editor_io.load_json_streaming(str(path), records_per_frame=4)
+    pd.testing.assert_frame_equal(df, expected)
+    df, spans = json_editor_io.load_json_streaming(
+        str(path), records_per_frame=4, with_spans=True
+    )
+    pd.testing.assert_frame_equal(df, expected)
+    assert spans is None  # 嵌套记录被展平，不能复用原始字节
+
+
+def test_load_json_streaming_spans_cover_each_record(tmp_path):
+    records = [{"a": i, "s": "名" * i} for i in range(7)]
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps(records, ensure_ascii=False, indent=4), encoding="utf-8")
+    data = path.read_bytes()
+    df, spans = json_editor_io.load_json_streaming(
+        str(path), records_per_frame=3, with_spans=True
+    )
+    assert df.to_dict(orient="records") == records
+    assert [json.loads(data[begin:end]) for begin, end in spans] == records
+
+
+@pytest.mark.parametrize("indent", [4, None])
+def test_save_json_streaming_matches_json_dumps(tmp_path, indent):
+    records = [{"a": i, "s": f"名{i}"} for i in range(5)]
+    path = tmp_path / "data.json"
+    json_editor_io.save_json_streaming(
+        str(path), pd.DataFrame(records), indent=indent, chunk_rows=2
+    )
+    separators = None if indent is not None else (",", ":")
+    assert path.read_text(encoding="utf-8") == json.dumps(
+        records, ensure_ascii=False, indent=indent, separators=separators
+    )
+
+
+def test_failed_save_leaves_the_original_file(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text('[{"a": 1}]', encoding="utf-8")
+
+    def progress(done, total):
+        raise RuntimeError("disk full")
+
+    with pytest.raises(RuntimeError):
+        json_editor_io.save_json_streaming(
+            str(path), pd.DataFrame({"a": range(10)}), chunk_rows=2, progress=progress
+        )
+    assert path.read_text(encoding="utf-8") == '[{"a": 1}]'
+    assert [p.name for p in tmp_path.iterdir()] == ["data.json"]  # 临时文件已删除
+
+
+def test_incremental_save_copies_untouched_records_byte_for_byte(tmp_path):
+    path = tmp_path / "data.json"
+    # 原文件中未修改记录的字节（包括浮点数写法）必须原样保留
+    path.write_text(
+        '[\n    {"a": 1, "f": 1.50},\n    {"a": 2, "f": 2.0},\n    {"a": 3, "f": 3.25}\n]',
+        encoding="utf-8",
+    )
+    source = path.read_bytes()
+    df, spans = json_editor_io.load_json_streaming(str(path), with_spans=True)
+    df = df.drop(index=1).reset_index(drop=True)  # 删除第二条并修改第三条
+    df.loc[1, "a"] = 30
+    origin = np.array([0, -1])
+    new_spans = json_editor_io.save_json_incremental(
+        str(path), df, str(path), spans, origin, indent=4
+    )
+    data = path.read_bytes()
+    begin, end = spans[0]
+    assert data[new_spans[0, 0] : new_spans[0, 1]] == source[begin:end]
+    assert json.loads(data[new_spans[1, 0] : new_spans[1, 1]]) == {"a": 30, "f": 3.25}
+    assert json.loads(data) == [{"a": 1, "f": 1.5}, {"a": 30, "f": 3.25}]
@@ -0,0 +1,48 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+
+import json  # 导入json模块，用于处理JSON数据
+
+from json_editor_functions import JsonEditorFunctions
+
+
+def write_data(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps([{"a": i} for i in range(3)]), encoding="utf-8")
+    return path
+
+
+def test_open_and_close_without_edits_leaves_no_journal(tmp_path):
+    path = write_data(tmp_path)
+    editor = JsonEditorFunctions()
+    editor.open_json(str(path))
+    editor.close_document()
+    assert [p.name for p in tmp_path.iterdir()] == ["data.json"]
+
+
+def test_save_removes_the_journal(tmp_path):
+    path = write_data(tmp_path)
+    editor = JsonEditorFunctions()
+    editor.open_json(str(path))
+    editor.set_cell_value(0, "a", 10)
+    editor.journal.close()  # 等待写入线程
+    assert (tmp_path / "data.json.journal").exists()
+    editor.journal.start(keep=True)
+    editor.save_json()
+    editor.close_document()
+    assert not (tmp_path / "data.json.journal").exists()
+    assert json.loads(path.read_text(encoding="utf-8"))[0] == {"a": 10}
+
+
+def test_unsaved_edits_are_recovered_on_open(tmp_path):
+    path = write_data(tmp_path)
+    editor = JsonEditorFunctions()
+    editor.open_json(str(path))
+    editor.set_cell_value(1, "a", 20)
+    editor.close_document()  # 未保存的编辑保留在日志中
+    reopened = JsonEditorFunctions()
+    reopened.open_json(str(path))
+    assert reopened.df["a"].tolist() == [0, 20, 2]
+    assert "recovered 1 unsaved edits" in reopened.messages[-1]
@@ -0,0 +1,45 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+
+import json  # 导入json模块，用于处理JSON数据
+import os
+
+import pandas as pd
+
+import json_editor_schema
+import json_editor_types
+
+
+def write_data(path, records):
+    path.write_text(json.dumps(records), encoding="utf-8")
+    df, column_types = json_editor_types.compact_frame(pd.json_normalize(records))
+    return df, column_types
+
+
+def test_schema_is_used_until_the_file_changes(tmp_path):
+    path = tmp_path / "data.json"
+    records = [{"a": i, "c": "x" if i % 2 else "y"} for i in range(50)]
+    df, column_types = write_data(path, records)
+    json_editor_schema.save_schema(
+        str(path), json_editor_schema.describe_frame(df, column_types)
+    )
+    schema = json_editor_schema.load_schema(str(path))
+    assert json_editor_schema.schema_column_types(schema) == column_types
+    stat = os.stat(path)
+    data = path.read_bytes()
+    path.write_bytes(data.replace(b'"a": 1,', b'"a": 7,'))  # 大小不变，内容变化
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert json_editor_schema.load_schema(str(path)) is None
+
+
+def test_cast_chunk_applies_cached_storage_types(tmp_path):
+    path = tmp_path / "data.json"
+    records = [{"a": i, "c": "x" if i % 2 else "y"} for i in range(50)]
+    df, column_types = write_data(path, records)
+    columns = json_editor_schema.describe_frame(df, column_types)
+    chunk = json_editor_schema.cast_chunk(pd.json_normalize(records[:5]), columns)
+    assert chunk.dtypes.astype(str).tolist() == df.dtypes.astype(str).tolist()
+    new_value = json_editor_schema.cast_chunk(pd.DataFrame({"c": ["z"]}), columns)
+    assert new_value["c"].tolist() == ["z"]  # 出现新值时不使用缓存的类别
@@ -0,0 +1,29 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+
+import pandas as pd
+
+import json_editor_types
+
+
+def test_assign_cell_stops_adding_categories_past_the_ratio():
+    df = pd.DataFrame({"city": pd.Series(["a", "b"] * 50, dtype="category")})
+    for i, text in enumerate(["n", "ne", "new"]):  # 逐字输入
+        json_editor_types.assign_cell(df, i, "city", text)
+    assert isinstance(df["city"].dtype, pd.CategoricalDtype)
+    for i in range(3, 60):
+        json_editor_types.assign_cell(df, i, "city", f"value{i}")
+    assert df["city"].dtype == json_editor_types.STRING_DTYPE
+    assert df.at[59, "city"] == "value59"
+    assert df.at[60, "city"] == "a"
+
+
+def test_remove_unused_categories_drops_partial_text():
+    df = pd.DataFrame({"city": pd.Series(["a", "b"] * 50, dtype="category")})
+    for text in ["n", "ne", "new"]:
+        json_editor_types.assign_cell(df, 0, "city", text)
+    assert len(df["city"].cat.categories) == 5
+    json_editor_types.remove_unused_categories(df)
+    assert list(df["city"].cat.categories) == ["a", "b", "new"]
@@ -0,0 +1,66 @@
+# 版权声明：本脚本由 [zhang kang] 于 2024年7月开发，保留所有权利。
+# 源码地址：https://github.com/kangezhang/JsonEditorTools
+# 本代码仅供学习和参考。
+# Copyright (c) 2024 zhang kang All rights reserved.
+
+import json  # 导入json模块，用于处理JSON数据
+
+from json_editor_functions import JsonEditorFunctions
+
+
+class DeferredTasks:  # 提交的任务在run()时才执行，模拟后台线程晚完成
+    def __init__(self):
+        self.pending = []
+
+    def submit(self, task, work, on_done, on_error, on_update=None):
+        self.pending.append((task, work, on_done, on_error))
+
+    def is_data_locked(self):
+        return False
+
+    def run(self):
+        pending, self.pending = self.pending, []
+        for task, work, on_done, on_error in pending:
+            try:
+                result = work(task)
+            except Exception as e:
+                on_error(e)
+            else:
+                on_done(result)
+
+
+def open_files(tmp_path, editor, names):
+    for name in names:
+        path = tmp_path / name
+        path.write_text(json.dumps([{"a": i} for i in range(5)]), encoding="utf-8")
+        editor.open_json(str(path))  # 没有任务执行器时同步打开
+    return [editor.workspace.find(str(tmp_path / name)) for name in names]
+
+
+def test_spill_and_reactivate(tmp_path):
+    editor = JsonEditorFunctions()
+    editor.workspace.memory_budget = 0
+    first, second = open_files(tmp_path, editor, ["a.json", "b.json"])
+    assert first.spill is not None and first.state["df"] is None
+    editor.switch_document(first)
+    assert editor.df["a"].tolist() == list(range(5))
+    assert first.spill is None
+    editor.workspace.close()
+
+
+def test_spill_finishing_after_reactivation_keeps_new_edits(tmp_path):
+    editor = JsonEditorFunctions()
+    first, second = open_files(tmp_path, editor, ["a.json", "b.json"])
+    editor.workspace.memory_budget = 0
+    editor.tasks = DeferredTasks()
+    editor.spill_documents()  # 开始在后台写入a的缓存
+    assert first.spilling and first.spill is None
+    editor.switch_document(first)  # 写入完成前激活并修改
+    editor.add_rows(2)
+    editor.set_cell_value(0, "a", 100)
+    editor.switch_document(second)
+    editor.tasks.run()  # 激活前开始的缓存写入此时才完成
+    assert first.spill is None
+    editor.switch_document(first)
+    assert editor.df["a"].tolist() == [100, 1, 2, 3, 4, 0, 0]
+    editor.workspace.close()